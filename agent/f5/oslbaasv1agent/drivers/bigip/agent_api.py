@@ -90,6 +90,20 @@ class LbaasAgentApi(RpcProxy):
             topic=self.topic
         )
 
+    @log.log
+    def get_pool_changes(self, generation=None):
+        return self.call(
+            self.context,
+            self.make_msg(
+                'get_pool_changes',
+                generation=generation,
+                env=self.env,
+                group=self.group,
+                host=self.host
+            ),
+            topic=self.topic
+        )
+
     @log.log
     def get_service_by_pool_id(self, pool_id, global_routed_mode=False):
         return self.call(
@@ -103,6 +117,19 @@ class LbaasAgentApi(RpcProxy):
             topic=self.topic
         )
 
+    @log.log
+    def get_services_by_pool_ids(self, pool_ids, global_routed_mode=False):
+        return self.call(
+            self.context,
+            self.make_msg(
+                'get_services_by_pool_ids',
+                pool_ids=pool_ids,
+                global_routed_mode=global_routed_mode,
+                host=self.host
+            ),
+            topic=self.topic
+        )
+
     @log.log
     def create_port_on_subnet(self, subnet_id=None,
                               mac_address=None, name=None,
@@ -257,6 +284,17 @@ class LbaasAgentApi(RpcProxy):
             topic=self.topic
         )
 
+    @log.log
+    def update_statuses(self, updates, cast=False):
+        msg = self.make_msg(
+            'update_statuses',
+            updates=updates,
+            host=self.host
+        )
+        if cast:
+            return self.cast(self.context, msg, topic=self.topic)
+        return self.call(self.context, msg, topic=self.topic)
+
     @log.log
     def update_vip_status(self, vip_id=None,
                           status=None, status_description=None):
@@ -369,3 +407,15 @@ class LbaasAgentApi(RpcProxy):
             ),
             topic=self.topic
         )
+
+    @log.log
+    def update_pools_stats(self, pools_stats):
+        return self.call(
+            self.context,
+            self.make_msg(
+                'update_pools_stats',
+                pools_stats=pools_stats,
+                host=self.host
+            ),
+            topic=self.topic
+        )
@@ -24,6 +24,7 @@ from neutron.common import topics
 from neutron.common.exceptions import NeutronException
 from neutron.openstack.common import loopingcall
 from neutron.openstack.common import periodic_task
+from neutron.plugins.common import constants as plugin_const
 
 from f5.oslbaasv1agent.drivers.bigip import agent_api
 from f5.oslbaasv1agent.drivers.bigip import constants
@@ -94,6 +95,22 @@ OPTS = [
         default=300,
         help=_('Number of seconds between service refresh check')
     ),
+    cfg.IntOpt(
+        'service_full_resync_interval',
+        default=3600,
+        help=_('Number of seconds between full resyncs of all services')
+    ),
+    cfg.IntOpt(
+        'service_batch_size',
+        default=50,
+        help=_('Number of service definitions to request from the '
+               'plugin in one call')
+    ),
+    cfg.IntOpt(
+        'stats_batch_size',
+        default=200,
+        help=_('Number of pool stats to send to the plugin in one call')
+    ),
     cfg.StrOpt(
         'environment_prefix', default='',
         help=_('The object name prefix for this environment'),
@@ -195,6 +212,22 @@ class LogicalServiceCache(object):
         return agent_hosts.keys()
 
 
+def _service_is_pending(service):
+    """ Does any object of the service have a task pending? """
+    if service['pool']['status'] != plugin_const.ACTIVE:
+        return True
+    if service.get('vip') and 'status' in service['vip'] and \
+            service['vip']['status'] != plugin_const.ACTIVE:
+        return True
+    for member in service.get('members', []):
+        if member['status'] != plugin_const.ACTIVE:
+            return True
+    for monitor_status in service['pool'].get('health_monitors_status', []):
+        if monitor_status['status'] != plugin_const.ACTIVE:
+            return True
+    return False
+
+
 class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
 
     # history
@@ -211,8 +244,16 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         # create the cache of provisioned services
         self.cache = LogicalServiceCache()
         self.last_resync = datetime.datetime.now()
+        self.last_full_resync = self.last_resync
         self.needs_resync = False
         self.plugin_rpc = None
+        # plugin change generation reconciled so far
+        self.change_epoch = None
+        self.change_generation = None
+        # cleared if the plugin can not build services in batches
+        self.batch_services = True
+        # cleared if the plugin can not update stats in batches
+        self.batch_stats = True
 
         if conf.service_resync_interval:
             self.service_resync_interval = conf.service_resync_interval
@@ -220,6 +261,12 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             self.service_resync_interval = constants.RESYNC_INTERVAL
         LOG.debug(_('setting service resync interval to %d seconds'
                     % self.service_resync_interval))
+        if conf.service_full_resync_interval:
+            self.service_full_resync_interval = \
+                conf.service_full_resync_interval
+        else:
+            self.service_full_resync_interval = \
+                constants.FULL_RESYNC_INTERVAL
 
         try:
             LOG.debug(_('loading LBaaS driver %s'
@@ -367,6 +414,20 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             if hasattr(self.lbdriver, 'service_queue'):
                 self.agent_state['configurations']['request_queue_depth'] = \
                     len(self.lbdriver.service_queue)
+                self.agent_state['configurations']['requests_merged'] = \
+                    self.lbdriver.service_queue.requests_merged
+            if hasattr(self.lbdriver, 'sync_scheduler'):
+                sync_scheduler = self.lbdriver.sync_scheduler
+                self.agent_state['configurations'][
+                    'cluster_syncs_requested'] = \
+                    sync_scheduler.syncs_requested
+                self.agent_state['configurations'][
+                    'cluster_syncs_performed'] = \
+                    sync_scheduler.syncs_performed
+                for percent in (50, 90, 99):
+                    self.agent_state['configurations'][
+                        'cluster_sync_latency_p%d' % percent] = \
+                        sync_scheduler.latency_percentile(percent)
             if self.lbdriver.agent_configurations:
                 self.agent_state['configurations'].update(
                     self.lbdriver.agent_configurations
@@ -406,16 +467,25 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         now = datetime.datetime.now()
         # Only force resync if the agent thinks it is
         # synchronized and the resync timer has exired
-        if (now - self.last_resync).seconds > \
+        full_resync = False
+        if (now - self.last_full_resync).seconds > \
+                self.service_full_resync_interval:
+            full_resync = True
+            LOG.debug('Forcing resync of services on resync timer'
+                      ' (%d seconds).' % self.service_full_resync_interval)
+        elif (now - self.last_resync).seconds > \
                 self.service_resync_interval:
-            if not self.needs_resync:
-                self.needs_resync = True
-                LOG.debug(
-                    'Forcing resync of services on resync timer (%d seconds).'
-                    % self.service_resync_interval)
-                self.cache.services = {}
-                self.last_resync = now
-                self.lbdriver.flush_cache()
+            self.last_resync = now
+            # a plugin which can not tell what changed gets
+            # the same full resync as the resync timer
+            if not self.needs_resync and self.sync_changes():
+                full_resync = True
+        if full_resync and not self.needs_resync:
+            self.needs_resync = True
+            self.cache.services = {}
+            self.last_full_resync = now
+            self.last_resync = now
+            self.lbdriver.flush_cache()
         LOG.debug("tunnel_sync: periodic_resync need_resync: %s"
                   % str(self.needs_resync))
         # resync if we need to
@@ -431,23 +501,68 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         if not self.plugin_rpc:
             return
         pool_services = copy.deepcopy(self.cache.services)
+        pool_ids = []
         for pool_id in pool_services:
-            service = pool_services[pool_id]
-            if self.agent_host == service.agent_host:
-                try:
-                    LOG.debug("collecting stats for pool %s" % service.pool_id)
-                    stats = self.lbdriver.get_stats(
-                        self.plugin_rpc.get_service_by_pool_id(
-                            service.pool_id,
-                            self.conf.f5_global_routed_mode
-                        )
-                    )
-                    if stats:
-                        self.plugin_rpc.update_pool_stats(service.pool_id,
-                                                          stats)
-                except Exception as e:
+            if self.agent_host == pool_services[pool_id].agent_host:
+                pool_ids.append(pool_id)
+        services = []
+        try:
+            for (pool_id, service) in self.get_services(pool_ids):
+                services.append(service)
+            LOG.debug("collecting stats for %d pools" % len(services))
+            all_stats = self.lbdriver.get_all_stats(services)
+        except NotImplementedError:
+            all_stats = None
+        except Exception as e:
+            LOG.exception(_('Error collecting stats' + str(e.message)))
+            self.needs_resync = True
+            return
+        pools_stats = {}
+        for service in services:
+            if not service['pool']:
+                continue
+            pool_id = service['pool']['id']
+            try:
+                if all_stats is None:
+                    LOG.debug("collecting stats for pool %s" % pool_id)
+                    stats = self.lbdriver.get_stats(service)
+                else:
+                    stats = all_stats.get(pool_id)
+                if stats:
+                    pools_stats[pool_id] = stats
+            except Exception as e:
+                LOG.exception(_('Error upating stats' + str(e.message)))
+                self.needs_resync = True
+            if len(pools_stats) >= self.conf.stats_batch_size:
+                self._send_pools_stats(pools_stats)
+                pools_stats = {}
+        if pools_stats:
+            self._send_pools_stats(pools_stats)
+
+    def _send_pools_stats(self, pools_stats):
+        """ Send the stats of many pools. Falls back to one call per
+            pool for plugins without the batch call. """
+        if self.batch_stats:
+            try:
+                self.plugin_rpc.update_pools_stats(pools_stats)
+                return
+            except Exception as e:
+                # the dispatcher of an older plugin names the missing
+                # call in its error. Do not try it again.
+                if 'update_pools_stats' not in str(e):
                     LOG.exception(_('Error upating stats' + str(e.message)))
                     self.needs_resync = True
+                    return
+                LOG.info(_('plugin does not support update_pools_stats,'
+                           ' updating stats one pool at a time'))
+                self.batch_stats = False
+        for pool_id in pools_stats:
+            try:
+                self.plugin_rpc.update_pool_stats(pool_id,
+                                                  pools_stats[pool_id])
+            except Exception as e:
+                LOG.exception(_('Error upating stats' + str(e.message)))
+                self.needs_resync = True
 
     @periodic_task.periodic_task(spacing=600)
     def backup_configuration(self, context):
@@ -466,6 +581,8 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             if self.agent_host == self.cache.services[service].agent_host:
                 known_services.add(service)
         try:
+            # changes made from here on are reconciled by sync_changes
+            changes = self._get_pool_changes(None)
             # this produces a list of active pools for this agent
             # or for this agents env + group if using specific env
             active_pools = self.plugin_rpc.get_active_pools()
@@ -482,9 +599,10 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             for deleted_id in known_services - active_pool_ids:
                 self.destroy_service(deleted_id)
             # validate each service we are supposed to know about
-            for pool_id in active_pool_ids:
-                if not self.cache.get_by_pool_id(pool_id):
-                    self.validate_service(pool_id)
+            unknown_pool_ids = [pool_id for pool_id in active_pool_ids
+                                if not self.cache.get_by_pool_id(pool_id)]
+            for (pool_id, service) in self.get_services(unknown_pool_ids):
+                self.validate_service(pool_id, service)
             # this produces a list of pools with pending tasks
             # to be performed
             pending_pools = self.plugin_rpc.get_pending_pools()
@@ -495,8 +613,8 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             LOG.debug(_('plugin produced the list of pending pool ids: %s'
                         % pending_pool_ids))
             # complete each pending task
-            for pool_id in pending_pool_ids:
-                self.refresh_service(pool_id)
+            for (pool_id, service) in self.get_services(pending_pool_ids):
+                self.refresh_service(pool_id, service)
             # get a list of any cached service we know now after
             # refreshing services
             known_services = set()
@@ -508,20 +626,107 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             # remove any orphaned services we find on the bigips
             all_pools = self.plugin_rpc.get_all_pools()
             self.remove_orphans(all_pools)
+            if changes:
+                self.change_epoch = changes['epoch']
+                self.change_generation = changes['generation']
         except Exception:
             LOG.exception(_('Unable to retrieve ready services'))
             resync = True
         return resync
 
-    @log.log
-    def validate_service(self, pool_id):
+    def _get_pool_changes(self, generation):
+        """ Pools the plugin changed since generation, None if the
+            plugin does not support change generations """
+        try:
+            return self.plugin_rpc.get_pool_changes(generation)
+        except Exception as exc:
+            LOG.debug('plugin did not provide pool changes: %s' % exc)
+            return None
+
+    def sync_changes(self):
+        """ Reconcile the pools the plugin changed since the last
+            sync. Returns True if a full resync is needed instead. """
         if not self.plugin_rpc:
-            return
+            return False
+        if self.change_generation is None:
+            return True
+        changes = self._get_pool_changes(self.change_generation)
+        if not changes or changes['epoch'] != self.change_epoch or \
+                changes['pools'] is None:
+            LOG.debug('plugin can not tell pool changes since generation'
+                      ' %s, resyncing all services' % self.change_generation)
+            self.change_generation = None
+            return True
+        pool_ids = set()
+        for pool in changes['pools']:
+            if self.agent_host == pool['agent_host']:
+                pool_ids.add(pool['pool_id'])
+        LOG.debug('plugin changed %d pools since generation %d'
+                  % (len(pool_ids), self.change_generation))
         try:
-            service = self.plugin_rpc.get_service_by_pool_id(
+            for (pool_id, service) in self.get_services(pool_ids):
+                if not service['pool']:
+                    if self.cache.get_by_pool_id(pool_id):
+                        self.destroy_service(pool_id)
+                elif _service_is_pending(service):
+                    self.refresh_service(pool_id, service)
+                else:
+                    self.validate_service(pool_id, service)
+        except Exception:
+            LOG.exception(_('Unable to sync changed services'))
+            return True
+        self.change_generation = changes['generation']
+        return False
+
+    def get_services(self, pool_ids):
+        """ Generate (pool_id, service) for pool_ids, requesting
+            the service definitions from the plugin in batches """
+        pool_ids = list(pool_ids)
+        batch_size = max(self.conf.service_batch_size, 1)
+        for index in range(0, len(pool_ids), batch_size):
+            batch = pool_ids[index:index + batch_size]
+            services = self._get_services_batch(batch)
+            for pool_id in batch:
+                yield (pool_id, services.get(pool_id, {'pool': None}))
+
+    def _get_services_batch(self, pool_ids):
+        """ Service definitions by pool id for a batch of pools. Falls
+            back to one call per pool for plugins without the batch
+            call. """
+        if self.batch_services:
+            try:
+                return self.plugin_rpc.get_services_by_pool_ids(
+                    pool_ids,
+                    self.conf.f5_global_routed_mode
+                )
+            except Exception as exc:
+                LOG.debug('plugin did not provide services in a batch: %s'
+                          % exc)
+                # the dispatcher of an older plugin names the missing
+                # call in its error. Do not try it again.
+                if 'get_services_by_pool_ids' in str(exc):
+                    LOG.info(_('plugin does not support'
+                               ' get_services_by_pool_ids, requesting'
+                               ' services one pool at a time'))
+                    self.batch_services = False
+        services = {}
+        for pool_id in pool_ids:
+            services[pool_id] = self.plugin_rpc.get_service_by_pool_id(
                 pool_id,
                 self.conf.f5_global_routed_mode
             )
+        return services
+
+    @log.log
+    def validate_service(self, pool_id, service=None):
+        if not self.plugin_rpc:
+            return
+        try:
+            if not service:
+                service = self.plugin_rpc.get_service_by_pool_id(
+                    pool_id,
+                    self.conf.f5_global_routed_mode
+                )
             self.cache.put(service, self.agent_host)
             if not self.lbdriver.exists(service):
                 LOG.error(_('active pool %s is not on BIG-IP.. syncing'
@@ -541,14 +746,15 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
                                 str(e.message)), pool_id)
 
     @log.log
-    def refresh_service(self, pool_id):
+    def refresh_service(self, pool_id, service=None):
         if not self.plugin_rpc:
             return
         try:
-            service = self.plugin_rpc.get_service_by_pool_id(
-                pool_id,
-                self.conf.f5_global_routed_mode
-            )
+            if not service:
+                service = self.plugin_rpc.get_service_by_pool_id(
+                    pool_id,
+                    self.conf.f5_global_routed_mode
+                )
             self.cache.put(service, self.agent_host)
             self.lbdriver.sync(service)
         except NeutronException as exc:
@@ -15,6 +15,7 @@
 
 # Service resync interval
 RESYNC_INTERVAL = 300
+FULL_RESYNC_INTERVAL = 3600
 
 # Topic for tunnel notifications between the plugin and agent
 TUNNEL = 'tunnel'
@@ -33,3 +34,6 @@ AGENT_BINARY_NAME = 'f5-oslbaasv1-agent'
 # RPC channel names
 TOPIC_PROCESS_ON_HOST = 'f5-lbaas-process-on-controller'
 TOPIC_LOADBALANCER_AGENT = 'f5-lbaas-process-on-agent'
+
+# Status of objects removed from the data model in batched status updates
+STATUS_DESTROYED = 'DESTROYED'
@@ -42,6 +42,10 @@ from f5.oslbaasv1agent.drivers.bigip.lbaas_bigip \
     import LBaaSBuilderBigipObjects, LBaaSBuilderBigipIApp
 from f5.oslbaasv1agent.drivers.bigip.lbaas_bigiq import LBaaSBuilderBigiqIApp
 from f5.oslbaasv1agent.drivers.bigip.utils import serialized
+from f5.oslbaasv1agent.drivers.bigip.utils import RequestScheduler
+from f5.oslbaasv1agent.drivers.bigip.utils import DeviceFanout
+from f5.oslbaasv1agent.drivers.bigip.utils import ClusterSyncScheduler
+import f5.oslbaasv1agent.drivers.bigip.constants as lbaasv1constants
 
 from f5.bigip import bigip as f5_bigip
 from f5.common import constants as f5const
@@ -54,6 +58,7 @@ import uuid
 import urllib2
 import datetime
 import hashlib
+import random
 from time import time
 import logging as std_logging
 
@@ -70,6 +75,18 @@ except:
     PLUGIN_CREATED_FLAG = plugin_const.ACTIVE
 # pylint: enable=bare-except
 
+# first wait in seconds before retrying a failed cluster sync
+SYNC_RETRY_INITIAL_DELAY = 10
+
+# member statuses which are updated from BIG-IP monitor states
+MEMBER_STATUS_UPDATE_STATES = [plugin_const.ACTIVE,
+                               plugin_const.DOWN,
+                               plugin_const.INACTIVE]
+if PLUGIN_CREATED_FLAG not in MEMBER_STATUS_UPDATE_STATES:
+    MEMBER_STATUS_UPDATE_STATES.append(PLUGIN_CREATED_FLAG)
+# BIG-IP monitor states of members which are up
+MONITOR_UP_STATES = ['MONITOR_STATUS_UP', 'MONITOR_STATUS_UNCHECKED']
+
 # configuration objects specific to iControl driver
 OPTS = [
     cfg.StrOpt(
@@ -138,6 +155,11 @@ OPTS = [
         'f5_sync_mode', default='replication',
         help=_('The sync mechanism: autosync or replication'),
     ),
+    cfg.FloatOpt(
+        'f5_sync_window', default=2.0,
+        help=_('Seconds to collect config-sync requests in autosync'
+               ' mode before syncing the device group once'),
+    ),
     cfg.StrOpt(
         'f5_vtep_folder', default='Common',
         help=_('Folder for the VTEP SelfIP'),
@@ -154,6 +176,11 @@ OPTS = [
         'f5_populate_static_arp', default=True,
         help=_('create static arp entries based on service entries'),
     ),
+    cfg.FloatOpt(
+        'f5_fdb_batch_window', default=0.5,
+        help=_('Seconds to collect L2 population updates for a tunnel'
+               ' before writing its fdb records to the device once'),
+    ),
     cfg.StrOpt(
         'vlan_binding_driver',
         default=None,
@@ -206,6 +233,10 @@ OPTS = [
         'icontrol_connection_timeout', default=30,
         help=_('How many seconds to timeout a connection to BIG-IP'),
     ),
+    cfg.StrOpt(
+        'icontrol_wsdl_cache_dir', default='$state_path/f5-icontrol-wsdl',
+        help=_('Directory to cache iControl WSDLs per TMOS version'),
+    ),
     cfg.IntOpt(
         'icontrol_connection_retry_interval', default=10,
         help=_('How many seconds to wait between retry connection attempts'),
@@ -223,6 +254,22 @@ OPTS = [
         help=_('How many routing tables the BIG-IP will allocate per tenant'
                ' in order to accommodate overlapping IP subnets'),
     ),
+    cfg.IntOpt(
+        'max_concurrent_tenants', default=4,
+        help=_('How many tenants can have provisioning requests running'
+               ' at the same time. Requests for the same tenant always'
+               ' run in order.'),
+    ),
+    cfg.IntOpt(
+        'max_concurrent_device_requests', default=1,
+        help=_('How many requests the agent runs on one BIG-IP at'
+               ' the same time when configuring all devices at once'),
+    ),
+    cfg.BoolOpt(
+        'f5_cast_status_updates', default=False,
+        help=_('Send object status updates to the plugin without'
+               ' waiting for the reply'),
+    ),
 ]
 
 
@@ -259,7 +306,15 @@ class iControlDriver(LBaaSBaseDriver):
         self.hostnames = None
         self.device_type = conf.f5_device_type
         self.plugin_rpc = None
+        # None until the plugin has answered an update_statuses call
+        self.batch_statuses = None
         self.__last_connect_attempt = None
+        self.service_queue = RequestScheduler(
+            self.conf.max_concurrent_tenants)
+        self.device_fanout = DeviceFanout(
+            self.conf.max_concurrent_device_requests)
+        self.sync_scheduler = ClusterSyncScheduler(
+            self._sync_cluster, self.conf.f5_sync_window)
 
         # BIG-IP containers
         self.__bigips = {}
@@ -337,6 +392,7 @@ class iControlDriver(LBaaSBaseDriver):
         if self.l3_binding:
             LOG.debug('Getting BIG-IP MAC Address for L3 Binding')
             self.l3_binding.register_bigip_mac_addresses()
+        self._load_network_caches()
 
     def _init_bigip_managers(self):
         """ Setup the managers that create big-ip configurations. """
@@ -454,6 +510,9 @@ class iControlDriver(LBaaSBaseDriver):
             if self.conf.icontrol_connection_timeout:
                 f5const.CONNECTION_TIMEOUT = \
                     self.conf.icontrol_connection_timeout
+            if self.conf.icontrol_wsdl_cache_dir:
+                f5const.WSDL_VERSION_CACHE_DIR = \
+                    self.conf.icontrol_wsdl_cache_dir
 
             first_bigip = self._open_bigip(self.hostnames[0])
             self._init_bigip(first_bigip, self.hostnames[0], None)
@@ -539,9 +598,6 @@ class iControlDriver(LBaaSBaseDriver):
         bigip.mac_addresses = bigip.interface.get_mac_addresses()
         bigip.device_interfaces = \
             bigip.interface.get_interface_macaddresses_dict()
-        bigip.assured_networks = []
-        bigip.assured_tenant_snat_subnets = {}
-        bigip.assured_gateway_subnets = []
 
         if self.conf.f5_ha_type != 'standalone':
             if self.conf.f5_sync_mode == 'autosync':
@@ -679,9 +735,16 @@ class iControlDriver(LBaaSBaseDriver):
     def flush_cache(self):
         """Remove cached objects so they can be created if necessary"""
         for bigip in self.get_all_bigips():
-            bigip.assured_networks = []
-            bigip.assured_tenant_snat_subnets = {}
-            bigip.assured_gateway_subnets = []
+            bigip.config_cache.flush()
+        if self.bigip_l2_manager:
+            self.bigip_l2_manager.fdb_writer.clear()
+        self._load_network_caches()
+
+    def _load_network_caches(self):
+        """ Load the route domain cache of all tenants at once """
+        if self.network_builder and self.conf.use_namespaces and \
+                self.connected:
+            self.network_builder.load_rds_cache()
 
     # pylint: disable=unused-argument
     @serialized('create_vip')
@@ -743,7 +806,6 @@ class iControlDriver(LBaaSBaseDriver):
     def create_pool_health_monitor(self, health_monitor, pool, service):
         """Create pool health monitor"""
         self._common_service_handler(service)
-        return True
 
     @serialized('update_health_monitor')
     @is_connected
@@ -793,6 +855,56 @@ class iControlDriver(LBaaSBaseDriver):
         """Get service stats"""
         # use pool stats because the pool_id is the
         # the service definition...
+        if not service['pool']:
+            return None
+        all_bigip_stats = self.device_fanout.run(
+            self._get_bigip_pool_stats, self.get_all_bigips(),
+            service['pool'], self._members_require_status_update(service))
+        return self._get_service_stats(service, all_bigip_stats)
+
+    @is_connected
+    def get_all_stats(self, services):
+        """ Get stats for many services. The stats and member states
+            of all pools are read once from each bigip. Returns the
+            stats keyed by pool id. """
+        services = [service for service in services if service['pool']]
+        query_members = False
+        for service in services:
+            if self._members_require_status_update(service):
+                query_members = True
+                break
+        bigips = self.get_all_bigips()
+        bigip_indexes = self.device_fanout.run(
+            self._get_bigip_stats_index, bigips, query_members)
+        all_stats = {}
+        for service in services:
+            pool = service['pool']
+            # only a failed device read above aborts the cycle,
+            # a pool whose stats can not be built is skipped
+            try:
+                all_bigip_stats = []
+                for (bigip, index) in zip(bigips, bigip_indexes):
+                    all_bigip_stats.append(self._get_indexed_pool_stats(
+                        bigip, index, pool,
+                        self._members_require_status_update(service)))
+                all_stats[pool['id']] = \
+                    self._get_service_stats(service, all_bigip_stats)
+            except Exception as exc:
+                LOG.exception(_('Error collecting stats of pool %s: %s'
+                                % (pool['id'], exc.message)))
+        return all_stats
+
+    @staticmethod
+    def _members_require_status_update(service):
+        """ Does any member have a status we update from monitors? """
+        for member in service.get('members', []):
+            if member['status'] in MEMBER_STATUS_UPDATE_STATES:
+                return True
+        return False
+
+    def _get_service_stats(self, service, all_bigip_stats):
+        """ Sum the pool stats and merge the member monitor
+            states collected from each bigip """
         stats = {}
         stats[lb_const.STATS_IN_BYTES] = 0
         stats[lb_const.STATS_OUT_BYTES] = 0
@@ -800,19 +912,18 @@ class iControlDriver(LBaaSBaseDriver):
         stats[lb_const.STATS_TOTAL_CONNECTIONS] = 0
         # add a members stats return dictionary
         members = {}
-        for hostbigip in self.get_all_bigips():
+        # only query BIG-IP pool members if they
+        # not in a state indicating provisioning or error
+        # provisioning the pool member
+        update_if_status = MEMBER_STATUS_UPDATE_STATES
+        for bigip_stats in all_bigip_stats:
             # It appears that stats are collected for pools in a pending delete
             # state which means that if those messages are queued (or delayed)
             # it can result in the process of a stats request after the pool
-            # and tenant are long gone. Check if the tenant exists.
-            if not service['pool'] or not hostbigip.system.folder_exists(
-               bigip_interfaces.OBJ_PREFIX + service['pool']['tenant_id']):
+            # and tenant are long gone.
+            if bigip_stats is None:
                 return None
-            pool = service['pool']
-            pool_stats = hostbigip.pool.get_statistics(
-                name=pool['id'],
-                folder=pool['tenant_id'],
-                config_mode=self.conf.icontrol_config_mode)
+            (pool_stats, monitor_states) = bigip_stats
             if 'STATISTIC_SERVER_SIDE_BYTES_IN' in pool_stats:
                 stats[lb_const.STATS_IN_BYTES] += \
                     pool_stats['STATISTIC_SERVER_SIDE_BYTES_IN']
@@ -822,74 +933,95 @@ class iControlDriver(LBaaSBaseDriver):
                     pool_stats['STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS']
                 stats[lb_const.STATS_TOTAL_CONNECTIONS] += \
                     pool_stats['STATISTIC_SERVER_SIDE_TOTAL_CONNECTIONS']
-                # are there members to update status
-                if 'members' in service:
-                    # only query BIG-IP pool members if they
-                    # not in a state indicating provisioning or error
-                    # provisioning the pool member
-                    some_members_require_status_update = False
-                    update_if_status = [plugin_const.ACTIVE,
-                                        plugin_const.DOWN,
-                                        plugin_const.INACTIVE]
-                    if PLUGIN_CREATED_FLAG not in update_if_status:
-                        update_if_status.append(PLUGIN_CREATED_FLAG)
-
+                # are we have members who are in a
+                # state to update there status
+                if monitor_states is not None:
                     for member in service['members']:
                         if member['status'] in update_if_status:
-                            some_members_require_status_update = True
-                    # are we have members who are in a
-                    # state to update there status
-                    if some_members_require_status_update:
-                        # query pool members on each BIG-IP
-                        monitor_states = \
-                            hostbigip.pool.get_members_monitor_status(
-                                name=pool['id'],
-                                folder=pool['tenant_id'],
-                                config_mode=self.conf.icontrol_config_mode
-                            )
-                        for member in service['members']:
-                            if member['status'] in update_if_status:
-                                # create the entry for this
-                                # member in the return status
-                                # dictionary set to ACTIVE
-                                if not member['id'] in members:
-                                    members[member['id']] = \
-                                        {'status': plugin_const.INACTIVE}
-                                # check if it down or up by monitor
-                                # and update the status
-                                for state in monitor_states:
-                                    # matched the pool member
-                                    # by address and port number
-                                    if member['address'] == \
-                                            strip_domain_address(
-                                            state['addr']) and \
-                                            int(member['protocol_port']) == \
-                                            int(state['port']):
-                                        # if the monitor says member is up
-                                        if state['state'] == \
-                                                'MONITOR_STATUS_UP' or \
-                                           state['state'] == \
-                                                'MONITOR_STATUS_UNCHECKED':
-                                            # set ACTIVE as long as the
-                                            # status was not set to 'DOWN'
-                                            # on another BIG-IP
-                                            if members[
-                                                member['id']]['status'] != \
-                                                    'DOWN':
-                                                if member['admin_state_up']:
-                                                    members[member['id']][
-                                                        'status'] = \
-                                                        plugin_const.ACTIVE
-                                                else:
-                                                    members[member['id']][
-                                                        'status'] = \
-                                                        plugin_const.INACTIVE
-                                        else:
-                                            members[member['id']]['status'] = \
-                                                plugin_const.DOWN
+                            # create the entry for this
+                            # member in the return status
+                            # dictionary set to ACTIVE
+                            if not member['id'] in members:
+                                members[member['id']] = \
+                                    {'status': plugin_const.INACTIVE}
+                            # check if it down or up by monitor
+                            # and update the status. monitor states
+                            # are keyed by address and port number
+                            state = monitor_states.get(
+                                (member['address'],
+                                 int(member['protocol_port'])))
+                            if state is None:
+                                continue
+                            # if the monitor says member is up
+                            if state in MONITOR_UP_STATES:
+                                # set ACTIVE as long as the
+                                # status was not set to 'DOWN'
+                                # on another BIG-IP
+                                if members[member['id']]['status'] != \
+                                        'DOWN':
+                                    if member['admin_state_up']:
+                                        members[member['id']]['status'] = \
+                                            plugin_const.ACTIVE
+                                    else:
+                                        members[member['id']]['status'] = \
+                                            plugin_const.INACTIVE
+                            else:
+                                members[member['id']]['status'] = \
+                                    plugin_const.DOWN
         stats['members'] = members
         return stats
 
+    def _get_bigip_pool_stats(self, bigip, pool, query_members):
+        """ Get pool stats and member monitor states from one bigip.
+            Returns None if the tenant folder does not exist. """
+        if not bigip.system.folder_exists(
+                bigip_interfaces.OBJ_PREFIX + pool['tenant_id']):
+            return None
+        pool_stats = bigip.pool.get_statistics(
+            name=pool['id'],
+            folder=pool['tenant_id'],
+            config_mode=self.conf.icontrol_config_mode)
+        monitor_states = None
+        if query_members and 'STATISTIC_SERVER_SIDE_BYTES_IN' in pool_stats:
+            # query pool members on each BIG-IP
+            monitor_states = _get_monitor_state_map(
+                bigip.pool.get_members_monitor_status(
+                    name=pool['id'],
+                    folder=pool['tenant_id'],
+                    config_mode=self.conf.icontrol_config_mode
+                )
+            )
+        return (pool_stats, monitor_states)
+
+    @staticmethod
+    def _get_bigip_stats_index(bigip, query_members):
+        """ Get stats and member states of all pools on one bigip,
+            keyed by (partition, pool name) """
+        index = {'pools': bigip.pool.get_all_statistics(),
+                 'members': None}
+        if query_members:
+            index['members'] = {}
+            all_members = bigip.pool.get_all_members_monitor_status()
+            for key in all_members:
+                index['members'][key] = \
+                    _get_monitor_state_map(all_members[key])
+        return index
+
+    @staticmethod
+    def _get_indexed_pool_stats(bigip, index, pool, query_members):
+        """ Look up the stats of a pool in a bigip stats index.
+            Returns None if the tenant folder does not exist. """
+        folder = bigip_interfaces.OBJ_PREFIX + pool['tenant_id']
+        if not bigip.system.folder_exists(folder):
+            return None
+        key = (folder, bigip_interfaces.prefixed(pool['id']))
+        pool_stats = index['pools'].get(key, {})
+        monitor_states = None
+        if query_members and index['members'] is not None and \
+                'STATISTIC_SERVER_SIDE_BYTES_IN' in pool_stats:
+            monitor_states = index['members'].get(key, {})
+        return (pool_stats, monitor_states)
+
     @serialized('remove_orphans')
     def remove_orphans(self, all_pools):
         """ Remove out-of-date configuration on big-ips """
@@ -898,19 +1030,26 @@ class iControlDriver(LBaaSBaseDriver):
         for pool in all_pools:
             existing_tenants.append(pool['tenant_id'])
             existing_pools.append(pool['pool_id'])
-        for bigip in self.get_all_bigips():
+
+        def purge_orphaned_contents(bigip):
+            """ Purge pools and folder contents on one bigip """
             bigip.pool.purge_orphaned_pools(existing_pools)
-        for bigip in self.get_all_bigips():
             bigip.system.purge_orphaned_folders_contents(existing_tenants)
+        self.device_fanout.run(purge_orphaned_contents, self.get_all_bigips())
 
         sudslog = std_logging.getLogger('suds.client')
         sudslog.setLevel(std_logging.FATAL)
-        for bigip in self.get_all_bigips():
-            bigip.system.force_root_folder()
-        sudslog.setLevel(std_logging.ERROR)
+        try:
+            self.device_fanout.run(
+                lambda bigip: bigip.system.force_root_folder(),
+                self.get_all_bigips())
+        finally:
+            sudslog.setLevel(std_logging.ERROR)
 
-        for bigip in self.get_all_bigips():
-            bigip.system.purge_orphaned_folders(existing_tenants)
+        self.device_fanout.run(
+            lambda bigip: bigip.system.purge_orphaned_folders(
+                existing_tenants),
+            self.get_all_bigips())
 
     def fdb_add(self, fdb):
         """ Add (L2toL3) forwarding database entries """
@@ -972,6 +1111,11 @@ class iControlDriver(LBaaSBaseDriver):
                 self.conf.f5_global_routed_mode
             )
         if service['pool']:
+            # the pool was found missing or stale on a device, so
+            # reload the cached pools of the tenant folder
+            folder = bigip_interfaces.prefixed(service['pool']['tenant_id'])
+            for bigip in self.get_all_bigips():
+                bigip.config_cache.invalidate('pool', folder)
             self._common_service_handler(service)
         else:
             LOG.debug("Attempted sync of deleted pool")
@@ -998,11 +1142,14 @@ class iControlDriver(LBaaSBaseDriver):
         if use_bigiq:
             return self.lbaas_builder_bigiq_iapp.exists(service)
         else:
+            # validation must see pools which config-sync or a manual
+            # change added or removed, so do not trust the cache
             bigip = self.get_bigip()
             return bigip.pool.exists(
                 name=service['pool']['id'],
                 folder=service['pool']['tenant_id'],
-                config_mode=self.conf.icontrol_config_mode)
+                config_mode=self.conf.icontrol_config_mode,
+                use_cache=False)
 
     def _common_service_handler(self, service):
         """ Assure that the service is configured on bigip(s) """
@@ -1082,9 +1229,9 @@ class iControlDriver(LBaaSBaseDriver):
 
         self._update_service_status(service)
 
-        start_time = time()
-        self.sync_if_clustered()
-        LOG.debug("    final sync took %.5f secs" % (time() - start_time))
+        # nothing after this depends on the sync, so let it
+        # coalesce with the syncs of other services.
+        self.sync_if_clustered(wait=False)
 
     def _update_service_status(self, service):
         """ Update status of objects in OpenStack """
@@ -1092,67 +1239,117 @@ class iControlDriver(LBaaSBaseDriver):
         # plugin_rpc may not be set when unit testing
         if not self.plugin_rpc:
             return
-        self._update_members_status(service['members'])
-        self._update_pool_status(service['pool'])
-        self._update_pool_monitors_status(service)
-        self._update_vip_status(service['vip'])
+        updates = []
+        self._update_members_status(service['members'], updates)
+        self._update_pool_status(service['pool'], updates)
+        self._update_pool_monitors_status(service, updates)
+        self._update_vip_status(service['vip'], updates)
+        if updates:
+            start_time = time()
+            self._send_statuses(updates)
+            LOG.debug("            update_statuses for %d objects"
+                      " took %.5f secs" % (len(updates), time() - start_time))
+
+    def _send_statuses(self, updates):
+        """ Send status updates to the plugin in one call. Falls back
+            to one call per object for plugins without the batch call.
+            A cast cannot report a missing call, so the updates are
+            only cast once the plugin has answered a batch call. """
+        if self.batch_statuses is not False:
+            cast = self.batch_statuses and self.conf.f5_cast_status_updates
+            try:
+                self.plugin_rpc.update_statuses(updates, cast=cast)
+                self.batch_statuses = True
+                return
+            except Exception as exc:
+                LOG.debug('plugin did not take status updates in a batch: %s'
+                          % exc)
+                # the dispatcher of an older plugin names the missing
+                # call in its error. Do not try it again.
+                if 'update_statuses' in str(exc):
+                    LOG.info(_('plugin does not support update_statuses,'
+                               ' updating status one object at a time'))
+                    self.batch_statuses = False
+        for (object_type, object_id, status, status_description) \
+                in updates:
+            try:
+                self._send_status(object_type, object_id, status,
+                                  status_description)
+            except Exception as exc:
+                LOG.error(_("Plugin update %s %s to %s error: %s"
+                            % (object_type, object_id, status,
+                               exc.message)))
+
+    def _send_status(self, object_type, object_id, status,
+                     status_description):
+        """ Send one status update with the per object plugin calls """
+        destroyed = status == lbaasv1constants.STATUS_DESTROYED
+        if object_type == 'member':
+            if destroyed:
+                self.plugin_rpc.member_destroyed(object_id)
+            else:
+                self.plugin_rpc.update_member_status(
+                    object_id, status=status,
+                    status_description=status_description)
+        elif object_type == 'pool':
+            if destroyed:
+                self.plugin_rpc.pool_destroyed(object_id)
+            else:
+                self.plugin_rpc.update_pool_status(
+                    object_id, status=status,
+                    status_description=status_description)
+        elif object_type == 'health_monitor':
+            (health_monitor_id, pool_id) = object_id
+            if destroyed:
+                self.plugin_rpc.health_monitor_destroyed(
+                    health_monitor_id=health_monitor_id, pool_id=pool_id)
+            else:
+                self.plugin_rpc.update_health_monitor_status(
+                    pool_id=pool_id, health_monitor_id=health_monitor_id,
+                    status=status, status_description=status_description)
+        elif object_type == 'vip':
+            if destroyed:
+                self.plugin_rpc.vip_destroyed(object_id)
+            else:
+                self.plugin_rpc.update_vip_status(
+                    object_id, status=status,
+                    status_description=status_description)
 
-    def _update_members_status(self, members):
+    @staticmethod
+    def _update_members_status(members, updates):
         """ Update member status in OpenStack """
         for member in members:
             if member['status'] == plugin_const.PENDING_CREATE:
-                start_time = time()
-                self.plugin_rpc.update_member_status(
-                    member['id'],
-                    status=PLUGIN_CREATED_FLAG,
-                    status_description='member created')
-                LOG.debug("            update_member_status"
-                          " took %.5f secs" % (time() - start_time))
+                updates.append(('member', member['id'],
+                                PLUGIN_CREATED_FLAG, 'member created'))
             elif member['status'] == plugin_const.PENDING_UPDATE:
-                start_time = time()
                 status = plugin_const.ACTIVE
                 if 'admin_state_up' in member and \
                         not member['admin_state_up']:
                     status = plugin_const.INACTIVE
-                self.plugin_rpc.update_member_status(
-                    member['id'],
-                    status=status,
-                    status_description='member updated')
-                LOG.debug("            update_member_status"
-                          " took %.5f secs" % (time() - start_time))
+                updates.append(('member', member['id'],
+                                status, 'member updated'))
             elif member['status'] == plugin_const.PENDING_DELETE:
-                try:
-                    self.plugin_rpc.member_destroyed(member['id'])
-                except Exception as exc:
-                    LOG.error(_("Plugin delete member %s error: %s"
-                                % (member['id'], exc.message)))
+                updates.append(('member', member['id'],
+                                lbaasv1constants.STATUS_DESTROYED, None))
 
-    def _update_pool_status(self, pool):
+    @staticmethod
+    def _update_pool_status(pool, updates):
         """ Update pool status in OpenStack """
         status = plugin_const.ACTIVE
         if 'admin_state_up' in pool and not pool['admin_state_up']:
             status = plugin_const.INACTIVE
         if pool['status'] == plugin_const.PENDING_UPDATE:
-            self.plugin_rpc.update_pool_status(
-                pool['id'],
-                status=status,
-                status_description='pool updated')
+            updates.append(('pool', pool['id'], status, 'pool updated'))
         elif pool['status'] == plugin_const.PENDING_CREATE:
-            self.plugin_rpc.update_pool_status(
-                pool['id'],
-                status=status,
-                status_description='pool created')
+            updates.append(('pool', pool['id'], status, 'pool created'))
         elif pool['status'] == plugin_const.PENDING_DELETE:
-            try:
-                self.plugin_rpc.pool_destroyed(pool['id'])
-            except Exception as exc:
-                LOG.error(_("Plugin destroy pool %s error: %s"
-                            % (pool['id'], exc.message)))
+            updates.append(('pool', pool['id'],
+                            lbaasv1constants.STATUS_DESTROYED, None))
 
-    def _update_pool_monitors_status(self, service):
+    @staticmethod
+    def _update_pool_monitors_status(service, updates):
         """ Update pool monitor status in OpenStack """
-        monitors_destroyed = []
-        monitors_updated = []
         pool = service['pool']
 
         LOG.debug("update_pool_monitors_status: service: %s" % service)
@@ -1167,36 +1364,19 @@ class iControlDriver(LBaaSBaseDriver):
             if monitor['id'] in health_monitors_status:
                 if health_monitors_status[monitor['id']] == \
                         plugin_const.PENDING_DELETE:
-                    monitors_destroyed.append(
-                        {'health_monitor_id': monitor['id'],
-                         'pool_id': pool['id']})
+                    updates.append(('health_monitor',
+                                    (monitor['id'], pool['id']),
+                                    lbaasv1constants.STATUS_DESTROYED, None))
                 elif health_monitors_status[monitor['id']] == \
                         plugin_const.PENDING_UPDATE or \
                         health_monitors_status[monitor['id']] == \
                         plugin_const.PENDING_CREATE:
-                    monitors_updated.append(
-                        {'pool_id': pool['id'],
-                         'health_monitor_id': monitor['id'],
-                         'status': plugin_const.ACTIVE,
-                         'status_description': 'monitor active'})
-
-        LOG.debug("Monitors to destroy: %s" % monitors_destroyed)
-        for monitor_destroyed in monitors_destroyed:
-            LOG.debug("Monitor destroying: %s" % monitor_destroyed)
-            self.plugin_rpc.health_monitor_destroyed(
-                **monitor_destroyed)
-        for monitor_updated in monitors_updated:
-            try:
-                self.plugin_rpc.update_health_monitor_status(
-                    **monitor_updated)
-            except Exception as exc:
-                if 'PENDING_DELETE' in str(exc):
-                    LOG.debug("Attempted to update monitor being deleted!")
-                else:
-                    LOG.debug(str(exc))
-                    raise
+                    updates.append(('health_monitor',
+                                    (monitor['id'], pool['id']),
+                                    plugin_const.ACTIVE, 'monitor active'))
 
-    def _update_vip_status(self, vip):
+    @staticmethod
+    def _update_vip_status(vip, updates):
         """ Update vip status in OpenStack """
         status = plugin_const.ACTIVE
         if 'admin_state_up' in vip and not vip['admin_state_up']:
@@ -1204,21 +1384,12 @@ class iControlDriver(LBaaSBaseDriver):
         if 'id' not in vip:
             return
         if vip['status'] == plugin_const.PENDING_CREATE:
-            self.plugin_rpc.update_vip_status(
-                vip['id'],
-                status=status,
-                status_description=None)
+            updates.append(('vip', vip['id'], status, None))
         elif vip['status'] == plugin_const.PENDING_UPDATE:
-            self.plugin_rpc.update_vip_status(
-                vip['id'],
-                status=status,
-                status_description=None)
+            updates.append(('vip', vip['id'], status, None))
         elif vip['status'] == plugin_const.PENDING_DELETE:
-            try:
-                self.plugin_rpc.vip_destroyed(vip['id'])
-            except Exception as exc:
-                LOG.error(_("Plugin delete vip %s error: %s"
-                            % (vip['id'], exc.message)))
+            updates.append(('vip', vip['id'],
+                            lbaasv1constants.STATUS_DESTROYED, None))
 
     def _service_to_traffic_group(self, service):
         """ Hash service tenant id to index of traffic group """
@@ -1322,35 +1493,50 @@ class iControlDriver(LBaaSBaseDriver):
             self.__traffic_groups.remove('traffic-group-local-only')
         self.__traffic_groups.sort()
 
-    def sync_if_clustered(self):
-        """ sync device group if not in replication mode """
+    def sync_if_clustered(self, wait=True):
+        """ sync device group if not in replication mode.
+            Waits for the sync if the caller depends on it. """
         if self.conf.f5_ha_type == 'standalone' or \
                 self.conf.f5_sync_mode == 'replication' or \
                 len(self.get_all_bigips()) < 2:
             return
-        bigip = self.get_bigip()
-        self._sync_with_retries(bigip)
+        start_time = time()
+        self.sync_scheduler.request(wait=wait)
+        if wait:
+            LOG.debug("    sync barrier took %.5f secs"
+                      % (time() - start_time))
+
+    def _sync_cluster(self):
+        """ sync device group now """
+        self._sync_with_retries(self.get_bigip())
 
     def _sync_with_retries(self, bigip, force_now=False,
-                           attempts=4, retry_delay=130):
-        """ sync device group """
+                           attempts=4, retry_delay=130, deadline=900):
+        """ sync device group, backing off exponentially between
+            attempts up to retry_delay seconds, for at most deadline
+            seconds in total """
+        give_up_time = time() + deadline
+        delay = SYNC_RETRY_INITIAL_DELAY
         for attempt in range(1, attempts + 1):
             LOG.debug('Syncing Cluster... attempt %d of %d'
                       % (attempt, attempts))
             try:
                 if attempt != 1:
                     force_now = False
-                bigip.cluster.sync(bigip.device_group_name,
-                                   force_now=force_now)
+                bigip.cluster.sync(
+                    bigip.device_group_name, force_now=force_now,
+                    deadline=max(give_up_time - time(), 1))
                 LOG.debug('Cluster synced.')
                 return
             except Exception as exc:
                 LOG.error('ERROR: Cluster sync failed: %s' % exc)
-                if attempt == attempts:
+                if attempt == attempts or time() + delay >= give_up_time:
                     raise
+                sleep_time = random.uniform(delay / 2.0, delay)
                 LOG.error('Wait another %d seconds for devices '
-                          'to recover from failed sync.' % retry_delay)
-                greenthread.sleep(retry_delay)
+                          'to recover from failed sync.' % sleep_time)
+                greenthread.sleep(sleep_time)
+                delay = min(delay * 2, retry_delay)
 
 
 def _validate_bigip_version(bigip, hostname):
@@ -1368,3 +1554,15 @@ def _validate_bigip_version(bigip, hostname):
             % (hostname, f5const.MIN_TMOS_MAJOR_VERSION,
                f5const.MIN_TMOS_MINOR_VERSION))
     return major_version, minor_version
+
+
+def _get_monitor_state_map(monitor_states):
+    """ Map (address, port) to the monitor state of pool members.
+        If a member is listed more than once a down state wins. """
+    state_map = {}
+    for state in monitor_states:
+        key = (strip_domain_address(state['addr']), int(state['port']))
+        if key in state_map and state_map[key] not in MONITOR_UP_STATES:
+            continue
+        state_map[key] = state['state']
+    return state_map
@@ -23,8 +23,12 @@ from f5.bigip import exceptions as f5ex
 from f5.bigip.interfaces import prefixed
 from f5.bigip.exceptions import \
     VLANCreationException, VLANDeleteException
+from f5.common import constants as const
 
+from eventlet import greenthread
+from eventlet import semaphore
 from time import sleep, time
+import os
 import random
 
 from suds import WebFault
@@ -61,6 +65,143 @@ def _get_tunnel_fake_mac(network, local_ip):
     return mac_prefix + ':'.join("%02x" % octet for octet in mac)
 
 
+class TunnelFdbWriter(object):
+    """ Writes L2 records of tunnels to the devices in batches.
+
+        Record changes for a tunnel are collected for window seconds
+        and written to the device with one update of the tunnel's
+        record list. The records of each tunnel are mirrored in memory
+        from a read of the device, so a batch only writes when the
+        records changed. Static ARP entries for the changed records
+        are created or deleted together.
+
+        Other agents may write the same tunnels, so a mirror is only
+        used for window seconds after its read. Older mirrors are read
+        again before a batch writes the whole record list. A mirror is
+        also dropped when writing its tunnel fails, when the tunnel is
+        deleted and when the driver cache is flushed. """
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self.pending = {}
+        self.mirror = {}
+        self.changes_requested = 0
+        self.updates_performed = 0
+        self._locks = {}
+        self._timer = None
+
+    def update(self, bigip, tunnel_type, folder, tunnel_name, changes,
+               wait=False):
+        """ Queue record changes for a tunnel.
+
+            tunnel_type is the bigip interface of the tunnel, vxlan
+            or l2gre. changes maps mac addresses to a tuple of vtep
+            endpoint and ip address. An endpoint of None removes the
+            record. Later changes for a mac replace earlier ones. If
+            wait is set the tunnel is written before returning. """
+        if not changes:
+            return
+        # the same tunnel folder is named in several ways
+        folder = os.path.basename(str(folder).replace('~', '/'))
+        if folder != 'Common':
+            folder = prefixed(folder)
+        key = (bigip, tunnel_type, folder, tunnel_name)
+        if key not in self.pending:
+            self.pending[key] = {}
+        self.pending[key].update(changes)
+        self.changes_requested += len(changes)
+        if wait or self.window <= 0:
+            self._write_tunnel(key, self.pending.pop(key))
+        elif self._timer is None:
+            self._timer = greenthread.spawn_after(self.window, self._flush)
+
+    def forget(self, bigip, tunnel_name):
+        """ Drop pending changes and the mirror of a deleted tunnel """
+        for key in list(self.pending):
+            if key[0] == bigip and key[3] == tunnel_name:
+                del self.pending[key]
+        for key in list(self.mirror):
+            if key[0] == bigip and key[3] == tunnel_name:
+                del self.mirror[key]
+
+    def clear(self):
+        """ Drop all mirrored tunnel records """
+        self.mirror = {}
+
+    def _flush(self):
+        """ Write the tunnels with pending changes """
+        self._timer = None
+        # Take one tunnel at a time so changes queued while we
+        # write are never applied ahead of older ones.
+        while self.pending:
+            key, changes = self.pending.popitem()
+            try:
+                self._write_tunnel(key, changes)
+            except Exception as exc:
+                LOG.error('fdb update of tunnel %s on %s failed: %s'
+                          % (key[3], key[0].icontrol.hostname, str(exc)))
+        LOG.debug('fdb batch done - changes requested: %d'
+                  ' updates performed: %d'
+                  % (self.changes_requested, self.updates_performed))
+
+    def _write_tunnel(self, key, changes):
+        """ Apply record changes to a tunnel on its device """
+        if key not in self._locks:
+            self._locks[key] = semaphore.Semaphore()
+        with self._locks[key]:
+            (bigip, tunnel_type, folder, tunnel_name) = key
+            interface = getattr(bigip, tunnel_type)
+            (read_at, records) = self.mirror.get(key, (None, None))
+            if records is None or time() - read_at > self.window:
+                read_at = time()
+                records = {}
+                for record in interface.get_fdb_entry(
+                        tunnel_name=tunnel_name, folder=folder):
+                    records[record['name']] = record['endpoint']
+            new_records = dict(records)
+            arps_to_create = {}
+            arps_to_delete = []
+            for mac_address in changes:
+                (endpoint, ip_address) = changes[mac_address]
+                if endpoint:
+                    new_records[mac_address] = endpoint
+                    if ip_address:
+                        arps_to_create[ip_address] = mac_address
+                else:
+                    new_records.pop(mac_address, None)
+                    if ip_address:
+                        arps_to_delete.append(ip_address)
+            try:
+                if new_records != records:
+                    interface.set_fdb_records(
+                        tunnel_name=tunnel_name,
+                        records=[{'name': mac_address,
+                                  'endpoint': new_records[mac_address]}
+                                 for mac_address in sorted(new_records)],
+                        folder=folder)
+                    self.updates_performed += 1
+            except Exception:
+                self.mirror.pop(key, None)
+                raise
+            self.mirror[key] = (read_at, new_records)
+            if const.FDB_POPULATE_STATIC_ARP:
+                self._write_arps(bigip, folder, arps_to_create,
+                                 arps_to_delete)
+
+    def _write_arps(self, bigip, folder, arps_to_create, arps_to_delete):
+        """ Create and delete static ARP entries for tunnel records """
+        try:
+            if arps_to_delete:
+                bigip.arp.delete_multiple(ip_addresses=arps_to_delete,
+                                          folder=folder)
+            if arps_to_create:
+                bigip.arp.create_multiple(entries=arps_to_create,
+                                          folder=folder)
+        except Exception as exc:
+            LOG.error('could not update static arps on %s: %s'
+                      % (bigip.icontrol.hostname, str(exc)))
+
+
 class BigipL2Manager(object):
     """ Class for configuring L2 networks """
     def __init__(self, conf, vcmp_manager, fdb_connector, vlan_binding):
@@ -68,6 +209,7 @@ class BigipL2Manager(object):
         self.vcmp_manager = vcmp_manager
         self.fdb_connector = fdb_connector
         self.vlan_binding = vlan_binding
+        self.fdb_writer = TunnelFdbWriter(self.conf.f5_fdb_batch_window)
 
         self.interface_mapping = {}
         self.tagging_mapping = {}
@@ -126,8 +268,9 @@ class BigipL2Manager(object):
                         'Attempted to assure a network with no id..skipping.'))
             return
 
-        if network['id'] in bigip.assured_networks:
+        if bigip.config_cache.is_assured('network', network['id']):
             return
+        token = bigip.config_cache.get_token('network', network['id'])
 
         if network['id'] in self.conf.common_network_ids:
             LOG.debug(_('    assure_bigip_network: '
@@ -156,7 +299,7 @@ class BigipL2Manager(object):
                             ' Cannot setup network.'
             LOG.error(_(error_message))
             raise f5ex.InvalidNetworkType(error_message)
-        bigip.assured_networks.append(network['id'])
+        bigip.config_cache.set_assured('network', network['id'], token)
         if time() - start_time > .001:
             LOG.debug("        assure bigip network took %.5f secs" %
                       (time() - start_time))
@@ -414,8 +557,7 @@ class BigipL2Manager(object):
         else:
             LOG.error(_('Unsupported network type %s. Can not delete.'
                         % network['provider:network_type']))
-        if network['id'] in bigip.assured_networks:
-            bigip.assured_networks.remove(network['id'])
+        bigip.config_cache.clear_assured('network', network['id'])
 
     def _delete_device_vlan(self, bigip, network, network_folder):
         """ Delete tagged vlan on specific bigip """
@@ -466,6 +608,7 @@ class BigipL2Manager(object):
 
         bigip.vxlan.delete_all_fdb_entries(tunnel_name=tunnel_name,
                                            folder=network_folder)
+        self.fdb_writer.forget(bigip, tunnel_name)
         bigip.vxlan.delete_tunnel(name=tunnel_name,
                                   folder=network_folder)
         if self.fdb_connector:
@@ -478,6 +621,7 @@ class BigipL2Manager(object):
         # for each known vtep_endpoints to this tunnel
         bigip.l2gre.delete_all_fdb_entries(tunnel_name=tunnel_name,
                                            folder=network_folder)
+        self.fdb_writer.forget(bigip, tunnel_name)
         bigip.l2gre.delete_tunnel(name=tunnel_name,
                                   folder=network_folder)
         if self.fdb_connector:
@@ -547,37 +691,33 @@ class BigipL2Manager(object):
 
     def add_gre_fdbs(self, bigip, net_folder, fdb_info, vteps):
         """ Add gre fdb records """
-        network = fdb_info['network']
-        ip_address = fdb_info['ip_address']
-        mac_address = fdb_info['mac_address']
-        tunnel_name = _get_tunnel_name(network)
-        for vtep in vteps:
-            if mac_address:
-                mac_addr = mac_address
-            else:
-                mac_addr = _get_tunnel_fake_mac(network, vtep)
-            bigip.l2gre.add_fdb_entry(tunnel_name=tunnel_name,
-                                      mac_address=mac_addr,
-                                      vtep_ip_address=vtep,
-                                      arp_ip_address=ip_address,
-                                      folder=net_folder)
+        self._update_tunnel_fdbs(bigip, 'l2gre', net_folder, fdb_info,
+                                 vteps, remove=False)
 
     def add_vxlan_fdbs(self, bigip, net_folder, fdb_info, vteps):
         """ Add vxlan fdb records """
+        self._update_tunnel_fdbs(bigip, 'vxlan', net_folder, fdb_info,
+                                 vteps, remove=False)
+
+    def _update_tunnel_fdbs(self, bigip, tunnel_type, net_folder,
+                            fdb_info, vteps, remove):
+        """ Write the fdb records for a mac/ip behind vteps """
         network = fdb_info['network']
         ip_address = fdb_info['ip_address']
         mac_address = fdb_info['mac_address']
         tunnel_name = _get_tunnel_name(network)
+        changes = {}
         for vtep in vteps:
             if mac_address:
                 mac_addr = mac_address
             else:
                 mac_addr = _get_tunnel_fake_mac(network, vtep)
-            bigip.vxlan.add_fdb_entry(tunnel_name=tunnel_name,
-                                      mac_address=mac_addr,
-                                      vtep_ip_address=vtep,
-                                      arp_ip_address=ip_address,
-                                      folder=net_folder)
+            if remove:
+                changes[mac_addr] = (None, ip_address)
+            else:
+                changes[mac_addr] = (vtep, ip_address)
+        self.fdb_writer.update(bigip, tunnel_type, net_folder,
+                               tunnel_name, changes, wait=True)
 
     def delete_bigip_fdbs(self, bigip, net_folder, fdb_info, vteps_by_type):
         """ Delete fdb records for a mac/ip with specified vteps """
@@ -593,45 +733,25 @@ class BigipL2Manager(object):
 
     def delete_gre_fdbs(self, bigip, net_folder, fdb_info, vteps):
         """ delete gre fdb records """
-        network = fdb_info['network']
-        ip_address = fdb_info['ip_address']
-        mac_address = fdb_info['mac_address']
-        tunnel_name = _get_tunnel_name(network)
-        for vtep in vteps:
-            if mac_address:
-                mac_addr = mac_address
-            else:
-                mac_addr = _get_tunnel_fake_mac(network, vtep)
-            bigip.l2gre.delete_fdb_entry(tunnel_name=tunnel_name,
-                                         mac_address=mac_addr,
-                                         arp_ip_address=ip_address,
-                                         folder=net_folder)
+        self._update_tunnel_fdbs(bigip, 'l2gre', net_folder, fdb_info,
+                                 vteps, remove=True)
 
     def delete_vxlan_fdbs(self, bigip, net_folder, fdb_info, vteps):
         """ delete vxlan fdb records """
-        network = fdb_info['network']
-        ip_address = fdb_info['ip_address']
-        mac_address = fdb_info['mac_address']
-        tunnel_name = _get_tunnel_name(network)
-        for vtep in vteps:
-            if mac_address:
-                mac_addr = mac_address
-            else:
-                mac_addr = _get_tunnel_fake_mac(network, vtep)
-            bigip.vxlan.delete_fdb_entry(tunnel_name=tunnel_name,
-                                         mac_address=mac_addr,
-                                         arp_ip_address=ip_address,
-                                         folder=net_folder)
+        self._update_tunnel_fdbs(bigip, 'vxlan', net_folder, fdb_info,
+                                 vteps, remove=True)
 
     def add_bigip_fdb(self, bigip, fdb):
         """ Add entries from the fdb relevant to the bigip """
         for fdb_operation in \
             [{'network_type': 'vxlan',
               'get_tunnel_folder': bigip.vxlan.get_tunnel_folder,
-              'fdb_method': bigip.vxlan.add_fdb_entries},
+              'tunnel_type': 'vxlan',
+              'remove': False},
              {'network_type': 'gre',
               'get_tunnel_folder': bigip.l2gre.get_tunnel_folder,
-              'fdb_method': bigip.l2gre.add_fdb_entries}]:
+              'tunnel_type': 'l2gre',
+              'remove': False}]:
             self._operate_bigip_fdb(bigip, fdb, fdb_operation)
 
     def _operate_bigip_fdb(self, bigip, fdb, fdb_operation):
@@ -654,7 +774,7 @@ class BigipL2Manager(object):
         """
         network_type = fdb_operation['network_type']
         get_tunnel_folder = fdb_operation['get_tunnel_folder']
-        fdb_method = fdb_operation['fdb_method']
+        tunnel_type = fdb_operation['tunnel_type']
 
         for network in fdb:
             net_fdb = fdb[network]
@@ -669,8 +789,25 @@ class BigipL2Manager(object):
                             'tunnel_name': tunnel_name,
                             'net_fdb': net_fdb}
                 fdbs = self._get_bigip_network_fdbs(bigip, net_info)
-                if len(fdbs) > 0:
-                    fdb_method(fdb_entries=fdbs)
+                if tunnel_name in fdbs:
+                    self._queue_tunnel_fdbs(
+                        bigip, tunnel_type, fdbs[tunnel_name],
+                        tunnel_name, fdb_operation['remove'])
+
+    def _queue_tunnel_fdbs(self, bigip, tunnel_type, tunnel_fdbs,
+                           tunnel_name, remove):
+        """ Queue the l2 records of a tunnel in the fdb writer """
+        records = tunnel_fdbs['records']
+        changes = {}
+        for mac_address in records:
+            if remove:
+                endpoint = None
+            else:
+                endpoint = records[mac_address]['endpoint']
+            changes[mac_address] = \
+                (endpoint, records[mac_address]['ip_address'])
+        self.fdb_writer.update(bigip, tunnel_type, tunnel_fdbs['folder'],
+                               tunnel_name, changes)
 
     def _get_bigip_network_fdbs(self, bigip, net_info):
         """ Get network fdb entries to add to a bigip """
@@ -728,10 +865,12 @@ class BigipL2Manager(object):
         for fdb_operation in \
             [{'network_type': 'vxlan',
               'get_tunnel_folder': bigip.vxlan.get_tunnel_folder,
-              'fdb_method': bigip.vxlan.delete_fdb_entries},
+              'tunnel_type': 'vxlan',
+              'remove': True},
              {'network_type': 'gre',
               'get_tunnel_folder': bigip.l2gre.get_tunnel_folder,
-              'fdb_method': bigip.l2gre.delete_fdb_entries}]:
+              'tunnel_type': 'l2gre',
+              'remove': True}]:
             self._operate_bigip_fdb(bigip, fdb, fdb_operation)
 
     # Utilities
@@ -83,31 +83,41 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
     def _assure_pool_create(self, pool):
         """ Provision Pool - Create/Update """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_create(bigip, pool)
+        self.driver.device_fanout.run(
+            self.bigip_pool_manager.assure_bigip_pool_create,
+            self.driver.get_config_bigips(), pool)
 
     def _assure_pool_monitors(self, service):
         """
             Provision Health Monitors - Create/Update
         """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_monitors(bigip, service)
+        self.driver.device_fanout.run(
+            self.bigip_pool_manager.assure_bigip_pool_monitors,
+            self.driver.get_config_bigips(), service)
 
     def _assure_members(self, service, all_subnet_hints):
         """
             Provision Members - Create/Update
         """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            subnet_hints = all_subnet_hints[bigip.device_name]
+        def assure_bigip_members(bigip):
+            """ Members on one bigip """
             self.bigip_pool_manager.assure_bigip_members(
-                bigip, service, subnet_hints)
+                bigip, service, all_subnet_hints[bigip.device_name])
+        self.driver.device_fanout.run(
+            assure_bigip_members, self.driver.get_config_bigips())
 
         # avoids race condition:
         # deletion of pool member objects must sync before we
-        # remove the selfip from the peer bigips.
-        self.driver.sync_if_clustered()
+        # remove the selfip from the peer bigips. Creates and
+        # updates only need to sync eventually.
+        deleting = False
+        for member in service['members']:
+            if member['status'] == plugin_const.PENDING_DELETE:
+                deleting = True
+                break
+        self.driver.sync_if_clustered(wait=deleting)
 
     def _assure_vip(self, service, traffic_group, all_subnet_hints):
         """ Ensure the vip is on all bigips. """
@@ -115,35 +125,43 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
         if 'id' not in vip:
             return
 
-        bigips = self.driver.get_config_bigips()
-        for bigip in bigips:
-            subnet_hints = all_subnet_hints[bigip.device_name]
-            subnet = vip['subnet']
-
-            if vip['status'] == plugin_const.PENDING_CREATE or \
-               vip['status'] == plugin_const.PENDING_UPDATE:
-                self.bigip_vip_manager.assure_bigip_create_vip(
-                    bigip, service, traffic_group)
-                if subnet and subnet['id'] in \
-                        subnet_hints['check_for_delete_subnets']:
-                    del subnet_hints['check_for_delete_subnets'][subnet['id']]
-                if subnet and subnet['id'] not in \
-                        subnet_hints['do_not_delete_subnets']:
-                    subnet_hints['do_not_delete_subnets'].append(subnet['id'])
-
-            elif vip['status'] == plugin_const.PENDING_DELETE:
-                self.bigip_vip_manager.assure_bigip_delete_vip(bigip, service)
-                if subnet and subnet['id'] not in \
-                        subnet_hints['do_not_delete_subnets']:
-                    subnet_hints['check_for_delete_subnets'][subnet['id']] = \
-                        {'network': vip['network'],
-                         'subnet': subnet,
-                         'is_for_member': False}
+        self.driver.device_fanout.run(
+            self._assure_bigip_vip, self.driver.get_config_bigips(),
+            service, traffic_group, all_subnet_hints)
 
         # avoids race condition:
         # deletion of vip address must sync before we
-        # remove the selfip from the peer bigips.
-        self.driver.sync_if_clustered()
+        # remove the selfip from the peer bigips. Creates and
+        # updates only need to sync eventually.
+        self.driver.sync_if_clustered(
+            wait=vip['status'] == plugin_const.PENDING_DELETE)
+
+    def _assure_bigip_vip(self, bigip, service, traffic_group,
+                          all_subnet_hints):
+        """ Ensure the vip is on one bigip """
+        vip = service['vip']
+        subnet_hints = all_subnet_hints[bigip.device_name]
+        subnet = vip['subnet']
+
+        if vip['status'] == plugin_const.PENDING_CREATE or \
+           vip['status'] == plugin_const.PENDING_UPDATE:
+            self.bigip_vip_manager.assure_bigip_create_vip(
+                bigip, service, traffic_group)
+            if subnet and subnet['id'] in \
+                    subnet_hints['check_for_delete_subnets']:
+                del subnet_hints['check_for_delete_subnets'][subnet['id']]
+            if subnet and subnet['id'] not in \
+                    subnet_hints['do_not_delete_subnets']:
+                subnet_hints['do_not_delete_subnets'].append(subnet['id'])
+
+        elif vip['status'] == plugin_const.PENDING_DELETE:
+            self.bigip_vip_manager.assure_bigip_delete_vip(bigip, service)
+            if subnet and subnet['id'] not in \
+                    subnet_hints['do_not_delete_subnets']:
+                subnet_hints['check_for_delete_subnets'][subnet['id']] = \
+                    {'network': vip['network'],
+                     'subnet': subnet,
+                     'is_for_member': False}
 
     def _assure_pool_delete(self, service):
         """ Assure pool is deleted from big-ip """
@@ -151,8 +169,9 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
             return
 
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_delete(bigip, service)
+        self.driver.device_fanout.run(
+            self.bigip_pool_manager.assure_bigip_pool_delete,
+            self.driver.get_config_bigips(), service)
 
     def _check_monitor_delete(self, service):
         """If the pool is being deleted, then delete related objects"""
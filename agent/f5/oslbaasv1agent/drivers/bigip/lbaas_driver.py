@@ -14,6 +14,8 @@
 # limitations under the License.
 #
 
+from f5.oslbaasv1agent.drivers.bigip.utils import RequestScheduler
+
 
 class LBaaSBaseDriver(object):
     """ Abstract base LBaaS Driver class for interfacing
@@ -23,7 +25,7 @@ class LBaaSBaseDriver(object):
         self.agent_id = None
         self.plugin_rpc = None
         self.connected = False
-        self.service_queue = []
+        self.service_queue = RequestScheduler()
         self.agent_configurations = {}
 
     def set_context(self, context):
@@ -58,6 +60,10 @@ class LBaaSBaseDriver(object):
         """ Get Stats for a Pool Service """
         raise NotImplementedError()
 
+    def get_all_stats(self, services):
+        """ Get Stats for many Pool Services, keyed by pool id """
+        raise NotImplementedError()
+
     def exists(self, service):
         """ Check If LBaaS Service is Defined on Driver Target """
         raise NotImplementedError()
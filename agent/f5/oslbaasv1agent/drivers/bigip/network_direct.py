@@ -24,15 +24,71 @@ from neutron.common.exceptions import NeutronException
 
 from f5.bigip import exceptions as f5ex
 from f5.bigip.interfaces import strip_domain_address
+from f5.bigip import interfaces as bigip_interfaces
 from f5.oslbaasv1agent.drivers.bigip.selfips import BigipSelfIpManager
 from f5.oslbaasv1agent.drivers.bigip.snats import BigipSnatManager
 
-import itertools
+import bisect
 import netaddr
+import threading
 
 LOG = logging.getLogger(__name__)
 
 
+class SubnetIndex(object):
+    """ Subnet CIDRs placed in one route domain, indexed for
+        overlap checks.
+
+        CIDR blocks either nest or are disjoint. A block overlaps the
+        index if an indexed block starts inside it, or if one of its
+        supernets is indexed. Per IP version the first addresses of
+        the blocks are kept sorted, and the blocks are counted by
+        (version, first address, prefix length). Both are updated in
+        place as subnets are added and removed. """
+
+    def __init__(self):
+        self.subnets = {}
+        self._firsts = {4: [], 6: []}
+        self._blocks = {}
+
+    def __contains__(self, subnet_id):
+        return subnet_id in self.subnets
+
+    def add(self, subnet_id, cidr):
+        """ Index subnet_id with an IPNetwork cidr """
+        self.remove(subnet_id)
+        self.subnets[subnet_id] = cidr
+        bisect.insort(self._firsts[cidr.version], cidr.first)
+        block = (cidr.version, cidr.first, cidr.prefixlen)
+        self._blocks[block] = self._blocks.get(block, 0) + 1
+
+    def remove(self, subnet_id):
+        """ Drop subnet_id from the index """
+        cidr = self.subnets.pop(subnet_id, None)
+        if cidr is None:
+            return
+        firsts = self._firsts[cidr.version]
+        del firsts[bisect.bisect_left(firsts, cidr.first)]
+        block = (cidr.version, cidr.first, cidr.prefixlen)
+        self._blocks[block] -= 1
+        if not self._blocks[block]:
+            del self._blocks[block]
+
+    def overlaps(self, cidr):
+        """ Does an IPNetwork cidr overlap any indexed subnet? """
+        firsts = self._firsts[cidr.version]
+        index = bisect.bisect_left(firsts, cidr.first)
+        if index < len(firsts) and firsts[index] <= cidr.last:
+            return True
+        bits = 32 if cidr.version == 4 else 128
+        for prefixlen in range(cidr.prefixlen):
+            supernet_first = cidr.first >> (bits - prefixlen) \
+                << (bits - prefixlen)
+            if (cidr.version, supernet_first, prefixlen) in self._blocks:
+                return True
+        return False
+
+
 class NetworkBuilderDirect(object):
     """Create network connectivity for a bigip """
     def __init__(self, conf, driver, bigip_l2_manager=None, l3_binding=None):
@@ -45,6 +101,14 @@ class NetworkBuilderDirect(object):
         self.bigip_snat_manager = BigipSnatManager(
             driver, bigip_l2_manager, l3_binding)
         self.rds_cache = {}
+        # SubnetIndex by (tenant_id, route domain id) and
+        # (tenant_id, route domain id) by network short name
+        self.rds_subnet_index = {}
+        self.rds_network_index = {}
+        # requests of several tenants run at once. The route domain
+        # cache is read and changed, and route domains are placed
+        # and created, by one of them at a time.
+        self.rds_lock = threading.RLock()
 
     def initialize_tunneling(self):
         """ setup tunneling
@@ -90,12 +154,9 @@ class NetworkBuilderDirect(object):
 
         # Per Device Network Connectivity (VLANs or Tunnels)
         subnetsinfo = _get_subnets_to_assure(service)
-        for (assure_bigip, subnetinfo) in \
-                itertools.product(self.driver.get_all_bigips(), subnetsinfo):
-            self.bigip_l2_manager.assure_bigip_network(
-                assure_bigip, subnetinfo['network'])
-            self.bigip_selfip_manager.assure_bigip_selfip(
-                assure_bigip, service, subnetinfo)
+        self.driver.device_fanout.run(
+            self._assure_bigip_subnets, self.driver.get_all_bigips(),
+            service, subnetsinfo)
 
         # L3 Shared Config
         assure_bigips = self.driver.get_config_bigips()
@@ -111,6 +172,14 @@ class NetworkBuilderDirect(object):
                     self.bigip_selfip_manager.assure_gateway_on_subnet(
                         assure_bigip, subnetinfo, traffic_group)
 
+    def _assure_bigip_subnets(self, bigip, service, subnetsinfo):
+        """ Assure network connectivity on one bigip """
+        for subnetinfo in subnetsinfo:
+            self.bigip_l2_manager.assure_bigip_network(
+                bigip, subnetinfo['network'])
+            self.bigip_selfip_manager.assure_bigip_selfip(
+                bigip, service, subnetinfo)
+
     def _annotate_service_route_domains(self, service):
         """ Add route domain notation to pool member and vip addresses. """
         LOG.debug("Service before route domains: %s" % service)
@@ -144,7 +213,11 @@ class NetworkBuilderDirect(object):
         if self.bigip_l2_manager.is_common_network(network):
             network['route_domain_id'] = 0
             return
+        with self.rds_lock:
+            self._assign_route_domain(tenant_id, network, subnet)
 
+    def _assign_route_domain(self, tenant_id, network, subnet):
+        """ Assign route domain for a network not in Common """
         LOG.debug("assign route domain get from cache %s" % network)
         route_domain_id = self.get_route_domain_from_cache(network)
         if route_domain_id is not None:
@@ -168,46 +241,28 @@ class NetworkBuilderDirect(object):
         placed_route_domain_id = None
         for route_domain_id in self.rds_cache[tenant_id]:
             LOG.debug("checking rd %s" % route_domain_id)
-            rd_entry = self.rds_cache[tenant_id][route_domain_id]
-            overlapping_subnet = None
-            for net_shortname in rd_entry:
-                LOG.debug("checking net %s" % net_shortname)
-                net_entry = rd_entry[net_shortname]
-                for exist_subnet_id in net_entry['subnets']:
-                    if exist_subnet_id == subnet['id']:
-                        continue
-                    exist_subnet = net_entry['subnets'][exist_subnet_id]
-                    exist_cidr = exist_subnet['cidr']
-                    if check_cidr in exist_cidr or exist_cidr in check_cidr:
-                        overlapping_subnet = exist_subnet
-                        LOG.debug('rd %s: overlaps with subnet %s id: %s' % (
-                            (route_domain_id, exist_subnet, exist_subnet_id)))
-                        break
-                if overlapping_subnet:
-                    # no need to keep looking
-                    break
-            if not overlapping_subnet:
+            subnet_index = self.rds_subnet_index[(tenant_id, route_domain_id)]
+            if subnet['id'] in subnet_index or \
+                    not subnet_index.overlaps(check_cidr):
                 placed_route_domain_id = route_domain_id
                 break
+            LOG.debug('rd %s: subnet %s overlaps with an existing subnet'
+                      % (route_domain_id, check_cidr))
 
         if placed_route_domain_id is None:
             if (len(self.rds_cache[tenant_id]) <
                     self.conf.max_namespaces_per_tenant):
                 placed_route_domain_id = self._create_aux_rd(tenant_id)
-                self.rds_cache[tenant_id][placed_route_domain_id] = {}
+                self._add_rds_route_domain(tenant_id, placed_route_domain_id)
                 LOG.debug("Tenant %s now has %d route domains" %
                           (tenant_id, len(self.rds_cache[tenant_id])))
             else:
                 raise Exception("Cannot allocate route domain")
 
         LOG.debug("Placed in route domain %s" % placed_route_domain_id)
-        rd_entry = self.rds_cache[tenant_id][placed_route_domain_id]
-
         net_short_name = self.get_neutron_net_short_name(network)
-        if net_short_name not in rd_entry:
-            rd_entry[net_short_name] = {'subnets': {}}
-        net_subnets = rd_entry[net_short_name]['subnets']
-        net_subnets[subnet['id']] = {'cidr': check_cidr}
+        self._add_rds_subnet(tenant_id, placed_route_domain_id,
+                             net_short_name, subnet['id'], check_cidr)
         network['route_domain_id'] = placed_route_domain_id
 
     def _create_aux_rd(self, tenant_id):
@@ -248,12 +303,13 @@ class NetworkBuilderDirect(object):
     """
     def update_rds_cache(self, tenant_id):
         """ Update the route domain cache from bigips  """
-        if tenant_id not in self.rds_cache:
-            LOG.debug("rds_cache: adding tenant %s" % tenant_id)
-            self.rds_cache[tenant_id] = {}
-            for bigip in self.driver.get_all_bigips():
-                self.update_rds_cache_bigip(tenant_id, bigip)
-            LOG.debug("rds_cache updated: " + str(self.rds_cache))
+        with self.rds_lock:
+            if tenant_id not in self.rds_cache:
+                LOG.debug("rds_cache: adding tenant %s" % tenant_id)
+                self.rds_cache[tenant_id] = {}
+                for bigip in self.driver.get_all_bigips():
+                    self.update_rds_cache_bigip(tenant_id, bigip)
+                LOG.debug("rds_cache updated: " + str(self.rds_cache))
 
     def update_rds_cache_bigip(self, tenant_id, bigip):
         """ Update the route domain cache for this tenant
@@ -282,9 +338,7 @@ class NetworkBuilderDirect(object):
             return
 
         # make sure this rd has a cache entry
-        tenant_entry = self.rds_cache[tenant_id]
-        if route_domain_id not in tenant_entry:
-            tenant_entry[route_domain_id] = {}
+        self._add_rds_route_domain(tenant_id, route_domain_id)
 
         # for every VLAN or TUNNEL on this bigip...
         for rd_vlan in rd_vlans:
@@ -301,14 +355,18 @@ class NetworkBuilderDirect(object):
             bigip, tenant_id, rd_vlan)
 
         # make sure this net has a cache entry
-        tenant_entry = self.rds_cache[tenant_id]
-        rd_entry = tenant_entry[route_domain_id]
-        if net_short_name not in rd_entry:
-            rd_entry[net_short_name] = {'subnets': {}}
-        net_subnets = rd_entry[net_short_name]['subnets']
+        self._add_rds_network(tenant_id, route_domain_id, net_short_name)
 
         selfips = bigip.selfip.get_selfips(folder=tenant_id, vlan=rd_vlan)
         LOG.debug("rds_cache: got selfips: %s" % selfips)
+        self._update_rds_cache_selfips(
+            tenant_id, bigip, route_domain_id, rd_vlan, net_short_name,
+            selfips)
+        LOG.debug("rds_cache: now %s" % self.rds_cache)
+
+    def _update_rds_cache_selfips(self, tenant_id, bigip, route_domain_id,
+                                  rd_vlan, net_short_name, selfips):
+        """ Cache the subnets of the bigip's selfips on a vlan """
         for selfip in selfips:
             LOG.debug("rds_cache: processing bigip %s rd %s vlan %s self %s" %
                       (bigip.device_name, route_domain_id, rd_vlan,
@@ -329,28 +387,102 @@ class NetworkBuilderDirect(object):
             netip = netaddr.IPNetwork(selfip['address'])
             LOG.debug("rds_cache: updating subnet %s with %s"
                       % (subnet_id, str(netip.cidr)))
-            net_subnets[subnet_id] = {'cidr': netip.cidr}
-            LOG.debug("rds_cache: now %s" % self.rds_cache)
+            self._add_rds_subnet(tenant_id, route_domain_id,
+                                 net_short_name, subnet_id, netip.cidr)
+
+    def load_rds_cache(self):
+        """ Rebuild the route domain cache of all tenants from one
+            snapshot of the route domains, networks and selfips of
+            each bigip. Tenants missing from it are loaded on a miss
+            by update_rds_cache. """
+        try:
+            snapshots = []
+            for bigip in self.driver.get_all_bigips():
+                snapshots.append((bigip, bigip.route.get_domain_snapshot()))
+        except Exception as exc:
+            LOG.error("rds_cache: could not load device snapshot: %s"
+                      % str(exc))
+            return
+        # not while a request is loading a tenant or placing a subnet
+        with self.rds_lock:
+            self.rds_cache = {}
+            self.rds_subnet_index = {}
+            self.rds_network_index = {}
+            for (bigip, snapshot) in snapshots:
+                self._load_rds_snapshot(bigip, snapshot)
+        LOG.debug("rds_cache: loaded %d tenants" % len(self.rds_cache))
+
+    def _load_rds_snapshot(self, bigip, snapshot):
+        """ Cache the tenant route domains in a bigip snapshot """
+        for route_domain in snapshot['route_domains']:
+            partition = route_domain['partition']
+            prefix = bigip_interfaces.OBJ_PREFIX
+            if not partition.startswith(prefix):
+                continue
+            tenant_id = partition[len(prefix):]
+            if tenant_id not in self.rds_cache:
+                self.rds_cache[tenant_id] = {}
+            if not route_domain['vlans']:
+                continue
+            route_domain_id = route_domain['id']
+            self._add_rds_route_domain(tenant_id, route_domain_id)
+            for rd_vlan in route_domain['vlans']:
+                net_short_name = _get_net_short_name(
+                    rd_vlan, snapshot['net_keys'].get(rd_vlan))
+                self._add_rds_network(
+                    tenant_id, route_domain_id, net_short_name)
+                self._update_rds_cache_selfips(
+                    tenant_id, bigip, route_domain_id, rd_vlan,
+                    net_short_name, snapshot['selfips'].get(rd_vlan, []))
+
+    def _add_rds_route_domain(self, tenant_id, route_domain_id):
+        """ Make sure the route domain has a cache entry """
+        tenant_entry = self.rds_cache[tenant_id]
+        if route_domain_id not in tenant_entry:
+            tenant_entry[route_domain_id] = {}
+            self.rds_subnet_index[(tenant_id, route_domain_id)] = \
+                SubnetIndex()
+        return tenant_entry[route_domain_id]
+
+    def _add_rds_network(self, tenant_id, route_domain_id, net_short_name):
+        """ Make sure the network has a cache entry in the route
+            domain. Returns the subnets of the network. """
+        rd_entry = self._add_rds_route_domain(tenant_id, route_domain_id)
+        if net_short_name not in rd_entry:
+            rd_entry[net_short_name] = {'subnets': {}}
+            self.rds_network_index.setdefault(
+                net_short_name, (tenant_id, route_domain_id))
+        return rd_entry[net_short_name]['subnets']
+
+    def _add_rds_subnet(self, tenant_id, route_domain_id,
+                        net_short_name, subnet_id, cidr):
+        """ Cache a subnet of the network in the route domain """
+        net_subnets = self._add_rds_network(
+            tenant_id, route_domain_id, net_short_name)
+        net_subnets[subnet_id] = {'cidr': cidr}
+        self.rds_subnet_index[(tenant_id, route_domain_id)].add(
+            subnet_id, cidr)
 
     def get_route_domain_from_cache(self, network):
         """ Get route domain from cache by network """
         net_short_name = self.get_neutron_net_short_name(network)
-        for tenant_id in self.rds_cache:
-            tenant_cache = self.rds_cache[tenant_id]
-            for route_domain_id in tenant_cache:
-                if net_short_name in tenant_cache[route_domain_id]:
-                    return route_domain_id
+        if net_short_name in self.rds_network_index:
+            return self.rds_network_index[net_short_name][1]
 
     def remove_from_rds_cache(self, network, subnet):
-        """ Get route domain from cache by network """
+        """ Remove subnet of network from the cache """
         net_short_name = self.get_neutron_net_short_name(network)
-        for tenant_id in self.rds_cache:
-            tenant_cache = self.rds_cache[tenant_id]
-            for route_domain_id in tenant_cache:
-                if net_short_name in tenant_cache[route_domain_id]:
-                    net_entry = tenant_cache[route_domain_id][net_short_name]
-                    if subnet['id'] in net_entry:
-                        del net_entry[subnet['id']]
+        with self.rds_lock:
+            if net_short_name not in self.rds_network_index:
+                return
+            (tenant_id, route_domain_id) = \
+                self.rds_network_index[net_short_name]
+            net_entry = \
+                self.rds_cache[tenant_id][route_domain_id][net_short_name]
+            if subnet['id'] in net_entry['subnets']:
+                del net_entry['subnets'][subnet['id']]
+                self.rds_subnet_index[(tenant_id, route_domain_id)].remove(
+                    subnet['id'])
 
     @staticmethod
     def get_bigip_net_short_name(bigip, tenant_id, network_name):
@@ -358,14 +490,12 @@ class NetworkBuilderDirect(object):
         if '_tunnel-gre-' in network_name:
             tunnel_key = bigip.l2gre.get_tunnel_key(
                 name=network_name, folder=tenant_id)
-            return 'gre-%s' % tunnel_key
         elif '_tunnel-vxlan-' in network_name:
             tunnel_key = bigip.vxlan.get_tunnel_key(
                 name=network_name, folder=tenant_id)
-            return 'vxlan-%s' % tunnel_key
         else:
-            vlan_id = bigip.vlan.get_id(name=network_name, folder=tenant_id)
-            return 'vlan-%s' % vlan_id
+            tunnel_key = bigip.vlan.get_id(name=network_name, folder=tenant_id)
+        return _get_net_short_name(network_name, tunnel_key)
 
     @staticmethod
     def get_neutron_net_short_name(network):
@@ -380,9 +510,8 @@ class NetworkBuilderDirect(object):
         subnet = subnetinfo['subnet']
         assure_bigips = \
             [bigip for bigip in assure_bigips
-                if tenant_id not in bigip.assured_tenant_snat_subnets or
-                subnet['id'] not in
-                bigip.assured_tenant_snat_subnets[tenant_id]]
+                if not bigip.config_cache.is_assured(
+                    'snat_subnet', (tenant_id, subnet['id']))]
         if len(assure_bigips):
             snat_addrs = self.bigip_snat_manager.get_snat_addrs(
                 subnetinfo, tenant_id)
@@ -434,6 +563,10 @@ class NetworkBuilderDirect(object):
         # Non Shared Config -  Local Per BIG-IP
         self.update_bigip_l2(service)
 
+        # VIP and node addresses of the tenant, read once for all
+        # subnets and bigips in this pass
+        tenant_addresses = {}
+
         # Delete shared config objects
         deleted_names = set()
         for bigip in self.driver.get_config_bigips():
@@ -443,12 +576,19 @@ class NetworkBuilderDirect(object):
             subnet_hints = all_subnet_hints[bigip.device_name]
             deleted_names = deleted_names.union(
                 self._assure_delete_nets_shared(bigip, service,
-                                                subnet_hints))
+                                                subnet_hints,
+                                                tenant_addresses))
 
         # avoids race condition:
         # deletion of shared ip objects must sync before we
         # remove the selfips or vlans from the peer bigips.
-        self.driver.sync_if_clustered()
+        # Without subnets to delete it only needs to sync eventually.
+        deleting = False
+        for subnet_hints in all_subnet_hints.values():
+            if subnet_hints['check_for_delete_subnets']:
+                deleting = True
+                break
+        self.driver.sync_if_clustered(wait=deleting)
 
         # Delete non shared config objects
         for bigip in self.driver.get_all_bigips():
@@ -465,7 +605,7 @@ class NetworkBuilderDirect(object):
                 subnet_hints = all_subnet_hints[device_name]
             deleted_names = deleted_names.union(
                 self._assure_delete_nets_nonshared(
-                    bigip, service, subnet_hints))
+                    bigip, service, subnet_hints, tenant_addresses))
 
         for port_name in deleted_names:
             LOG.debug('    post_service_networking: calling '
@@ -554,12 +694,14 @@ class NetworkBuilderDirect(object):
             self.bigip_l2_manager.delete_bigip_fdbs(
                 bigip, net_folder, fdb_info, vip)
 
-    def _assure_delete_nets_shared(self, bigip, service, subnet_hints):
+    def _assure_delete_nets_shared(self, bigip, service, subnet_hints,
+                                   tenant_addresses=None):
         """ Assure shared configuration (which syncs) is deleted """
         deleted_names = set()
         tenant_id = service['pool']['tenant_id']
         delete_gateway = self.bigip_selfip_manager.delete_gateway_on_subnet
-        for subnetinfo in _get_subnets_to_delete(bigip, service, subnet_hints):
+        for subnetinfo in _get_subnets_to_delete(bigip, service, subnet_hints,
+                                                 tenant_addresses):
             try:
                 if not self.conf.f5_snat_mode:
                     gw_name = delete_gateway(bigip, subnetinfo)
@@ -580,10 +722,12 @@ class NetworkBuilderDirect(object):
 
         return deleted_names
 
-    def _assure_delete_nets_nonshared(self, bigip, service, subnet_hints):
+    def _assure_delete_nets_nonshared(self, bigip, service, subnet_hints,
+                                      tenant_addresses=None):
         """ Delete non shared base objects for networks """
         deleted_names = set()
-        for subnetinfo in _get_subnets_to_delete(bigip, service, subnet_hints):
+        for subnetinfo in _get_subnets_to_delete(bigip, service, subnet_hints,
+                                                 tenant_addresses):
             try:
                 network = subnetinfo['network']
                 if self.bigip_l2_manager.is_common_network(network):
@@ -616,11 +760,8 @@ class NetworkBuilderDirect(object):
 
                 self.remove_from_rds_cache(network, subnet)
                 tenant_id = service['pool']['tenant_id']
-                if tenant_id in bigip.assured_tenant_snat_subnets:
-                    tenant_snat_subnets = \
-                        bigip.assured_tenant_snat_subnets[tenant_id]
-                    if subnet['id'] in tenant_snat_subnets:
-                        tenant_snat_subnets.remove(subnet['id'])
+                bigip.config_cache.clear_assured('snat_subnet',
+                                                 (tenant_id, subnet['id']))
             except NeutronException as exc:
                 LOG.error("assure_delete_nets_nonshared: exception: %s"
                           % str(exc.msg))
@@ -631,6 +772,19 @@ class NetworkBuilderDirect(object):
         return deleted_names
 
 
+def _get_net_short_name(network_name, key):
+    """ Return <network_type>-<seg_id> for a bigip vlan or tunnel
+        with vlan tag or tunnel key key """
+    if '_tunnel-gre-' in network_name:
+        return 'gre-%s' % key
+    elif '_tunnel-vxlan-' in network_name:
+        return 'vxlan-%s' % key
+    else:
+        if key is None:
+            key = 0
+        return 'vlan-%s' % key
+
+
 def _get_subnets_to_assure(service):
     """ Examine service and return active networks """
     networks = dict()
@@ -655,61 +809,72 @@ def _get_subnets_to_assure(service):
     return networks.values()
 
 
-def _get_subnets_to_delete(bigip, service, subnet_hints):
+def _get_subnets_to_delete(bigip, service, subnet_hints,
+                           tenant_addresses=None):
     """ Clean up any Self IP, SNATs, networks, and folder for
-        services items that we deleted. """
+        services items that we deleted. The addresses of the tenant
+        are read once into tenant_addresses, keyed by tenant id. """
+    if tenant_addresses is None:
+        tenant_addresses = {}
+    tenant_id = service['pool']['tenant_id']
     subnets_to_delete = []
     for subnetinfo in subnet_hints['check_for_delete_subnets'].values():
         subnet = subnetinfo['subnet']
         route_domain = subnetinfo['network']['route_domain_id']
         if not subnet:
             continue
-        if not _ips_exist_on_subnet(bigip, service, subnet, route_domain):
+        if tenant_id not in tenant_addresses:
+            tenant_addresses[tenant_id] = \
+                _get_tenant_addresses(bigip, tenant_id)
+        if not _ips_exist_on_subnet(bigip, service, subnet, route_domain,
+                                    tenant_addresses[tenant_id]):
             subnets_to_delete.append(subnetinfo)
     return subnets_to_delete
 
 
-def _ips_exist_on_subnet(bigip, service, subnet, route_domain):
+def _get_tenant_addresses(bigip, tenant_id):
+    """ Sorted integer VIP and node addresses of the tenant by route
+        domain and IP version """
+    addresses = {}
+    get_vs = bigip.virtual_server.get_virtual_service_insertion
+    for virt_serv in get_vs(folder=tenant_id):
+        (_, dest) = virt_serv.items()[0]
+        _add_tenant_address(addresses, dest['address'])
+    for node in bigip.pool.get_node_addresses(folder=tenant_id):
+        _add_tenant_address(addresses, node)
+    for by_version in addresses.values():
+        for version in by_version:
+            by_version[version].sort()
+    return addresses
+
+
+def _add_tenant_address(addresses, address):
+    """ Add an address with optional %route_domain to addresses """
+    if len(address.split('%')) > 1:
+        route_domain = address.split('%')[1]
+    else:
+        route_domain = '0'
+    ipaddr = netaddr.IPAddress(strip_domain_address(address))
+    by_version = addresses.setdefault(route_domain, {})
+    by_version.setdefault(ipaddr.version, []).append(int(ipaddr))
+
+
+def _ips_exist_on_subnet(bigip, service, subnet, route_domain,
+                         addresses=None):
     """ Does the big-ip have any IP addresses on this subnet? """
     LOG.debug("_ips_exist_on_subnet entry %s rd %s"
               % (str(subnet['cidr']), route_domain))
-    route_domain = str(route_domain)
+    if addresses is None:
+        addresses = _get_tenant_addresses(
+            bigip, service['pool']['tenant_id'])
     ipsubnet = netaddr.IPNetwork(subnet['cidr'])
-    # Are there any virtual addresses on this subnet?
-    get_vs = bigip.virtual_server.get_virtual_service_insertion
-    virtual_services = get_vs(folder=service['pool']['tenant_id'])
-    for virt_serv in virtual_services:
-        (_, dest) = virt_serv.items()[0]
-        LOG.debug("            _ips_exist_on_subnet: checking vip %s"
-                  % str(dest['address']))
-        if len(dest['address'].split('%')) > 1:
-            vip_route_domain = dest['address'].split('%')[1]
-        else:
-            vip_route_domain = '0'
-        if vip_route_domain != route_domain:
-            continue
-        vip_addr = strip_domain_address(dest['address'])
-        if netaddr.IPAddress(vip_addr) in ipsubnet:
-            LOG.debug("            _ips_exist_on_subnet: found")
-            return True
-
-    # If there aren't any virtual addresses, are there
-    # node addresses on this subnet?
-    get_node_addr = bigip.pool.get_node_addresses
-    nodes = get_node_addr(folder=service['pool']['tenant_id'])
-    for node in nodes:
-        LOG.debug("            _ips_exist_on_subnet: checking node %s"
-                  % str(node))
-        if len(node.split('%')) > 1:
-            node_route_domain = node.split('%')[1]
-        else:
-            node_route_domain = '0'
-        if node_route_domain != route_domain:
-            continue
-        node_addr = strip_domain_address(node)
-        if netaddr.IPAddress(node_addr) in ipsubnet:
-            LOG.debug("        _ips_exist_on_subnet: found")
-            return True
+    # Are there any virtual or node addresses on this subnet?
+    by_version = addresses.get(str(route_domain), {})
+    sorted_addrs = by_version.get(ipsubnet.version, [])
+    index = bisect.bisect_left(sorted_addrs, ipsubnet.first)
+    if index < len(sorted_addrs) and sorted_addrs[index] <= ipsubnet.last:
+        LOG.debug("            _ips_exist_on_subnet: found")
+        return True
 
     LOG.debug("            _ips_exist_on_subnet exit %s"
               % str(subnet['cidr']))
@@ -24,6 +24,8 @@ except ImportError:
 from neutron.plugins.common import constants as plugin_const
 from time import time
 
+from f5.bigip import exceptions as f5ex
+
 LOG = logging.getLogger(__name__)
 
 
@@ -43,13 +45,16 @@ class BigipPoolManager(object):
                               description=desc,
                               folder=pool['tenant_id'])
             if pool['status'] == plugin_const.PENDING_UPDATE:
-                # make sure pool attributes are correct
-                bigip.pool.set_lb_method(name=pool['id'],
-                                         lb_method=pool['lb_method'],
-                                         folder=pool['tenant_id'])
-                bigip.pool.set_description(name=pool['id'],
-                                           description=desc,
-                                           folder=pool['tenant_id'])
+                # make sure pool attributes are correct, the
+                # attribute updates are merged into one PATCH
+                with bigip.transaction(
+                        exception=f5ex.PoolUpdateException):
+                    bigip.pool.set_lb_method(name=pool['id'],
+                                             lb_method=pool['lb_method'],
+                                             folder=pool['tenant_id'])
+                    bigip.pool.set_description(name=pool['id'],
+                                               description=desc,
+                                               folder=pool['tenant_id'])
 
     def assure_bigip_pool_delete(self, bigip, service):
         """ Assure pool is deleted from big-ip """
@@ -126,21 +131,24 @@ class BigipPoolManager(object):
 
     def _update_monitor(self, bigip, monitor, set_times=True):
         """ Update monitor on bigip """
-        if set_times:
-            timeout = int(monitor['max_retries']) * \
-                int(monitor['timeout'])
-            # make sure monitor attributes are correct
-            bigip.monitor.set_interval(name=monitor['id'],
-                                       mon_type=monitor['type'],
-                                       interval=monitor['delay'],
-                                       folder=monitor['tenant_id'])
-            bigip.monitor.set_timeout(name=monitor['id'],
-                                      mon_type=monitor['type'],
-                                      timeout=timeout,
-                                      folder=monitor['tenant_id'])
-
-        if monitor['type'] == 'HTTP' or monitor['type'] == 'HTTPS':
-            self._update_http_monitor(bigip, monitor)
+        # the attribute updates are merged into one PATCH
+        with bigip.transaction(
+                exception=f5ex.MonitorUpdateException):
+            if set_times:
+                timeout = int(monitor['max_retries']) * \
+                    int(monitor['timeout'])
+                # make sure monitor attributes are correct
+                bigip.monitor.set_interval(name=monitor['id'],
+                                           mon_type=monitor['type'],
+                                           interval=monitor['delay'],
+                                           folder=monitor['tenant_id'])
+                bigip.monitor.set_timeout(name=monitor['id'],
+                                          mon_type=monitor['type'],
+                                          timeout=timeout,
+                                          folder=monitor['tenant_id'])
+
+            if monitor['type'] == 'HTTP' or monitor['type'] == 'HTTPS':
+                self._update_http_monitor(bigip, monitor)
 
     def _update_http_monitor(self, bigip, monitor):
         """ Update pool monitor on bigip """
@@ -196,166 +204,61 @@ class BigipPoolManager(object):
         """ Ensure pool members are on bigip """
         pool = service['pool']
         start_time = time()
-        # Does pool exist... If not don't bother
-        if not bigip.pool.exists(name=pool['id'], folder=pool['tenant_id']):
-            return
-        # Current members on the BigIP
-        pool['existing_members'] = bigip.pool.get_members(
-            name=pool['id'], folder=pool['tenant_id'])
         # Flag if we need to change the pool's LB method to
         # include weighting by the ratio attribute
         any_using_ratio = False
         # Members according to Neutron
+        members = []
         for member in service['members']:
-            member_hints = \
-                self._assure_bigip_member(bigip, subnet_hints, pool, member)
-            if member_hints['using_ratio']:
+            self._update_member_subnet_hints(subnet_hints, member)
+            if member['status'] == plugin_const.PENDING_DELETE:
+                continue
+            if member['weight'] > 1:
                 any_using_ratio = True
-
-            # Remove member from the list of members bigip needs to remove
-            if member_hints['found_existing']:
-                pool['existing_members'].remove(member_hints['found_existing'])
-
-        LOG.debug(_("Pool: %s removing members %s"
-                    % (pool['id'], pool['existing_members'])))
-        # remove any members which are no longer in the service
-        for need_to_delete in pool['existing_members']:
-            bigip.pool.remove_member(name=pool['id'],
-                                     ip_address=need_to_delete['addr'],
-                                     port=int(need_to_delete['port']),
-                                     folder=pool['tenant_id'])
+            members.append({'address': member['address'],
+                            'port': int(member['protocol_port']),
+                            'enabled': member['admin_state_up'],
+                            'ratio': int(member['weight'])})
 
         # if members are using weights, change the LB to RATIO
         if any_using_ratio:
-            # LOG.debug(_("Pool: %s changing to ratio based lb"
-            #        % pool['id']))
             if pool['lb_method'] == lb_const.LB_METHOD_LEAST_CONNECTIONS:
-                bigip.pool.set_lb_method(name=pool['id'],
-                                         lb_method='RATIO_LEAST_CONNECTIONS',
-                                         folder=pool['tenant_id'])
+                lb_method = 'RATIO_LEAST_CONNECTIONS'
             else:
-                bigip.pool.set_lb_method(name=pool['id'],
-                                         lb_method='RATIO',
-                                         folder=pool['tenant_id'])
+                lb_method = 'RATIO'
         else:
             # We must update the pool lb_method for the case where
             # the pool object was not updated, but the member
             # used to have a weight (setting ration) and now does
             # not.
-            bigip.pool.set_lb_method(name=pool['id'],
-                                     lb_method=pool['lb_method'],
-                                     folder=pool['tenant_id'])
+            lb_method = pool['lb_method']
+
+        # Members not in the list, including those pending
+        # delete, are removed. Does nothing if the pool does
+        # not exist.
+        bigip.pool.set_members(name=pool['id'],
+                               members=members,
+                               lb_method=lb_method,
+                               folder=pool['tenant_id'])
         if time() - start_time > .001:
-            LOG.debug("        _assure_members setting pool lb method" +
-                      " took %.5f secs" % (time() - start_time))
-
-    def _assure_bigip_member(self, bigip, subnet_hints, pool, member):
-        """ Ensure pool member is on bigip """
-        start_time = time()
+            LOG.debug("        _assure_members setting %d members"
+                      " took %.5f secs" % (len(members),
+                                           time() - start_time))
 
+    def _update_member_subnet_hints(self, subnet_hints, member):
+        """ Track which member subnets may be deleted """
         network = member['network']
         subnet = member['subnet']
-        member_hints = {'found_existing': None,
-                        'using_ratio': False,
-                        'deleted_members': []}
-
-        ip_address = member['address']
-        for existing_member in pool['existing_members']:
-            if ip_address.startswith(existing_member['addr']) and \
-               (member['protocol_port'] == existing_member['port']):
-                member_hints['found_existing'] = existing_member
-                break
-
-        # Delete those pending delete
+        if not subnet:
+            return
         if member['status'] == plugin_const.PENDING_DELETE:
-            self._assure_bigip_delete_member(bigip, pool, member, ip_address)
-            member_hints['deleted_members'].append(member)
-            if subnet and \
-               subnet['id'] not in subnet_hints['do_not_delete_subnets']:
+            if subnet['id'] not in subnet_hints['do_not_delete_subnets']:
                 subnet_hints['check_for_delete_subnets'][subnet['id']] = \
                     {'network': network,
                      'subnet': subnet,
                      'is_for_member': True}
         else:
-            just_added = False
-            if not member_hints['found_existing']:
-                add_start_time = time()
-                port = int(member['protocol_port'])
-                if bigip.pool.add_member(name=pool['id'],
-                                         ip_address=ip_address,
-                                         port=port,
-                                         folder=pool['tenant_id'],
-                                         no_checks=True):
-                    just_added = True
-                LOG.debug("           bigip.pool.add_member %s took %.5f" %
-                          (ip_address, time() - add_start_time))
-            if just_added or member['status'] == plugin_const.PENDING_UPDATE:
-                member_info = {'pool': pool, 'member': member,
-                               'ip_address': ip_address,
-                               'just_added': just_added}
-                member_hints['using_ratio'] = \
-                    self._assure_update_member(bigip, member_info)
-            if subnet and \
-               subnet['id'] in subnet_hints['check_for_delete_subnets']:
+            if subnet['id'] in subnet_hints['check_for_delete_subnets']:
                 del subnet_hints['check_for_delete_subnets'][subnet['id']]
-            if subnet and \
-               subnet['id'] not in subnet_hints['do_not_delete_subnets']:
+            if subnet['id'] not in subnet_hints['do_not_delete_subnets']:
                 subnet_hints['do_not_delete_subnets'].append(subnet['id'])
-
-        if time() - start_time > .001:
-            LOG.debug("        assuring member %s took %.5f secs" %
-                      (member['address'], time() - start_time))
-        return member_hints
-
-    def _assure_update_member(self, bigip, member_info):
-        """ Update properties of pool member on bigip """
-        pool = member_info['pool']
-        member = member_info['member']
-        ip_address = member_info['ip_address']
-        just_added = member_info['just_added']
-
-        using_ratio = False
-        # Is it enabled or disabled?
-        # no_checks because we add the member above if not found
-        start_time = time()
-        member_port = int(member['protocol_port'])
-        if member['admin_state_up']:
-            bigip.pool.enable_member(name=pool['id'],
-                                     ip_address=ip_address,
-                                     port=member_port,
-                                     folder=pool['tenant_id'],
-                                     no_checks=True)
-        else:
-            bigip.pool.disable_member(name=pool['id'],
-                                      ip_address=ip_address,
-                                      port=member_port,
-                                      folder=pool['tenant_id'],
-                                      no_checks=True)
-        LOG.debug("            member enable/disable took %.5f secs" %
-                  (time() - start_time))
-        # Do we have weights for ratios?
-        if member['weight'] > 1:
-            if not just_added:
-                start_time = time()
-                set_ratio = bigip.pool.set_member_ratio
-                set_ratio(name=pool['id'],
-                          ip_address=ip_address,
-                          port=member_port,
-                          ratio=int(member['weight']),
-                          folder=pool['tenant_id'],
-                          no_checks=True)
-                if time() - start_time > .0001:
-                    LOG.debug("            member set ratio took %.5f secs" %
-                              (time() - start_time))
-            using_ratio = True
-
-        return using_ratio
-
-    def _assure_bigip_delete_member(self, bigip,
-                                    pool, member, ip_address):
-        """ Ensure pool member is deleted from bigip """
-        member_port = int(member['protocol_port'])
-        bigip.pool.remove_member(name=pool['id'],
-                                 ip_address=ip_address,
-                                 port=member_port,
-                                 folder=pool['tenant_id'])
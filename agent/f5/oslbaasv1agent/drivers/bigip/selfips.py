@@ -43,8 +43,8 @@ class BigipSelfIpManager(object):
         # If we have already assured this subnet.. return.
         # Note this cache is periodically cleared in order to
         # force assurance that the configuration is present.
-        if tenant_id in bigip.assured_tenant_snat_subnets and \
-                subnet['id'] in bigip.assured_tenant_snat_subnets[tenant_id]:
+        if bigip.config_cache.is_assured('snat_subnet',
+                                         (tenant_id, subnet['id'])):
             return
 
         selfip_address = self._get_bigip_selfip_address(bigip, subnet)
@@ -90,8 +90,9 @@ class BigipSelfIpManager(object):
         """ called for every bigip only in replication mode.
             otherwise called once """
         subnet = subnetinfo['subnet']
-        if subnet['id'] in bigip.assured_gateway_subnets:
+        if bigip.config_cache.is_assured('gateway_subnet', subnet['id']):
             return
+        token = bigip.config_cache.get_token('gateway_subnet', subnet['id'])
 
         network = subnetinfo['network']
         (network_name, preserve_network_name) = \
@@ -134,7 +135,8 @@ class BigipSelfIpManager(object):
         # as the forwarding SNAT addresses
         bigip.virtual_server.set_snat_automap(name=gw_name,
                                               folder=network_folder)
-        bigip.assured_gateway_subnets.append(subnet['id'])
+        bigip.config_cache.set_assured('gateway_subnet', subnet['id'],
+                                       token)
 
     def delete_gateway_on_subnet(self, bigip, subnetinfo):
         """ called for every bigip only in replication mode.
@@ -166,6 +168,5 @@ class BigipSelfIpManager(object):
         bigip.virtual_server.delete(name=gw_name,
                                     folder=network_folder)
 
-        if subnet['id'] in bigip.assured_gateway_subnets:
-            bigip.assured_gateway_subnets.remove(subnet['id'])
+        bigip.config_cache.clear_assured('gateway_subnet', subnet['id'])
         return gw_name
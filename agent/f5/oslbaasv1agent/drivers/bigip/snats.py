@@ -101,10 +101,11 @@ class BigipSnatManager(object):
         network = subnetinfo['network']
         subnet = subnetinfo['subnet']
 
-        if tenant_id not in bigip.assured_tenant_snat_subnets:
-            bigip.assured_tenant_snat_subnets[tenant_id] = []
-        if subnet['id'] in bigip.assured_tenant_snat_subnets[tenant_id]:
+        if bigip.config_cache.is_assured('snat_subnet',
+                                         (tenant_id, subnet['id'])):
             return
+        token = bigip.config_cache.get_token('snat_subnet',
+                                             (tenant_id, subnet['id']))
 
         snat_name = self._get_snat_name(subnet, tenant_id)
         for i in range(self.driver.conf.f5_snat_addresses_per_subnet):
@@ -126,7 +127,8 @@ class BigipSnatManager(object):
                 self.l3_binding.bind_address(subnet_id=subnet['id'],
                                              ip_address=ip_address)
 
-        bigip.assured_tenant_snat_subnets[tenant_id].append(subnet['id'])
+        bigip.config_cache.set_assured('snat_subnet',
+                                       (tenant_id, subnet['id']), token)
 
     def delete_bigip_snats(self, bigip, subnetinfo, tenant_id):
         """ Assure shared snat configuration (which syncs) is deleted
@@ -142,24 +144,17 @@ class BigipSnatManager(object):
 
     def _remove_assured_tenant_snat_subnet(self, bigip, tenant_id, subnet):
         """" Remove ref for the subnet for this tenant"""
-        if tenant_id in bigip.assured_tenant_snat_subnets:
-            tenant_snat_subnets = \
-                bigip.assured_tenant_snat_subnets[tenant_id]
-            if tenant_snat_subnets and subnet['id'] in tenant_snat_subnets:
-                LOG.debug(_(
-                    'Remove subnet id %s from ' \
-                    'bigip.assured_tenant_snat_subnets for tenant %s' % \
-                    (subnet['id'], tenant_id)))
-                tenant_snat_subnets.remove(subnet['id'])
-            else:
-                LOG.debug(_(
-                    'Subnet id %s does not exist in ' \
-                    'bigip.assured_tenant_snat_subnets for tenant %s' % \
-                    (subnet['id'], tenant_id)))
+        if bigip.config_cache.is_assured('snat_subnet',
+                                         (tenant_id, subnet['id'])):
+            LOG.debug(_(
+                'Remove subnet id %s from assured snat subnets'
+                ' for tenant %s' % (subnet['id'], tenant_id)))
+            bigip.config_cache.clear_assured('snat_subnet',
+                                             (tenant_id, subnet['id']))
         else:
             LOG.debug(_(
-                'Tenant id %s does not exist in ' \
-                'bigip.assured_tenant_snat_subnets' % tenant_id))
+                'Subnet id %s does not exist in assured snat subnets'
+                ' for tenant %s' % (subnet['id'], tenant_id)))
 
     def _delete_bigip_snats(self, bigip, subnetinfo, tenant_id):
         """ Assure snats deleted in standalone mode """
@@ -204,10 +199,9 @@ class BigipSnatManager(object):
                 'Check cache for subnet %s in use by other tenant' % \
                 subnet['id']))
             in_use_count = 0
-            for loop_tenant_id in bigip.assured_tenant_snat_subnets:
-                tenant_snat_subnets = \
-                    bigip.assured_tenant_snat_subnets[loop_tenant_id]
-                if subnet['id'] in tenant_snat_subnets:
+            for (loop_tenant_id, loop_subnet_id) in \
+                    bigip.config_cache.get_assured('snat_subnet'):
+                if subnet['id'] == loop_subnet_id:
                     LOG.debug(_(
                         'Subnet %s in use (tenant %s)' % \
                         (subnet['id'], loop_tenant_id)))
@@ -21,7 +21,6 @@ except ImportError:
     from oslo_log import log as logging
 from neutron.plugins.common import constants as plugin_const
 from f5.bigip import exceptions as f5ex
-from eventlet import greenthread
 import logging as std_logging
 
 LOG = logging.getLogger(__name__)
@@ -40,14 +39,17 @@ class BigipTenantManager(object):
         traffic_group = '/Common/' + traffic_group
 
         # create tenant folder
+        folder_created = False
         for bigip in self.driver.get_config_bigips():
             folder = bigip.decorate_folder(tenant_id)
             if not bigip.system.folder_exists(folder):
                 bigip.system.create_folder(
                     folder, change_to=True, traffic_group=traffic_group)
+                folder_created = True
 
         # folder must sync before route domains are created.
-        self.driver.sync_if_clustered()
+        if folder_created:
+            self.driver.sync_if_clustered()
 
         # create tenant route domain
         if self.conf.use_namespaces:
@@ -114,7 +116,6 @@ class BigipTenantManager(object):
         # we need to ensure that the following folder deletion
         # is clearly the last change that needs to be synced.
         self.driver.sync_if_clustered()
-        greenthread.sleep(5)
         try:
             bigip.system.delete_folder(folder=bigip.decorate_folder(tenant_id))
         except f5ex.SystemDeleteException:
@@ -17,13 +17,312 @@ try:
     from neutron.openstack.common import log as logging
 except ImportError:
     from oslo_log import log as logging
+from eventlet import event
 from eventlet import greenthread
+from eventlet import semaphore
 from time import time
+import collections
+import contextlib
+import sys
 import uuid
 
 LOG = logging.getLogger(__name__)
 
 
+# Requests which only assure the latest service definition for a
+# pool. Pending requests of these types for the same pool can be
+# coalesced into one pass using the newest service definition.
+COALESCED_METHODS = ['create_vip', 'update_vip', 'delete_vip',
+                     'create_pool', 'update_pool', 'delete_pool',
+                     'create_member', 'update_member', 'delete_member',
+                     'create_pool_health_monitor']
+
+
+class ServiceRequest(object):
+    """ A driver request waiting in or running from a scheduler lane """
+
+    def __init__(self, method_name, service=None):
+        self.method_name = method_name
+        self.service = service
+        self.pool_id = None
+        if service and service.get('pool'):
+            self.pool_id = service['pool']['id']
+        self.turn = event.Event()
+        self.result = event.Event()
+        self.value = None
+        self.started = False
+        self.merged = 0
+
+    def can_merge(self, request):
+        """ Can request be folded into this pending request? """
+        return (not self.started and
+                self.pool_id is not None and
+                self.pool_id == request.pool_id and
+                self.method_name in COALESCED_METHODS and
+                request.method_name in COALESCED_METHODS)
+
+
+class RequestScheduler(object):
+    """ Schedules serialized driver requests in per tenant lanes.
+
+        Requests in the same lane run strictly in the order they were
+        queued. Requests in different lanes run concurrently, up to
+        max_concurrent at a time. Requests which are not associated
+        with a tenant (the None lane) wait for every running request
+        to finish and run alone. While such a request waits for the
+        running requests, no other request is started. A waiting
+        request is woken by the request ahead of it when that
+        request completes.
+
+        A new request for a pool which already has a pending request
+        in its lane is merged into the pending request. The pending
+        request runs once with the newest service definition and all
+        merged callers share its outcome: its return value, or the
+        exception which ended it, also when it is killed before it
+        runs. The coalesced driver methods return None. """
+
+    def __init__(self, max_concurrent=1):
+        if max_concurrent < 1:
+            max_concurrent = 1
+        self.max_concurrent = max_concurrent
+        self.lanes = {}
+        self.depth = 0
+        self.requests_queued = 0
+        self.requests_merged = 0
+        self._slots = semaphore.Semaphore(max_concurrent)
+        # held while taking slots, so a request which needs all of
+        # them is not starved by requests taking freed slots one by one
+        self._admission = semaphore.Semaphore(1)
+
+    def __len__(self):
+        """ Number of queued and running requests """
+        return self.depth
+
+    def lane_depth(self, key):
+        """ Number of queued and running requests in a lane """
+        if key in self.lanes:
+            return len(self.lanes[key])
+        return 0
+
+    def merge(self, key, request):
+        """ Merge request into a pending request for the same pool.
+
+            Returns the pending request, now carrying the service
+            definition from request, or None if nothing was merged. """
+        if key not in self.lanes or request.pool_id is None:
+            return None
+        # Walk back from the newest request. A request for the same
+        # pool which can not be merged is an ordering barrier.
+        for pending in reversed(self.lanes[key]):
+            if pending.pool_id != request.pool_id:
+                continue
+            if not pending.can_merge(request):
+                return None
+            pending.service = request.service
+            pending.merged += 1
+            self.requests_merged += 1
+            return pending
+        return None
+
+    @contextlib.contextmanager
+    def request(self, key, request):
+        """ Wait for our turn in the lane and for a free slot """
+        if key not in self.lanes:
+            self.lanes[key] = collections.deque()
+        lane = self.lanes[key]
+        lane.append(request)
+        self.depth += 1
+        self.requests_queued += 1
+        permits = 0
+        error = None
+        try:
+            if lane[0] is not request:
+                request.turn.wait()
+            if key is None:
+                needed = self.max_concurrent
+            else:
+                needed = 1
+            with self._admission:
+                while permits < needed:
+                    self._slots.acquire()
+                    permits += 1
+            request.started = True
+            yield request
+        except:
+            error = sys.exc_info()
+            raise
+        finally:
+            for _ in range(permits):
+                self._slots.release()
+            was_head = lane[0] is request
+            lane.remove(request)
+            self.depth -= 1
+            if not lane:
+                del self.lanes[key]
+            elif was_head:
+                lane[0].turn.send()
+            # wake the merged callers however this request ended
+            if request.merged:
+                if error:
+                    request.result.send_exception(*error)
+                else:
+                    request.result.send(request.value)
+
+
+class DeviceFanout(object):
+    """ Runs the per device work of a step on all BIG-IPs at once.
+
+        At most max_per_device calls run on the same device at a time,
+        no matter how many steps fan out concurrently. Calls which
+        depend on the SOAP active folder of a device also hold its
+        folder lock, so only one of them runs on a device at a time.
+        The step fails as a whole: once every device has finished,
+        the first device error is raised. """
+
+    def __init__(self, max_per_device=1):
+        if max_per_device < 1:
+            max_per_device = 1
+        self.max_per_device = max_per_device
+        self._device_slots = {}
+
+    def _run_on_device(self, func, bigip, args, kwargs):
+        """ Call func for one device within its concurrency cap """
+        if bigip not in self._device_slots:
+            self._device_slots[bigip] = \
+                semaphore.Semaphore(self.max_per_device)
+        with self._device_slots[bigip]:
+            return func(bigip, *args, **kwargs)
+
+    def run(self, func, bigips, *args, **kwargs):
+        """ Call func(bigip, *args, **kwargs) for every bigip.
+            Returns the results in the order of bigips. """
+        bigips = list(bigips)
+        if len(bigips) == 1:
+            return [self._run_on_device(func, bigips[0], args, kwargs)]
+        threads = []
+        for bigip in bigips:
+            threads.append(greenthread.spawn(
+                self._run_on_device, func, bigip, args, kwargs))
+        results = []
+        error = None
+        for bigip, thread in zip(bigips, threads):
+            try:
+                results.append(thread.wait())
+            except Exception as exc:
+                LOG.error('%s failed on %s: %s'
+                          % (getattr(func, '__name__', str(func)),
+                             bigip.icontrol.hostname, str(exc)))
+                results.append(None)
+                if not error:
+                    error = sys.exc_info()
+        if error:
+            raise error[0], error[1], error[2]
+        return results
+
+
+class ClusterSyncScheduler(object):
+    """ Coalesces config-sync requests for a device group.
+
+        A request marks the device group dirty. Requests which do not
+        wait are synced together once window seconds have passed
+        since the first of them. A waiting request is an ordering
+        barrier: it starts a sync right away, unless one is already
+        starting, and returns once a sync which began after the
+        request has completed. All requests made before a sync starts
+        are covered by it, so concurrent callers share one sync.
+
+        The duration of the last latency_samples syncs is kept for
+        latency percentiles. """
+
+    def __init__(self, sync_func, window=2.0, latency_samples=100):
+        self.sync_func = sync_func
+        self.window = window
+        self.syncs_requested = 0
+        self.syncs_performed = 0
+        self.latencies = collections.deque(maxlen=latency_samples)
+        self._generation = 0
+        self._timer = None
+        self._running = False
+        self._waiters = []
+
+    def request(self, wait=True):
+        """ Mark the device group dirty and schedule a sync """
+        self.syncs_requested += 1
+        self._generation += 1
+        waiter = None
+        if wait:
+            waiter = (self._generation, event.Event())
+            self._waiters.append(waiter)
+        if not self._running:
+            if wait:
+                # cancel after starting, cancel may switch greenthreads
+                timer = self._timer
+                self._start()
+                if timer is not None:
+                    timer.cancel()
+            elif self._timer is None:
+                self._timer = greenthread.spawn_after(
+                    self.window, self._run)
+        if waiter:
+            return waiter[1].wait()
+
+    def latency_percentile(self, percent):
+        """ Sync duration in seconds below which percent of the
+            recent syncs completed, None if nothing was synced """
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        index = int(round(percent / 100.0 * (len(latencies) - 1)))
+        return latencies[index]
+
+    def _start(self):
+        """ Start a sync now """
+        self._timer = None
+        self._running = True
+        greenthread.spawn(self._run)
+
+    def _run(self):
+        """ Sync the requests made so far and wake their waiters """
+        self._timer = None
+        self._running = True
+        generation = self._generation
+        error = None
+        start_time = time()
+        try:
+            self.sync_func()
+        except Exception:
+            error = sys.exc_info()
+            LOG.error('cluster sync failed: %s' % str(error[1]))
+        self.latencies.append(time() - start_time)
+        self.syncs_performed += 1
+        self._running = False
+        LOG.debug('cluster sync done - syncs requested: %d performed: %d'
+                  % (self.syncs_requested, self.syncs_performed))
+        waiters = [waiter for waiter in self._waiters
+                   if waiter[0] <= generation]
+        self._waiters = [waiter for waiter in self._waiters
+                         if waiter[0] > generation]
+        for (_, waiter) in waiters:
+            if error:
+                waiter.send_exception(*error)
+            else:
+                waiter.send()
+        # requests made while we were syncing
+        if self._generation > generation:
+            if self._waiters:
+                self._start()
+            elif self._timer is None:
+                self._timer = greenthread.spawn_after(
+                    self.window, self._run)
+
+
+def request_lane(service):
+    """ Scheduler lane for a service definition """
+    if service and service.get('pool'):
+        return service['pool']['tenant_id']
+    return None
+
+
 def serialized(method_name):
     """Outer wrapper in order to specify method name"""
     def real_serialized(method):
@@ -42,79 +341,42 @@ def serialized(method_name):
             if 'service' in kwargs:
                 service = kwargs['service']
 
-            # Consolidate create_member requests for the same pool.
-            #
-            # NOTE: The following block of code alters the state of
-            # a queue that other greenthreads are waiting behind.
-            # This code assumes it will not be preempted by another
-            # greenthread while running. It does not do I/O or call any
-            # other monkey-patched code which might cause a context switch.
-            # To avoid race conditions, DO NOT add logging to this code
-            # block.
-
-            # num_requests = len(service_queue)
-
-            # queue optimization
-
-            # if num_requests > 1 and method_name == 'create_member':
-            #    cur_pool_id = service['pool']['id']
-                # cur_index = num_requests - 1
-                #  do not attempt to replace the first entry (index 0)
-                #  because it may already be in process.
-                # while cur_index > 0:
-                #    (check_request, check_method, check_service) = \
-                #        service_queue[cur_index]
-                #    if check_service['pool']['id'] != cur_pool_id:
-                #        cur_index -= 1
-                #        continue
-                #    if check_method != 'create_member':
-                #        break
-                # move this request up in the queue and return
-                # so that existing thread can handle it
-                #    service_queue[cur_index] = \
-                #        (check_request, check_method, service)
-                #    return
-
-            # End of code block which assumes no preemption.
-
-            req = (my_request_id, method_name, service)
-            service_queue.append(req)
-            reqs_ahead_of_us = request_index(service_queue, my_request_id)
-            while reqs_ahead_of_us != 0:
-                if reqs_ahead_of_us == 1:
-                    # it is almost our turn. get ready
-                    waitsecs = .01
-                else:
-                    waitsecs = reqs_ahead_of_us * .5
-                if waitsecs > .01:
-                    LOG.debug('%s request %s is blocking'
-                              ' for %.2f secs - queue depth: %d'
-                              % (str(method_name), my_request_id,
-                                 waitsecs, len(service_queue)))
-                greenthread.sleep(waitsecs)
-                reqs_ahead_of_us = request_index(service_queue, my_request_id)
-            try:
-                LOG.debug('%s request %s is running with queue depth: %d'
-                          % (str(method_name), my_request_id,
-                             len(service_queue)))
-                start_time = time()
-                result = method(*args, **kwargs)
-                LOG.debug('%s request %s took %.5f secs'
+            lane = request_lane(service)
+            request = ServiceRequest(method_name, service)
+            pending = service_queue.merge(lane, request)
+            if pending:
+                LOG.debug('%s request %s merged into pending %s request'
+                          ' for pool %s - merged requests: %d'
                           % (str(method_name), my_request_id,
-                             time() - start_time))
-            except:
-                LOG.error('%s request %s FAILED'
-                          % (str(method_name), my_request_id))
-                raise
-            finally:
-                service_queue.pop(0)
+                             pending.method_name, pending.pool_id,
+                             service_queue.requests_merged))
+                return pending.result.wait()
+
+            queued_time = time()
+            with service_queue.request(lane, request):
+                # run with the newest service definition merged
+                # into this request while it was waiting.
+                if request.merged:
+                    if 'service' in kwargs:
+                        kwargs['service'] = request.service
+                    else:
+                        args = args[:-1] + (request.service,)
+                try:
+                    LOG.debug('%s request %s is running after %.5f secs'
+                              ' with queue depth: %d merged requests: %d'
+                              % (str(method_name), my_request_id,
+                                 time() - queued_time, len(service_queue),
+                                 request.merged))
+                    start_time = time()
+                    result = method(*args, **kwargs)
+                    LOG.debug('%s request %s took %.5f secs'
+                              % (str(method_name), my_request_id,
+                                 time() - start_time))
+                except:
+                    LOG.error('%s request %s FAILED'
+                              % (str(method_name), my_request_id))
+                    raise
+                request.value = result
             return result
         return wrapper
     return real_serialized
-
-
-def request_index(request_queue, request_id):
-    """ Get index of request in request queue """
-    for request in request_queue:
-        if request[0] == request_id:
-            return request_queue.index(request)
@@ -20,6 +20,7 @@ try:
 except ImportError:
     from oslo_log import log as logging
 from neutron.plugins.common import constants as plugin_const
+from f5.bigip import exceptions as f5ex
 from f5.bigip import interfaces as bigip_interfaces
 
 LOG = logging.getLogger(__name__)
@@ -194,19 +195,38 @@ class BigipVipManager(object):
         bigip_vs = bigip.virtual_server
 
         desc = vip['name'] + ':' + vip['description']
-        bigip_vs.set_description(name=vip['id'],
-                                 description=desc,
-                                 folder=pool['tenant_id'])
-
-        bigip_vs.set_pool(name=vip['id'],
-                          pool_name=pool['id'],
-                          folder=pool['tenant_id'])
-        if vip['admin_state_up']:
-            bigip_vs.enable_virtual_server(name=vip['id'],
-                                           folder=pool['tenant_id'])
-        else:
-            bigip_vs.disable_virtual_server(name=vip['id'],
-                                            folder=pool['tenant_id'])
+        # HTTP vips are throttled with an irule, others with
+        # the connection limit of the virtual server
+        conn_limit = 0
+        rps_throttle = False
+        if vip['connection_limit'] > 0 and 'protocol' in vip:
+            # spec says you need to do this for HTTP
+            # and HTTPS, but unless you can decrypt
+            # you can't measure HTTP rps for HTTPs
+            conn_limit = int(vip['connection_limit'])
+            rps_throttle = vip['protocol'] == 'HTTP'
+
+        # the attribute updates are merged into one PATCH
+        with bigip.transaction(
+                exception=f5ex.VirtualServerUpdateException):
+            bigip_vs.set_description(name=vip['id'],
+                                     description=desc,
+                                     folder=pool['tenant_id'])
+
+            bigip_vs.set_pool(name=vip['id'],
+                              pool_name=pool['id'],
+                              folder=pool['tenant_id'])
+            if vip['admin_state_up']:
+                bigip_vs.enable_virtual_server(name=vip['id'],
+                                               folder=pool['tenant_id'])
+            else:
+                bigip_vs.disable_virtual_server(name=vip['id'],
+                                                folder=pool['tenant_id'])
+            if not rps_throttle:
+                LOG.debug('setting connection limit')
+                bigip_vs.set_connection_limit(name=vip['id'],
+                                              connection_limit=conn_limit,
+                                              folder=pool['tenant_id'])
 
         if 'session_persistence' in vip and vip['session_persistence']:
             # branch on persistence type
@@ -241,41 +261,30 @@ class BigipVipManager(object):
             bigip_vs.remove_all_persist_profiles(name=vip['id'],
                                                  folder=vip['tenant_id'])
 
-        if vip['connection_limit'] > 0 and 'protocol' in vip:
-            # spec says you need to do this for HTTP
-            # and HTTPS, but unless you can decrypt
-            # you can't measure HTTP rps for HTTPs
-            conn_limit = int(vip['connection_limit'])
-            if vip['protocol'] == 'HTTP':
-                LOG.debug('adding http profile and RPS throttle rule')
-                # add an http profile
-                bigip_vs.add_profile(
-                    name=vip['id'],
-                    profile_name='/Common/http',
-                    folder=vip['tenant_id'])
-                # create the rps irule
-                rule_definition = \
-                    self._create_http_rps_throttle_rule(conn_limit)
-                # try to create the irule
-                bigip.rule.create(name=RPS_THROTTLE_RULE_PREFIX + vip['id'],
-                                  rule_definition=rule_definition,
-                                  folder=vip['tenant_id'])
-                # for the rule text to update becuase
-                # connection limit may have changed
-                bigip.rule.update(name=RPS_THROTTLE_RULE_PREFIX + vip['id'],
-                                  rule_definition=rule_definition,
-                                  folder=vip['tenant_id'])
-                # add the throttle to the vip
-                rule_name = RPS_THROTTLE_RULE_PREFIX + vip['id']
-                bigip_vs.add_rule(name=vip['id'], rule_name=rule_name,
-                                  priority=500, folder=vip['tenant_id'])
-            else:
-                LOG.debug('setting connection limit')
-                # if not HTTP.. use connection limits
-                bigip_vs.set_connection_limit(name=vip['id'],
-                                              connection_limit=conn_limit,
-                                              folder=pool['tenant_id'])
-        else:
+        if rps_throttle:
+            LOG.debug('adding http profile and RPS throttle rule')
+            # add an http profile
+            bigip_vs.add_profile(
+                name=vip['id'],
+                profile_name='/Common/http',
+                folder=vip['tenant_id'])
+            # create the rps irule
+            rule_definition = \
+                self._create_http_rps_throttle_rule(conn_limit)
+            # try to create the irule
+            bigip.rule.create(name=RPS_THROTTLE_RULE_PREFIX + vip['id'],
+                              rule_definition=rule_definition,
+                              folder=vip['tenant_id'])
+            # for the rule text to update becuase
+            # connection limit may have changed
+            bigip.rule.update(name=RPS_THROTTLE_RULE_PREFIX + vip['id'],
+                              rule_definition=rule_definition,
+                              folder=vip['tenant_id'])
+            # add the throttle to the vip
+            rule_name = RPS_THROTTLE_RULE_PREFIX + vip['id']
+            bigip_vs.add_rule(name=vip['id'], rule_name=rule_name,
+                              priority=500, folder=vip['tenant_id'])
+        elif not conn_limit:
             # clear throttle rule
             LOG.debug('removing RPS throttle rule if present')
             rule_name = RPS_THROTTLE_RULE_PREFIX + vip['id']
@@ -283,11 +292,6 @@ class BigipVipManager(object):
                                  rule_name=rule_name,
                                  priority=500,
                                  folder=vip['tenant_id'])
-            # clear the connection limits
-            LOG.debug('removing connection limits')
-            bigip_vs.set_connection_limit(name=vip['id'],
-                                          connection_limit=0,
-                                          folder=pool['tenant_id'])
 
     def _set_bigip_vip_cookie_persist(self, bigip, service):
         """ Setup VIP Cookie Persistence """
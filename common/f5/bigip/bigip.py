@@ -18,10 +18,14 @@ import os
 import logging
 import requests
 import socket
+import threading
 
 from f5.bigip.pycontrol import pycontrol as pc
 from f5.common import constants as const
 from f5.bigip import interfaces as bigip_interfaces
+from f5.bigip.cache import ConfigCache
+from f5.bigip.transaction import Transaction
+from f5.bigip.transaction import TransactionSession
 
 from f5.bigip.interfaces.cluster import Cluster
 from f5.bigip.interfaces.device import Device
@@ -49,13 +53,23 @@ LOG = logging.getLogger(__name__)
 class BigIP(object):
     """ An interface to a single BIG-IP """
     def __init__(self, hostname, username, password, timeout=None):
-        # get icontrol connection stub
-        self.icontrol = self._get_icontrol(hostname, username, password)
         self.icr_session = self._get_icr_session(hostname, username, password)
         self.icr_url = 'https://%s/mgmt/tm' % hostname
+        # get icontrol connection stub
+        version = None
+        if const.WSDL_VERSION_CACHE_DIR:
+            version = self._get_tmos_version()
+        self.icontrol = self._get_icontrol(hostname, username, password,
+                                           version=version)
 
         # interface instance cache
         self.interfaces = {}
+        # configuration state cache
+        self.config_cache = ConfigCache()
+        # serializes calls which depend on the SOAP active folder
+        self.folder_lock = threading.RLock()
+        # serializes picking and creating route domain ids
+        self.route_domain_lock = threading.RLock()
         self.device_name = None
         self.local_ip = None
 
@@ -289,6 +303,13 @@ class BigIP(object):
         if not folder.startswith("/"):
             folder = "/" + folder
         self.system.set_folder(folder)
+        return self.get_folder_path(name, folder)
+
+    @staticmethod
+    def get_folder_path(name, folder='/Common'):
+        """ Full path of name in folder """
+        if not folder.startswith("/"):
+            folder = "/" + folder
         if name:
             if not name.startswith(folder + "/"):
                 return folder + "/" + name
@@ -297,6 +318,10 @@ class BigIP(object):
         else:
             return None
 
+    def transaction(self, **kwargs):
+        """ Batch iControl REST writes made in a with block """
+        return Transaction(self, **kwargs)
+
     def icr_link(self, selfLink):
         """ Create iControl REST link """
         return selfLink.replace('https://localhost/mgmt/tm', self.icr_url)
@@ -306,8 +331,27 @@ class BigIP(object):
         folder = str(folder).replace('/', '')
         return bigip_interfaces.prefixed(folder)
 
+    def _get_tmos_version(self):
+        """ Get version-build of the device through iControl REST """
+        try:
+            response = self.icr_session.get(
+                self.icr_url + '/sys/version',
+                timeout=const.CONNECTION_TIMEOUT)
+            if response.status_code < 400:
+                entries = response.json()['entries']
+                for entry in entries.values():
+                    stats = entry['nestedStats']['entries']
+                    return '%s-%s' % (stats['Version']['description'],
+                                      stats['Build']['description'])
+            else:
+                LOG.error('error getting TMOS version: %s' % response.text)
+        except Exception as exc:
+            LOG.error('error getting TMOS version: %s' % exc.message)
+        return None
+
     @staticmethod
-    def _get_icontrol(hostname, username, password, timeout=None):
+    def _get_icontrol(hostname, username, password, timeout=None,
+                      version=None):
         """ Initialize iControl interface """
         # Logger.log(Logger.DEBUG,
         #           "Opening iControl connections to %s for interfaces %s"
@@ -324,6 +368,8 @@ class BigIP(object):
                                 username=username,
                                 password=password,
                                 fromurl=True,
+                                version=version,
+                                cache_dir=const.WSDL_VERSION_CACHE_DIR,
                                 wsdls=[])
 
         if timeout:
@@ -336,7 +382,7 @@ class BigIP(object):
     @staticmethod
     def _get_icr_session(hostname, username, password, timeout=None):
         """ Get iControl REST Session """
-        icr_session = requests.session()
+        icr_session = TransactionSession()
         icr_session.auth = (username, password)
         icr_session.verify = False
         if hasattr(requests, 'packages'):
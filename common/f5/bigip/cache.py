@@ -0,0 +1,216 @@
+""" Local cache of BIG-IP configuration state """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from f5.common import constants as const
+
+import time
+
+
+class ConfigCache(object):
+    """ Local cache of the configuration state of one BIG-IP.
+
+        Device state is kept as sets of object names per kind of
+        object and partition. A set is loaded from one collection
+        GET and kept current by our own writes. It expires after
+        ttl seconds and is dropped on errors, or when the device
+        config generation changed while we were not writing.
+
+        Assured state records what the agent has already assured
+        on the device, as keys per kind. It is only dropped when
+        the cache is flushed.
+
+        The tunnel registry maps tunnel names to the folders they
+        exist in and their tunnel keys. It is loaded from one
+        collection GET, kept current by our own tunnel writes and
+        single tunnel reads, and dropped with the device state.
+
+        Requests of several tenants share the cache of a device. A
+        load or an assurance can take a token before it goes to the
+        device; it is not recorded if our own writes, a clear or an
+        invalidation changed the same state in the meantime. """
+
+    def __init__(self, ttl=const.CONFIG_CACHE_TIMEOUT):
+        self.ttl = ttl
+        self.sections = {}
+        self.assured = {}
+        self.tunnels = None
+        self.device_generation = None
+        self.writes_since_generation = 0
+        self.epoch = 0
+        self.changes = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_token(self, kind, partition=None):
+        """ Token for a load of kind in partition, or for assuring
+            key partition of kind """
+        return (self.epoch, self.changes.get((kind, partition), 0))
+
+    def _changed(self, kind, partition=None):
+        """ Make the tokens of kind in partition stale """
+        self.changes[(kind, partition)] = \
+            self.changes.get((kind, partition), 0) + 1
+
+    def _is_stale(self, token, kind, partition=None):
+        """ Did kind in partition change since token was taken? """
+        return token is not None and \
+            token != self.get_token(kind, partition)
+
+    def get_names(self, kind, partition):
+        """ Cached names of kind in partition, None if not cached """
+        section = self.sections.get((kind, partition), None)
+        if section:
+            if time.time() - section['loaded'] < self.ttl:
+                self.hits += 1
+                return section['names']
+            del self.sections[(kind, partition)]
+        self.misses += 1
+        return None
+
+    def set_names(self, kind, partition, names, generation=None,
+                  token=None):
+        """ Load the names of kind in partition read from the device """
+        if self._is_stale(token, kind, partition):
+            return
+        self.note_generation(generation)
+        self.sections[(kind, partition)] = {'loaded': time.time(),
+                                            'names': set(names)}
+
+    def add_name(self, kind, partition, name):
+        """ Record that we created an object """
+        self.writes_since_generation += 1
+        self._changed(kind, partition)
+        section = self.sections.get((kind, partition), None)
+        if section:
+            section['names'].add(name)
+
+    def remove_name(self, kind, partition, name):
+        """ Record that we deleted an object """
+        self.writes_since_generation += 1
+        self._changed(kind, partition)
+        section = self.sections.get((kind, partition), None)
+        if section:
+            section['names'].discard(name)
+
+    def check_name(self, kind, partition, name, exists):
+        """ Drop the cached names of kind in partition if the device
+            disagrees with them about name """
+        section = self.sections.get((kind, partition), None)
+        if section and (name in section['names']) != exists:
+            del self.sections[(kind, partition)]
+            self._changed(kind, partition)
+
+    def invalidate(self, kind=None, partition=None):
+        """ Drop cached device state of kind and/or partition """
+        self.epoch += 1
+        for (section_kind, section_partition) in list(self.sections):
+            if kind and kind != section_kind:
+                continue
+            if partition and partition != section_partition:
+                continue
+            del self.sections[(section_kind, section_partition)]
+        if kind and kind != 'tunnel':
+            return
+        if partition and self.tunnels is not None:
+            for name in list(self.tunnels):
+                self.tunnels[name].pop(partition, None)
+                if not self.tunnels[name]:
+                    del self.tunnels[name]
+        else:
+            self.tunnels = None
+
+    def get_tunnels(self):
+        """ Cached tunnel registry, None if not cached """
+        if self.tunnels is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return self.tunnels
+
+    def set_tunnels(self, tunnels, generation=None, token=None):
+        """ Load the tunnel registry read from the device as
+            (name, folder, key) tuples. Returns the registry. """
+        registry = {}
+        for (name, folder, key) in tunnels:
+            registry.setdefault(name, {})[folder] = key
+        if not self._is_stale(token, 'tunnel'):
+            self.note_generation(generation)
+            self.tunnels = registry
+        return registry
+
+    def add_tunnel(self, name, folder, key):
+        """ Record that we created a tunnel """
+        self.writes_since_generation += 1
+        self._changed('tunnel')
+        if self.tunnels is not None:
+            self.tunnels.setdefault(name, {})[folder] = key
+
+    def note_tunnel(self, name, folder, key):
+        """ Record a tunnel read from the device """
+        if self.tunnels is not None:
+            self.tunnels.setdefault(name, {})[folder] = key
+
+    def remove_tunnel(self, name, folder):
+        """ Record that we deleted a tunnel """
+        self.writes_since_generation += 1
+        self._changed('tunnel')
+        if self.tunnels is not None and name in self.tunnels:
+            self.tunnels[name].pop(folder, None)
+            if not self.tunnels[name]:
+                del self.tunnels[name]
+
+    def note_generation(self, generation):
+        """ Drop device state if the device config changed under us """
+        if generation is None:
+            return
+        if self.device_generation is not None and \
+                generation != self.device_generation and \
+                not self.writes_since_generation:
+            self.invalidate()
+        self.device_generation = generation
+        self.writes_since_generation = 0
+
+    def is_assured(self, kind, key):
+        """ Has the agent assured key of kind on the device? """
+        return kind in self.assured and key in self.assured[kind]
+
+    def set_assured(self, kind, key, token=None):
+        """ Record that the agent assured key of kind """
+        if self._is_stale(token, kind, key):
+            return
+        if kind not in self.assured:
+            self.assured[kind] = set()
+        self.assured[kind].add(key)
+
+    def clear_assured(self, kind, key):
+        """ Forget that the agent assured key of kind """
+        self._changed(kind, key)
+        if kind in self.assured:
+            self.assured[kind].discard(key)
+
+    def get_assured(self, kind):
+        """ All assured keys of kind """
+        return set(self.assured.get(kind, ()))
+
+    def flush(self):
+        """ Drop all cached state """
+        self.epoch += 1
+        self.changes = {}
+        self.sections = {}
+        self.assured = {}
+        self.tunnels = None
+        self.device_generation = None
+        self.writes_since_generation = 0
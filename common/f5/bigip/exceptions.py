@@ -46,6 +46,10 @@ class BigIPClusterConfigSaveFailure(Exception):
     pass
 
 
+class BigIPTransactionFailure(Exception):
+    pass
+
+
 class UnknownMonitorType(Exception):
     pass
 
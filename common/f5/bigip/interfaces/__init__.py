@@ -42,15 +42,34 @@ def icontrol_folder(method):
 
     It also sets the iControl active folder to folder kwarg
     assuring get_list returns just the appopriate objects
-    for the specific administrative partition. It does this
-    for kwarg named 'name', ends in '_name', or 'named_address'.
+    for the specific administrative partition. The full paths
+    for kwarg named 'name', ends in '_name', or 'named_address'
+    are computed locally, so the active folder is only changed
+    once per call, and only if it differs.
 
     If the value in the name already includes '/Common/' the
     decoration honors that full path.
+
+    The SOAP active folder is shared by everything using the device,
+    so the call holds the folder lock of the device from setting the
+    active folder until the method returns.
     """
     def wrapper(*args, **kwargs):
         """ Necessary wrapper """
+        with args[0].bigip.folder_lock:
+            return call_in_folder(*args, **kwargs)
+
+    def call_in_folder(*args, **kwargs):
+        """ Set the active folder and call method """
         instance = args[0]
+        # each path computed locally replaces a set_folder round trip
+        paths = []
+
+        def folder_path(name, folder):
+            """ Full path of name in folder """
+            paths.append(name)
+            return instance.bigip.get_folder_path(name, folder)
+
         preserve_vlan_name = False
         if 'preserve_vlan_name' in kwargs:
             preserve_vlan_name = kwargs['preserve_vlan_name']
@@ -67,13 +86,13 @@ def icontrol_folder(method):
                     if kwargs['name'].startswith('/Common/'):
                         kwargs['name'] = os.path.basename(kwargs['name'])
                         kwargs['name'] = prefixed(kwargs['name'])
-                        kwargs['name'] = instance.bigip.set_folder(
-                            kwargs['name'], 'Common')
+                        kwargs['name'] = folder_path(kwargs['name'],
+                                                     'Common')
                     else:
                         kwargs['name'] = os.path.basename(kwargs['name'])
                         kwargs['name'] = prefixed(kwargs['name'])
-                        kwargs['name'] = instance.bigip.set_folder(
-                            kwargs['name'], kwargs['folder'])
+                        kwargs['name'] = folder_path(kwargs['name'],
+                                                     kwargs['folder'])
             if 'named_address' in kwargs and kwargs['named_address']:
                 if isinstance(kwargs['name'], basestring):
                     if kwargs['named_address'].find('~') > -1:
@@ -83,14 +102,14 @@ def icontrol_folder(method):
                         kwargs['named_address'] = \
                             os.path.basename(kwargs['named_address'])
                         kwargs['named_address'] = \
-                            instance.bigip.set_folder(kwargs['named_address'],
-                                                      'Common')
+                            folder_path(kwargs['named_address'],
+                                        'Common')
                     else:
                         kwargs['named_address'] = \
                             os.path.basename(kwargs['named_address'])
                         kwargs['named_address'] = \
-                            instance.bigip.set_folder(kwargs['named_address'],
-                                                      kwargs['folder'])
+                            folder_path(kwargs['named_address'],
+                                        kwargs['folder'])
             for name in kwargs:
                 if name.find('_folder') > 0 and kwargs[name]:
                     if kwargs[name].find('~') > -1:
@@ -106,8 +125,8 @@ def icontrol_folder(method):
                             kwargs[name] = os.path.basename(kwargs[name])
                             if name != 'vlan_name' or not preserve_vlan_name:
                                 kwargs[name] = prefixed(kwargs[name])
-                            kwargs[name] = instance.bigip.set_folder(
-                                kwargs[name], 'Common')
+                            kwargs[name] = folder_path(kwargs[name],
+                                                       'Common')
                         else:
                             name_prefix = name[0:name.index('_name')]
                             specific_folder_name = name_prefix + "_folder"
@@ -117,9 +136,17 @@ def icontrol_folder(method):
                             kwargs[name] = os.path.basename(kwargs[name])
                             if name != 'vlan_name' or not preserve_vlan_name:
                                 kwargs[name] = prefixed(kwargs[name])
-                            kwargs[name] = instance.bigip.set_folder(
-                                kwargs[name], folder)
+                            kwargs[name] = folder_path(kwargs[name],
+                                                       folder)
+            system = instance.bigip.system
+            switches = system.folder_switches
             instance.bigip.set_folder(None, kwargs['folder'])
+            system.folder_switches_saved += len(paths)
+            saved = len(paths)
+            if system.folder_switches == switches:
+                saved += 1
+            LOG.debug('%s saved %d iControl folder switches',
+                      method.__name__, saved)
         return method(*args, **kwargs)
     return wrapper
 
@@ -123,6 +123,68 @@ class ARP(object):
                 raise exceptions.StaticARPDeleteException(exc.message)
         return False
 
+    @icontrol_folder
+    @log
+    def create_multiple(self, entries=None, folder='Common'):
+        """ Create ARP static entries from a map of ip to mac address
+            with one query and one create request. Both run under the
+            folder lock of the device, taken by icontrol_folder. """
+        if not entries:
+            return []
+        try:
+            arp_list = self.net_arp.get_static_entry_list()
+        except Exception as exc:
+            Log.error('ARP', 'query exception: %s on %s' %
+                      (exc.message, self.bigip.device_name))
+            raise exceptions.StaticARPQueryException(exc.message)
+        create_arp = self.net_arp.typefactory.create
+        new_entries = []
+        for ip_address in entries:
+            # ARP entries can't handle %0 on them like other
+            # TMOS objects.
+            address = self._remove_route_domain_zero(ip_address)
+            if '/' + folder + '/' + address in arp_list:
+                continue
+            entry = create_arp('Networking.ARP.StaticEntry')
+            entry.address = address
+            entry.mac_address = entries[ip_address]
+            new_entries.append(entry)
+        if new_entries:
+            try:
+                self.net_arp.add_static_entry(new_entries)
+            except Exception as exc:
+                Log.error('ARP', 'create exception: ' + exc.message)
+                raise exceptions.StaticARPCreationException(exc.message)
+        return [new_entry.address for new_entry in new_entries]
+
+    @icontrol_folder
+    @log
+    def delete_multiple(self, ip_addresses=None, folder='Common'):
+        """ Delete ARP static entries with one query and
+            one delete request. Both run under the folder lock of
+            the device, taken by icontrol_folder. """
+        if not ip_addresses:
+            return []
+        try:
+            arp_list = self.net_arp.get_static_entry_list()
+        except Exception as exc:
+            Log.error('ARP', 'query exception: %s on %s' %
+                      (exc.message, self.bigip.device_name))
+            raise exceptions.StaticARPQueryException(exc.message)
+        deletions = []
+        for ip_address in ip_addresses:
+            entry_name = '/' + folder + '/' + \
+                self._remove_route_domain_zero(ip_address)
+            if entry_name in arp_list and entry_name not in deletions:
+                deletions.append(entry_name)
+        if deletions:
+            try:
+                self.net_arp.delete_static_entry_v2(deletions)
+            except Exception as exc:
+                Log.error('ARP', 'delete exception: ' + exc.message)
+                raise exceptions.StaticARPDeleteException(exc.message)
+        return deletions
+
     @icontrol_folder
     @log
     def delete_by_mac(self, mac_address=None, folder='Common'):
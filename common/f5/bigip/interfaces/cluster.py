@@ -18,10 +18,12 @@ from f5.common.logger import Log
 from f5.bigip import exceptions
 from f5.bigip.interfaces import log
 
+from eventlet import greenthread
 import time
 import os
 import json
 import base64
+import random
 
 
 # Management - Cluster
@@ -139,78 +141,44 @@ class Cluster(object):
     # In order to avoid sync problems, you should wait until devices
     # in the group are connected.
     @log
-    def sync(self, name, force_now=False):
-        """ Ensure local device in sync with group """
+    def sync(self, name, force_now=False, deadline=const.SYNC_DEADLINE):
+        """ Ensure local device in sync with group.
+
+            The sync status is polled with exponential backoff and
+            jitter, yielding to other greenthreads while waiting. A
+            config-sync to the group is pushed if the group has not
+            synced within the push interval, which grows by SYNC_DELAY
+            after each push. Gives up after MAX_SYNC_ATTEMPTS pushes
+            or after deadline seconds. """
         sync_start_time = time.time()
+        give_up_time = sync_start_time + deadline
         dev_name = self.get_local_device_name()
-        sleep_delay = const.SYNC_DELAY
+        push_interval = const.SYNC_DELAY
+        poll_delay = const.SYNC_POLL_INTERVAL
+        last_log_time = 0
 
         attempts = 0
+        pushed = False
         if force_now:
             self.sync_local_device_to_group(name)
-            time.sleep(sleep_delay)
             attempts += 1
+            pushed = True
+        wait_start_time = time.time()
 
-        while attempts < const.MAX_SYNC_ATTEMPTS:
+        while True:
             state = self.get_sync_status()
+            now = time.time()
             if state in ['Standalone', 'In Sync']:
-                break
-
-            elif state == 'Awaiting Initial Sync':
-                attempts += 1
-                Log.info(
-                    'Cluster',
-                    "Device %s - Synchronizing initial config to group %s"
-                    % (dev_name, name))
-                self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
+                Log.debug('Cluster', 'SYNC SECONDS(Success): %s',
+                          now - sync_start_time)
+                return
 
-            elif state in ['Disconnected',
-                           'Not All Devices Synced',
-                           'Changes Pending']:
-                attempts += 1
-
-                last_log_time = 0
-                now = time.time()
-                wait_start_time = now
-                # Keep checking the sync state in a quick loop.
-                # We want to detect In Sync as quickly as possible.
-                while now - wait_start_time < sleep_delay:
-                    # Only log once per second
-                    if now - last_log_time >= 1:
-                        Log.info(
-                            'Cluster',
-                            'Device %s, Group %s not synced. '
-                            % (dev_name, name) +
-                            'Waiting. State is: %s'
-                            % state)
-                        last_log_time = now
-                    state = self.get_sync_status()
-                    if state in ['Standalone', 'In Sync']:
-                        break
-                    time.sleep(.5)
-                    now = time.time()
-                else:
-                    # if we didn't break out due to the group being in sync
-                    # then attempt to force a sync.
-                    self.sync_local_device_to_group(name)
-                    sleep_delay += const.SYNC_DELAY
-                    # no need to sleep here because we already spent the sleep
-                    # interval checking status.
-                    continue
-
-                # Only a break from the inner while loop due to Standalone or
-                # In Sync will reach here.
-                # Normal exit of the while loop reach the else statement
-                # above which continues the outer loop
-                break
-
-            elif state == 'Sync Failure':
+            if state == 'Sync Failure':
                 Log.info('Cluster',
                          "Device %s - Synchronization failed for %s"
                          % (dev_name, name))
-                Log.debug('Cluster', 'SYNC SECONDS (Sync Failure): ' +
-                          str(time.time() - sync_start_time))
+                Log.debug('Cluster', 'SYNC SECONDS (Sync Failure): %s',
+                          now - sync_start_time)
                 raise exceptions.BigIPClusterSyncFailure(
                     'Device service group %s' % name +
                     ' failed after ' +
@@ -218,40 +186,63 @@ class Cluster(object):
                     ' Correct sync problem manually' +
                     ' according to sol13946 on ' +
                     ' support.f5.com.')
+
+            if attempts >= const.MAX_SYNC_ATTEMPTS or now >= give_up_time:
+                break
+
+            waited = now - wait_start_time
+            if state in ['Disconnected',
+                         'Not All Devices Synced',
+                         'Changes Pending']:
+                # give the group a chance to sync on its own
+                if now - last_log_time >= 1:
+                    Log.info('Cluster',
+                             'Device %s, Group %s not synced. '
+                             'Waiting. State is: %s', dev_name, name, state)
+                    last_log_time = now
+                push = waited >= push_interval
             else:
+                # awaiting initial sync or an unexpected state
+                push = not pushed or waited >= push_interval
+
+            if push:
                 attempts += 1
                 Log.info('Cluster',
-                         "Device %s " % dev_name +
-                         "Synchronizing config attempt %s to group %s:"
-                         % (attempts, name) + " current state: %s" % state)
+                         'Device %s Synchronizing config attempt %s to '
+                         'group %s: current state: %s',
+                         dev_name, attempts, name, state)
                 self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
-                sleep_delay += const.SYNC_DELAY
+                if pushed:
+                    push_interval += const.SYNC_DELAY
+                pushed = True
+                wait_start_time = now
+                poll_delay = const.SYNC_POLL_INTERVAL
+
+            sleep_time = poll_delay * random.uniform(0.5, 1.0)
+            greenthread.sleep(min(sleep_time, max(give_up_time - now, 0)))
+            poll_delay = min(poll_delay * 2, const.SYNC_MAX_POLL_INTERVAL)
+
+        if state == 'Disconnected':
+            Log.debug('Cluster', 'SYNC SECONDS(Disconnected): %s',
+                      time.time() - sync_start_time)
+            raise exceptions.BigIPClusterSyncFailure(
+                'Device service group %s' % name +
+                ' could not reach a sync state' +
+                ' because they can not communicate' +
+                ' over the sync network. Please' +
+                ' check connectivity.')
         else:
-            if state == 'Disconnected':
-                Log.debug('Cluster',
-                          'SYNC SECONDS(Disconnected): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' could not reach a sync state' +
-                    ' because they can not communicate' +
-                    ' over the sync network. Please' +
-                    ' check connectivity.')
-            else:
-                Log.debug('Cluster', 'SYNC SECONDS(Timeout): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' could not reach a sync state after ' +
-                    '%s attempts.' % const.MAX_SYNC_ATTEMPTS +
-                    ' It is in %s state currently.' % state +
-                    ' Correct sync problem manually' +
-                    ' according to sol13946 on ' +
-                    ' support.f5.com.')
-
-        Log.debug('Cluster', 'SYNC SECONDS(Success): ' +
-                  str(time.time() - sync_start_time))
+            Log.debug('Cluster', 'SYNC SECONDS(Timeout): %s',
+                      time.time() - sync_start_time)
+            raise exceptions.BigIPClusterSyncFailure(
+                'Device service group %s' % name +
+                ' could not reach a sync state after ' +
+                '%s attempts in %d seconds.'
+                % (attempts, time.time() - sync_start_time) +
+                ' It is in %s state currently.' % state +
+                ' Correct sync problem manually' +
+                ' according to sol13946 on ' +
+                ' support.f5.com.')
 
     @log
     def sync_failover_dev_group_exists(self, name):
@@ -426,37 +426,39 @@ class Device(object):
     @log
     def remove_all_peers(self):
         """ Remove all peers from group """
-        self.bigip.system.set_folder('/Common')
-        current_dev_name = self.get_device_name()
-        devs_to_remove = []
-        for dev in self.get_all_device_names():
-            if dev != current_dev_name:
-                devs_to_remove.append(dev)
-        if devs_to_remove:
-            try:
-                self.mgmt_trust.remove_device(devs_to_remove)
-            except Exception as e:
-                Log.error('device', e.message)
-                raise exceptions.DeviceUpdateException(e.message)
-        self.remove_metadata(None, {
-                             'root_device_name': None,
-                             'root_device_mgmt_address': None})
+        with self.bigip.folder_lock:
+            self.bigip.system.set_folder('/Common')
+            current_dev_name = self.get_device_name()
+            devs_to_remove = []
+            for dev in self.get_all_device_names():
+                if dev != current_dev_name:
+                    devs_to_remove.append(dev)
+            if devs_to_remove:
+                try:
+                    self.mgmt_trust.remove_device(devs_to_remove)
+                except Exception as e:
+                    Log.error('device', e.message)
+                    raise exceptions.DeviceUpdateException(e.message)
+            self.remove_metadata(None, {
+                                 'root_device_name': None,
+                                 'root_device_mgmt_address': None})
 
     @log
     def reset_trust(self, new_name):
         """ Remove trust """
-        self.bigip.system.set_folder('/Common')
-        self.remove_all_peers()
-        try:
-            self.mgmt_trust.reset_all(new_name, False, '', '')
-        except Exception as e:
-            Log.error('device', e.message)
-            raise exceptions.DeviceUpdateException(e.message)
-        self.remove_metadata(None, {
-                             'root_device_name': None,
-                             'root_device_mgmt_address': None})
-        self.devicename = None
-        self.get_device_name()
+        with self.bigip.folder_lock:
+            self.bigip.system.set_folder('/Common')
+            self.remove_all_peers()
+            try:
+                self.mgmt_trust.reset_all(new_name, False, '', '')
+            except Exception as e:
+                Log.error('device', e.message)
+                raise exceptions.DeviceUpdateException(e.message)
+            self.remove_metadata(None, {
+                                 'root_device_name': None,
+                                 'root_device_mgmt_address': None})
+            self.devicename = None
+            self.get_device_name()
 
     @log
     def set_metadata(self, name=None, device_dict=None):
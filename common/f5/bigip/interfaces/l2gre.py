@@ -102,6 +102,7 @@ class L2GRE(object):
                 request_url, data=json.dumps(payload),
                 timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
+                self.bigip.config_cache.add_tunnel(name, folder, greid)
                 if not folder == 'Common':
                     self.bigip.route.add_vlan_to_domain_by_id(
                         name=name, folder=folder,
@@ -146,9 +147,8 @@ class L2GRE(object):
         request_url += '~' + folder + '~' + name
         response = self.bigip.icr_session.delete(
             request_url, timeout=const.CONNECTION_TIMEOUT)
-        if response.status_code < 400:
-            return True
-        elif response.status_code == 404:
+        if response.status_code < 400 or response.status_code == 404:
+            self.bigip.config_cache.remove_tunnel(name, folder)
             return True
         else:
             Log.error('L2GRE', response.text)
@@ -180,6 +180,7 @@ class L2GRE(object):
                             Log.error('L2GRE', response.text)
                             raise exceptions.VXLANDeleteException(
                                 response.text)
+            self.bigip.config_cache.invalidate('tunnel', folder)
             return True
         else:
             Log.error('self', response.text)
@@ -416,6 +417,26 @@ class L2GRE(object):
             raise exceptions.L2GRETunnelUpdateException(response.text)
         return False
 
+    @icontrol_rest_folder
+    @log
+    def set_fdb_records(self, tunnel_name=None, records=None,
+                        folder='Common'):
+        """ Replace all fdb records of a tunnel with one update """
+        folder = str(folder).replace('/', '')
+        request_url = self.bigip.icr_url + '/net/fdb/tunnel/'
+        request_url += '~' + folder + '~' + tunnel_name + '?ver=11.5.0'
+        if not records:
+            records = None
+        response = self.bigip.icr_session.patch(
+            request_url, data=json.dumps({'records': records}),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            return True
+        else:
+            Log.error('L2GRE', response.text)
+            raise exceptions.L2GRETunnelUpdateException(response.text)
+        return False
+
     @icontrol_rest_folder
     @log
     def get_profiles(self, folder='Common'):
@@ -490,18 +511,12 @@ class L2GRE(object):
     def get_tunnel_key(self, name=None, folder='Common'):
         """ Get tunnel key """
         folder = str(folder).replace('/', '')
-        request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
-        request_url += '~' + folder + '~' + name
-        response = self.bigip.icr_session.get(
-            request_url, timeout=const.CONNECTION_TIMEOUT)
-        if response.status_code < 400:
-            return_obj = json.loads(response.text)
-            Log.debug('L2GRE', 'get_tunnel_key got %s' + str(return_obj))
-            return return_obj['key']
-        elif response.status_code != 404:
-            Log.error('L2GRE', response.text)
-            exceptions.L2GRETunnelQueryException(response.text)
-        return None
+        loaded = self.bigip.config_cache.tunnels is not None
+        tunnels = self._get_tunnels_registry()
+        if loaded and folder not in tunnels.get(name, {}):
+            # created since the registry was read, by another agent
+            self.tunnel_exists(name=name, folder=folder)
+        return tunnels.get(name, {}).get(folder, None)
 
     @icontrol_rest_folder
     @log
@@ -532,20 +547,42 @@ class L2GRE(object):
     def get_tunnel_folder(self, tunnel_name=None):
         """ Get an existing tunnels folder """
         if tunnel_name:
-            request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
+            loaded = self.bigip.config_cache.tunnels is not None
+            tunnels = self._get_tunnels_registry()
+            if loaded and tunnel_name not in tunnels:
+                # created since the registry was read, by another agent
+                tunnels = self._get_tunnels_registry(reload=True)
+            if tunnel_name in tunnels:
+                return sorted(tunnels[tunnel_name])[0]
+        return None
+
+    def _get_tunnels_registry(self, reload=False):
+        """ Tunnel folders and keys by name from the config cache """
+        tunnels = None
+        if not reload:
+            tunnels = self.bigip.config_cache.get_tunnels()
+        if tunnels is None:
+            request_url = self.bigip.icr_url + '/net/tunnels/tunnel'
+            request_url += '?$select=name,partition,key'
+            token = self.bigip.config_cache.get_token('tunnel')
             response = self.bigip.icr_session.get(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
-            if response.status_code < 400:
-                return_obj = json.loads(response.text)
-                if 'items' in return_obj:
-                    for tunnel in return_obj['items']:
-                        if tunnel['name'] == tunnel_name:
-                            return tunnel['partition']
-                return None
-            elif response.status_code != 404:
+            if response.status_code < 400 or response.status_code == 404:
+                registry = []
+                generation = None
+                if response.status_code < 400:
+                    return_obj = json.loads(response.text)
+                    for tunnel in return_obj.get('items', []):
+                        registry.append((tunnel['name'],
+                                         tunnel['partition'],
+                                         tunnel.get('key')))
+                    generation = return_obj.get('generation')
+                tunnels = self.bigip.config_cache.set_tunnels(
+                    registry, generation, token)
+            else:
                 Log.error('L2GRE', response.text)
                 raise exceptions.L2GRETunnelQueryException(response.text)
-        return None
+        return tunnels
 
     @icontrol_rest_folder
     @log
@@ -554,10 +591,14 @@ class L2GRE(object):
         folder = str(folder).replace('/', '')
         request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
         request_url += '~' + folder + '~' + name
+        request_url += '?$select=name,partition,key'
 
         response = self.bigip.icr_session.get(
             request_url, timeout=const.CONNECTION_TIMEOUT)
         if response.status_code < 400:
+            tunnel = json.loads(response.text)
+            self.bigip.config_cache.note_tunnel(
+                tunnel['name'], tunnel['partition'], tunnel.get('key'))
             return True
         elif response.status_code != 404:
             Log.error('L2GRE', response.text)
@@ -47,11 +47,11 @@ class Pool(object):
             response = self.bigip.icr_session.post(
                 request_url, data=json.dumps(payload),
                 timeout=const.CONNECTION_TIMEOUT)
-            if response.status_code < 400:
-                return True
-            elif response.status_code == 409:
+            if response.status_code < 400 or response.status_code == 409:
+                self.bigip.config_cache.add_name('pool', folder, name)
                 return True
             else:
+                self.bigip.config_cache.invalidate('pool', folder)
                 Log.error('pool', response.text)
                 raise exceptions.PoolCreationException(response.text)
         return False
@@ -79,6 +79,7 @@ class Pool(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400 or response.status_code == 404:
+                self.bigip.config_cache.remove_name('pool', folder, name)
                 for node_address in node_addresses:
                     node_url = self.bigip.icr_url + '/ltm/node/'
                     node_url += '~' + folder + '~' + urllib.quote(node_address)
@@ -94,6 +95,8 @@ class Pool(object):
                         pass
                     else:
                         raise exceptions.PoolDeleteException(node_res.text)
+            else:
+                self.bigip.config_cache.invalidate('pool', folder)
             return True
         return False
 
@@ -238,8 +241,8 @@ class Pool(object):
             Log.error('pool', response.text)
             raise exceptions.PoolQueryException(response.text)
 
-        Log.debug('pool', 'purging pools - existing : %s, known : %s'
-                  % (existing_pools.keys(), known_pools))
+        Log.debug('pool', 'purging pools - existing : %s, known : %s',
+                  existing_pools.keys(), known_pools)
 
         # we start with all pools and remove the ones that are
         # completely unrelated to the plugin or are OK to be there.
@@ -252,16 +255,16 @@ class Pool(object):
 
         for pool in known_pools:
             decorated_pool = self.OBJ_PREFIX + pool
-            Log.debug('pool', 'excluding %s from %s' %
-                      (str(decorated_pool), str(cleanup_list)))
+            Log.debug('pool', 'excluding %s from %s',
+                      decorated_pool, cleanup_list)
             if decorated_pool in cleanup_list:
                 del cleanup_list[decorated_pool]
 
         # anything left should be purged
         for pool in cleanup_list:
             Log.debug('purge_orphaned_pools',
-                      "Purging pool %s in folder %s" %
-                      (pool, cleanup_list[pool]))
+                      "Purging pool %s in folder %s",
+                      pool, cleanup_list[pool])
             vs_name = \
                 self.bigip.virtual_server.get_virtual_servers_by_pool_name(
                     pool_name=pool, folder=cleanup_list[pool])
@@ -279,8 +282,8 @@ class Pool(object):
                     Log.error('purge_orphaned_pools', e.message)
             try:
                 Log.debug('purge_orphaned_pools',
-                          "Deleting pool %s in folder %s" %
-                          (pool, cleanup_list[pool]))
+                          "Deleting pool %s in folder %s",
+                          pool, cleanup_list[pool])
                 self.delete(name=pool, folder=cleanup_list[pool])
             except Exception as e:
                     Log.error('purge_orphaned_pools', e.message)
@@ -341,22 +344,90 @@ class Pool(object):
                     if 'nestedStats' in stats[stat]:
                         stats = stats[stat]['nestedStats']['entries']
                         break
-                for stat in stats:
-                    name = stat
-                    value = None
-                    if 'value' in stats[name]:
-                        value = stats[name]['value']
-                    if 'description' in stats[name]:
-                        value = stats[name]['description']
-                    if value is None:
-                        Log.error('poolstats', 'bad stats:' + response.text)
+                return_stats = self._get_icontrol_stats(stats)
+        elif response.status_code != 404:
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
+        return return_stats
+
+    @log
+    def get_all_statistics(self):
+        """ Get statistics of all pools in one request,
+            keyed by (partition, pool name) """
+        request_url = self.bigip.icr_url + '/ltm/pool/stats'
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        all_stats = {}
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            if 'entries' in return_obj:
+                for entry in return_obj['entries'].values():
+                    if 'nestedStats' not in entry:
                         continue
-                    (st, val) = self._get_icontrol_stat(name, value)
-                    if st:
-                        return_stats[st] = val
+                    stats = entry['nestedStats']['entries']
+                    if 'tmName' not in stats:
+                        continue
+                    key = self._get_path_key(stats['tmName']['description'])
+                    all_stats[key] = self._get_icontrol_stats(stats)
+        elif response.status_code != 404:
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
+        return all_stats
+
+    @log
+    def get_all_members_monitor_status(self):
+        """ Get member monitor states of all pools in one request,
+            keyed by (partition, pool name) """
+        request_url = self.bigip.icr_url + '/ltm/pool'
+        request_url += '?expandSubcollections=true'
+        request_url += '&$select=fullPath,membersReference'
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        all_members = {}
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            if 'items' in return_obj:
+                for pool in return_obj['items']:
+                    members = []
+                    if 'membersReference' in pool and \
+                            'items' in pool['membersReference']:
+                        for member in pool['membersReference']['items']:
+                            (addr, port) = split_addr_port(member['name'])
+                            member_state = 'MONITOR_STATUS_' + \
+                                member['state'].upper()
+                            members.append(
+                                {'addr': addr,
+                                 'port': port,
+                                 'state': member_state})
+                    all_members[self._get_path_key(pool['fullPath'])] = \
+                        members
         elif response.status_code != 404:
             Log.error('pool', response.text)
             raise exceptions.PoolQueryException(response.text)
+        return all_members
+
+    @staticmethod
+    def _get_path_key(path):
+        """ (partition, name) for /partition/name or for the
+            /partition/name.app/name path of an iApp pool """
+        parts = path.strip('/').split('/')
+        return (parts[0], parts[-1])
+
+    def _get_icontrol_stats(self, stats):
+        """ Convert REST stats entries to iControl stat names """
+        return_stats = {}
+        for name in stats:
+            value = None
+            if 'value' in stats[name]:
+                value = stats[name]['value']
+            if 'description' in stats[name]:
+                value = stats[name]['description']
+            if value is None:
+                Log.error('poolstats', 'bad stats: %s %s', name, stats[name])
+                continue
+            (st, val) = self._get_icontrol_stat(name, value)
+            if st:
+                return_stats[st] = val
         return return_stats
 
     @icontrol_rest_folder
@@ -506,26 +577,97 @@ class Pool(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400 or response.status_code == 404:
-                # delete nodes
-                node_req = self.bigip.icr_url + '/ltm/node/'
-                node_req += '~' + folder + '~' + urllib.quote(ip_address)
-                response = self.bigip.icr_session.delete(
-                    node_req, timeout=const.CONNECTION_TIMEOUT)
-                if response.status_code == 400 and \
-                        response.text.find('is referenced') > 0:
-                    # Node address is part of multiple pools
-                    pass
-                elif response.status_code > 399 and \
-                        (not response.status_code == 404):
-                    Log.error('node', response.text)
-                    raise exceptions.PoolDeleteException(response.text)
-                else:
-                    self._del_arp_and_fdb(ip_address, folder)
+                self._delete_node(ip_address, folder)
             else:
                 Log.error('pool', response.text)
                 raise exceptions.PoolDeleteException(response.text)
         return False
 
+    @icontrol_rest_folder
+    @log
+    def set_members(self, name=None, members=None, lb_method=None,
+                    folder='Common'):
+        """ Replace the pool members in a single request.
+
+            members is a list of dicts with address, port, enabled
+            and ratio. The lb_method, if given, is set in the same
+            request. Nodes of removed members are deleted. """
+        if name:
+            folder = str(folder).replace('/', '')
+            request_url = self.bigip.icr_url + '/ltm/pool/'
+            request_url += '~' + folder + '~' + name
+            response = self.bigip.icr_session.get(
+                request_url + '/members?$select=name',
+                timeout=const.CONNECTION_TIMEOUT)
+            if response.status_code == 404:
+                return False
+            elif response.status_code > 399:
+                Log.error('pool', response.text)
+                raise exceptions.PoolQueryException(response.text)
+            existing = set()
+            return_obj = json.loads(response.text)
+            if 'items' in return_obj:
+                for member in return_obj['items']:
+                    existing.add(member['name'])
+
+            payload = dict()
+            payload['members'] = []
+            desired = set()
+            for member in members or []:
+                member_name = self._get_member_name(member['address'],
+                                                    member['port'])
+                desired.add(member_name)
+                if member.get('enabled', True):
+                    session = 'user-enabled'
+                else:
+                    session = 'user-disabled'
+                payload['members'].append(
+                    {'name': member_name,
+                     'partition': folder,
+                     'address': member['address'],
+                     'session': session,
+                     'ratio': int(member.get('ratio', 1))})
+            if lb_method:
+                payload['loadBalancingMode'] = \
+                    self._get_rest_lb_method_type(lb_method)
+            response = self.bigip.icr_session.patch(
+                request_url, data=json.dumps(payload),
+                timeout=const.CONNECTION_TIMEOUT)
+            if response.status_code == 404:
+                return False
+            elif response.status_code > 399:
+                Log.error('pool', response.text)
+                raise exceptions.PoolUpdateException(response.text)
+            for member_name in existing - desired:
+                (addr, port) = split_addr_port(member_name)
+                self._delete_node(addr, folder)
+            return True
+        return False
+
+    def _get_member_name(self, ip_address, port):
+        """ BigIP pool member name for address and port """
+        if ':' in ip_address:
+            return ip_address + '.' + str(port)
+        else:
+            return ip_address + ':' + str(port)
+
+    def _delete_node(self, ip_address, folder):
+        """ Delete node unless it is still used by another pool """
+        node_req = self.bigip.icr_url + '/ltm/node/'
+        node_req += '~' + folder + '~' + urllib.quote(ip_address)
+        response = self.bigip.icr_session.delete(
+            node_req, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code == 400 and \
+                response.text.find('is referenced') > 0:
+            # Node address is part of multiple pools
+            pass
+        elif response.status_code > 399 and \
+                (not response.status_code == 404):
+            Log.error('node', response.text)
+            raise exceptions.PoolDeleteException(response.text)
+        else:
+            self._del_arp_and_fdb(ip_address, folder)
+
     @icontrol_rest_folder
     @log
     def delete_all_nodes(self, folder='Common'):
@@ -985,8 +1127,17 @@ class Pool(object):
 
     @icontrol_rest_folder
     @log
-    def exists(self, name=None, folder='Common', config_mode='object'):
+    def exists(self, name=None, folder='Common', config_mode='object',
+               use_cache=True):
+        """ Does pool exist? With use_cache=False the device is
+            asked even in object mode, and a cached pool list of the
+            folder which disagrees with the answer is dropped. """
         folder = str(folder).replace('/', '')
+        if config_mode != 'iapp' and use_cache:
+            pools = self.bigip.config_cache.get_names('pool', folder)
+            if pools is None:
+                pools = self._load_pools(folder)
+            return name in pools
         request_url = self.bigip.icr_url + '/ltm/pool/'
         if config_mode == 'iapp':
             request_url += '~' + folder + '~' + name + '.app~' + name
@@ -996,11 +1147,40 @@ class Pool(object):
         response = self.bigip.icr_session.get(
             request_url, timeout=const.CONNECTION_TIMEOUT)
         if response.status_code < 400:
-            return True
+            found = True
         elif response.status_code != 404:
             Log.error('pool', response.text)
             raise exceptions.PoolQueryException(response.text)
-        return False
+        else:
+            found = False
+        if config_mode != 'iapp':
+            self.bigip.config_cache.check_name('pool', folder, name, found)
+        return found
+
+    def _load_pools(self, folder):
+        """ Load the pool names of a folder into the config cache """
+        request_url = self.bigip.icr_url + '/ltm/pool'
+        request_url += '?$select=name'
+        request_url += '&$filter=partition eq ' + folder
+        token = self.bigip.config_cache.get_token('pool', folder)
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400 or response.status_code == 404:
+            pools = []
+            if response.status_code < 400:
+                return_obj = json.loads(response.text)
+                for pool in return_obj.get('items', []):
+                    pools.append(pool['name'])
+                generation = return_obj.get('generation')
+            else:
+                generation = None
+            self.bigip.config_cache.set_names('pool', folder, pools,
+                                              generation, token)
+            return set(pools)
+        else:
+            self.bigip.config_cache.invalidate('pool', folder)
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
 
     @icontrol_rest_folder
     @log
@@ -16,6 +16,7 @@
 from f5.common.logger import Log
 from f5.common import constants as const
 from f5.bigip.interfaces import icontrol_rest_folder
+from f5.bigip.interfaces import strip_folder_and_prefix
 from f5.bigip import exceptions
 from f5.bigip.interfaces import log
 
@@ -255,19 +256,21 @@ class Route(object):
         if not folder == 'Common':
             payload = dict()
             payload['partition'] = '/' + folder
-            payload['id'] = self._get_next_domain_id()
-            payload['name'] = folder
-            if is_aux:
-                payload['name'] += '_aux_' + str(payload['id'])
             if strict_route_isolation:
                 payload['strict'] = 'enabled'
             else:
                 payload['strict'] = 'disabled'
                 payload['parent'] = '/Common/0'
             request_url = self.bigip.icr_url + '/net/route-domain/'
-            response = self.bigip.icr_session.post(
-                request_url, data=json.dumps(payload),
-                timeout=const.CONNECTION_TIMEOUT)
+            # two requests must not pick the same free id
+            with self.bigip.route_domain_lock:
+                payload['id'] = self._get_next_domain_id()
+                payload['name'] = folder
+                if is_aux:
+                    payload['name'] += '_aux_' + str(payload['id'])
+                response = self.bigip.icr_session.post(
+                    request_url, data=json.dumps(payload),
+                    timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
                 return payload['id']
             elif response.status_code == 409:
@@ -395,6 +398,57 @@ class Route(object):
             raise exceptions.RouteQueryException(response.text)
         return []
 
+    @log
+    def get_domain_snapshot(self):
+        """ Get route domains of all partitions with their vlan and
+            tunnel keys and selfips, in one GET per collection. The
+            tunnels also reload the tunnel registry of the config cache.
+
+            Returns route_domains as a list of id, partition and vlans
+            paths, net_keys as vlan tag or tunnel key by path and
+            selfips as lists of name and address by vlan path. """
+        snapshot = {'route_domains': [], 'net_keys': {}, 'selfips': {}}
+        token = self.bigip.config_cache.get_token('tunnel')
+        for route_domain in self._get_collection(
+                '/net/route-domain', 'id,partition,vlans'):
+            snapshot['route_domains'].append(
+                {'id': int(route_domain['id']),
+                 'partition': route_domain['partition'],
+                 'vlans': route_domain.get('vlans', [])})
+        for vlan in self._get_collection('/net/vlan', 'fullPath,tag'):
+            snapshot['net_keys'][vlan['fullPath']] = vlan.get('tag')
+        tunnels = []
+        for tunnel in self._get_collection(
+                '/net/tunnels/tunnel', 'fullPath,name,partition,key'):
+            snapshot['net_keys'][tunnel['fullPath']] = tunnel.get('key')
+            tunnels.append(
+                (tunnel['name'], tunnel['partition'], tunnel.get('key')))
+        # the tunnel registry comes from the same collection
+        self.bigip.config_cache.set_tunnels(tunnels, token=token)
+        for selfip in self._get_collection(
+                '/net/self', 'name,address,vlan'):
+            if 'vlan' not in selfip:
+                continue
+            if selfip['vlan'] not in snapshot['selfips']:
+                snapshot['selfips'][selfip['vlan']] = []
+            snapshot['selfips'][selfip['vlan']].append(
+                {'name': strip_folder_and_prefix(selfip['name']),
+                 'address': selfip['address']})
+        return snapshot
+
+    def _get_collection(self, path, select):
+        """ Get the selected attributes of all items in a collection """
+        request_url = self.bigip.icr_url + path + '?$select=' + select
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            response_obj = json.loads(response.text)
+            return response_obj.get('items', [])
+        elif response.status_code != 404:
+            Log.error('route-domain', response.text)
+            raise exceptions.RouteQueryException(response.text)
+        return []
+
     @icontrol_rest_folder
     @log
     def exists(self, name=None, folder='Common'):
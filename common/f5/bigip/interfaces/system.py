@@ -23,7 +23,6 @@ from f5.bigip.interfaces import log
 from suds import WebFault
 
 import json
-import time
 import uuid
 
 
@@ -54,10 +53,11 @@ class System(object):
         # create stubs to hold static system params to avoid redundant calls
         self.version = None
         self.current_folder = None
+        # SOAP active folder changes made and avoided
+        self.folder_switches = 0
+        self.folder_switches_saved = 0
         self.systeminfo = None
         self.exempt_folders = ['/', 'Common']
-        self.existing_folders = {}
-        self.existint_folders_updated = None
 
     @log
     def folder_exists(self, folder):
@@ -66,29 +66,33 @@ class System(object):
             folder = str(folder).replace('/', '')
             if folder == 'Common':
                 return True
-            if folder in self.existing_folders:
-                now = time.time()
-                if self.existint_folders_updated:
-                    if ((now - self.existint_folders_updated) <
-                            const.FOLDER_CACHE_TIMEOUT):
-                        return True
-                    else:
-                        del self.existing_folders[folder]
-            request_url = self.bigip.icr_url + '/sys/folder/'
-            request_url += '~' + folder
-            request_url += '?$select=name'
-            response = self.bigip.icr_session.get(
-                request_url, timeout=const.CONNECTION_TIMEOUT)
-            if response.status_code < 400:
-                self.existing_folders[folder] = 1
-                return True
-            elif response.status_code == 404:
-                return False
-            else:
-                Log.error('folder', response.text)
-                raise exceptions.SystemQueryException(response.text)
+            folders = self.bigip.config_cache.get_names('folder', None)
+            if folders is None:
+                folders = self._load_folders()
+            return folder in folders
         return False
 
+    def _load_folders(self):
+        """ Load folder names into the config cache """
+        request_url = self.bigip.icr_url + '/sys/folder/'
+        request_url += '?$select=name'
+        token = self.bigip.config_cache.get_token('folder')
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            folders = []
+            for folder in return_obj.get('items', []):
+                folders.append(folder['name'])
+            self.bigip.config_cache.set_names(
+                'folder', None, folders, return_obj.get('generation'),
+                token)
+            return set(folders)
+        else:
+            self.bigip.config_cache.invalidate('folder')
+            Log.error('folder', response.text)
+            raise exceptions.SystemQueryException(response.text)
+
     @log
     def create_folder(self, folder, change_to=False, traffic_group=None):
         """ Create folder """
@@ -111,8 +115,8 @@ class System(object):
                 request_url, data=json.dumps(payload),
                 timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
+                self.bigip.config_cache.add_name('folder', None, folder)
                 if change_to:
-                    self.existing_folders[folder] = 1
                     self.set_folder(folder)
                 else:
                     self.set_folder('/Common')
@@ -132,14 +136,15 @@ class System(object):
             We need to do a fake query and fake command
             because setting your active folder, by itself, does
             not do anything. """
-        self.sys_session.set_active_folder('/')
-        self.current_folder = '/'
-        self.mgmt_folder.get_list()
-        fakename = '/set-folder-workaround-' + str(uuid.uuid4())[0:8]
-        try:
-            self.mgmt_folder.delete_folder([fakename])
-        except WebFault:
-            pass
+        with self.bigip.folder_lock:
+            self.sys_session.set_active_folder('/')
+            self.current_folder = '/'
+            self.mgmt_folder.get_list()
+            fakename = '/set-folder-workaround-' + str(uuid.uuid4())[0:8]
+            try:
+                self.mgmt_folder.delete_folder([fakename])
+            except WebFault:
+                pass
 
     @log
     def delete_folder(self, folder):
@@ -150,8 +155,8 @@ class System(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
-                if folder in self.existing_folders:
-                    del self.existing_folders[folder]
+                self.bigip.config_cache.remove_name('folder', None, folder)
+                self.bigip.config_cache.invalidate(partition=folder)
                 self.set_folder('/Common')
                 return True
             elif response.status_code == 404:
@@ -182,24 +187,32 @@ class System(object):
     @log
     def set_folder(self, folder):
         """ Set Folder """
+        with self.bigip.folder_lock:
+            self._set_folder(folder)
+
+    def _set_folder(self, folder):
+        """ Set the active folder holding the folder lock """
         if not folder:
             msg = 'set_folder failed: No folder specified!'
             Log.error('System', msg)
             raise exceptions.SystemUpdateException(msg)
 
+        if not str(folder).startswith('/'):
+            folder = '/' + folder
+        if self.current_folder and folder == self.current_folder:
+            self.folder_switches_saved += 1
+            return
+
         if not self.folder_exists(folder):
             msg = 'set_folder:set_active_folder failed, ' + \
                   'folder does not exist!'
             Log.error('System', msg)
             raise exceptions.SystemUpdateException(msg)
 
-        if not str(folder).startswith('/'):
-            folder = '/' + folder
-        if self.current_folder and folder == self.current_folder:
-            return
         try:
             self.sys_session.set_active_folder(folder)
             self.current_folder = folder
+            self.folder_switches += 1
         except WebFault as webfault:
             Log.error('System',
                       'set_folder:set_active_folder failed: ' +
@@ -109,6 +109,7 @@ class VXLAN(object):
                 request_url, data=json.dumps(payload),
                 timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
+                self.bigip.config_cache.add_tunnel(name, folder, vxlanid)
                 if not folder == 'Common':
                     self.bigip.route.add_vlan_to_domain_by_id(
                         name=name, folder=folder,
@@ -153,9 +154,8 @@ class VXLAN(object):
         request_url += '~' + folder + '~' + name
         response = self.bigip.icr_session.delete(
             request_url, timeout=const.CONNECTION_TIMEOUT)
-        if response.status_code < 400:
-            return True
-        elif response.status_code == 404:
+        if response.status_code < 400 or response.status_code == 404:
+            self.bigip.config_cache.remove_tunnel(name, folder)
             return True
         else:
             Log.error('VXLAN', response.text)
@@ -189,6 +189,7 @@ class VXLAN(object):
         elif response.status_code != 404:
             Log.error('VXLAN', response.text)
             raise exceptions.VXLANQueryException(response.text)
+        self.bigip.config_cache.invalidate('tunnel', folder)
         return True
 
     @icontrol_rest_folder
@@ -425,6 +426,26 @@ class VXLAN(object):
             raise exceptions.VXLANUpdateException(response.text)
         return False
 
+    @icontrol_rest_folder
+    @log
+    def set_fdb_records(self, tunnel_name=None, records=None,
+                        folder='Common'):
+        """ Replace all fdb records of a tunnel with one update """
+        folder = str(folder).replace('/', '')
+        request_url = self.bigip.icr_url + '/net/fdb/tunnel/'
+        request_url += '~' + folder + '~' + tunnel_name + '?ver=11.5.0'
+        if not records:
+            records = None
+        response = self.bigip.icr_session.patch(
+            request_url, data=json.dumps({'records': records}),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            return True
+        else:
+            Log.error('VXLAN', response.text)
+            raise exceptions.VXLANUpdateException(response.text)
+        return False
+
     @icontrol_rest_folder
     @log
     def get_profiles(self, folder='Common'):
@@ -499,18 +520,12 @@ class VXLAN(object):
     def get_tunnel_key(self, name=None, folder='Common'):
         """ Get tunnel key """
         folder = str(folder).replace('/', '')
-        request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
-        request_url += '~' + folder + '~' + name
-        response = self.bigip.icr_session.get(
-            request_url, timeout=const.CONNECTION_TIMEOUT)
-        if response.status_code < 400:
-            return_obj = json.loads(response.text)
-            Log.debug('VXLAN', 'get_tunnel_key got %s' + str(return_obj))
-            return return_obj['key']
-        elif response.status_code != 404:
-            Log.error('VXLAN', response.text)
-            exceptions.VXLANQueryException(response.text)
-        return None
+        loaded = self.bigip.config_cache.tunnels is not None
+        tunnels = self._get_tunnels_registry()
+        if loaded and folder not in tunnels.get(name, {}):
+            # created since the registry was read, by another agent
+            self.tunnel_exists(name=name, folder=folder)
+        return tunnels.get(name, {}).get(folder, None)
 
     @icontrol_rest_folder
     @log
@@ -541,20 +556,42 @@ class VXLAN(object):
     def get_tunnel_folder(self, tunnel_name=None):
         """ Get tunnel folder """
         if tunnel_name:
-            request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
+            loaded = self.bigip.config_cache.tunnels is not None
+            tunnels = self._get_tunnels_registry()
+            if loaded and tunnel_name not in tunnels:
+                # created since the registry was read, by another agent
+                tunnels = self._get_tunnels_registry(reload=True)
+            if tunnel_name in tunnels:
+                return sorted(tunnels[tunnel_name])[0]
+        return None
+
+    def _get_tunnels_registry(self, reload=False):
+        """ Tunnel folders and keys by name from the config cache """
+        tunnels = None
+        if not reload:
+            tunnels = self.bigip.config_cache.get_tunnels()
+        if tunnels is None:
+            request_url = self.bigip.icr_url + '/net/tunnels/tunnel'
+            request_url += '?$select=name,partition,key'
+            token = self.bigip.config_cache.get_token('tunnel')
             response = self.bigip.icr_session.get(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
-            if response.status_code < 400:
-                return_obj = json.loads(response.text)
-                if 'items' in return_obj:
-                    for tunnel in return_obj['items']:
-                        if tunnel['name'] == tunnel_name:
-                            return tunnel['partition']
-                return None
-            elif response.status_code != 404:
+            if response.status_code < 400 or response.status_code == 404:
+                registry = []
+                generation = None
+                if response.status_code < 400:
+                    return_obj = json.loads(response.text)
+                    for tunnel in return_obj.get('items', []):
+                        registry.append((tunnel['name'],
+                                         tunnel['partition'],
+                                         tunnel.get('key')))
+                    generation = return_obj.get('generation')
+                tunnels = self.bigip.config_cache.set_tunnels(
+                    registry, generation, token)
+            else:
                 Log.error('VXLAN', response.text)
                 raise exceptions.VXLANQueryException(response.text)
-        return None
+        return tunnels
 
     @icontrol_rest_folder
     @log
@@ -563,6 +600,7 @@ class VXLAN(object):
         folder = str(folder).replace('/', '')
         request_url = self.bigip.icr_url + '/net/tunnels/tunnel/'
         request_url += '~' + folder + '~' + name
+        request_url += '?$select=name,partition,key'
 
         for retry in range(2):
             if retry > 0:
@@ -570,6 +608,9 @@ class VXLAN(object):
             response = self.bigip.icr_session.get(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
+                tunnel = json.loads(response.text)
+                self.bigip.config_cache.note_tunnel(
+                    tunnel['name'], tunnel['partition'], tunnel.get('key'))
                 return True
             elif response.status_code == 401:
                 if retry < 1:
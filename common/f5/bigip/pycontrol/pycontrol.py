@@ -16,8 +16,12 @@
 #
 
 import logging
+import os
+import pickle
 import platform
 import ssl
+import tempfile
+import threading
 
 try:
     from urllib2 import ProxyHandler
@@ -61,7 +65,8 @@ class BIGIP(object):
     def __init__(self, hostname=None, username=None,
                  password=None, wsdls=None, directory=None,
                  fromurl=False, debug=False, proto='https',
-                 sessions=False, cache=True, **kwargs):
+                 sessions=False, cache=True, version=None,
+                 cache_dir=None, **kwargs):
 
         self.hostname = hostname
         self.username = username
@@ -73,6 +78,12 @@ class BIGIP(object):
         self.debug = debug
         self.kw = kwargs
         self.sessionid = None
+        # WSDLs fetched from the device are kept in cache_dir/version
+        self.version = version
+        self.cache_dir = cache_dir
+        self.timeout = None
+        self._load_lock = threading.RLock()
+        self._loaded = set()
 
         # Setup the in-memory object cache
         if cache:
@@ -97,33 +108,40 @@ class BIGIP(object):
         else:
             self.wsdls = wsdls
 
-        self.clients = self._get_clients()
-
-        for client in self.clients:
-            self._build_suds_interface(client)
+        # suds clients are built when an interface is first used
+        self.clients = []
+        for wsdl in self.wsdls:
+            self._set_lazy_interface(wsdl)
 
     #---------------------
     # Methods to modify active pyControl objects
     #---------------------
     def set_timeout(self, timeout):
         if 0 < timeout <= 300:
+            self.timeout = timeout
             for client in self.clients:
                 client.set_options(timeout=timeout)
 
     def add_interface(self, wsdl):
         if not wsdl in self.wsdls:
             self.wsdls.append(wsdl)
-            client = self._get_client(wsdl)
-            self._build_suds_interface(client)
-            self.clients.append(client)
+            self._set_lazy_interface(wsdl)
 
     def add_interfaces(self, wsdls):
         for wsdl in wsdls:
-            if not wsdl in self.wsdls:
-                self.wsdls.append(wsdl)
-                client = self._get_client(wsdl)
-                self._build_suds_interface(client)
-                self.clients.append(client)
+            self.add_interface(wsdl)
+
+    def load_interface(self, wsdl):
+        """ Build the suds client for an interface if not yet built """
+        with self._load_lock:
+            if wsdl in self._loaded:
+                return
+            client = self._get_client(wsdl)
+            self._build_suds_interface(client)
+            if self.timeout:
+                client.set_options(timeout=self.timeout)
+            self.clients.append(client)
+            self._loaded.add(wsdl)
 
     #---------------------
     # Setters and getters.
@@ -168,17 +186,44 @@ class BIGIP(object):
 
             self.set_sessionid(self.sessionid.__str__(), client)
 
+    def _set_lazy_interface(self, wsdl):
+        """ Set a placeholder for an interface not built yet """
+        (module_name, interface_name) = wsdl.split('.')[0:2]
+        if not hasattr(self, module_name):
+            setattr(self, module_name, ModuleInstance(module_name))
+        module = getattr(self, module_name)
+        if not hasattr(module, interface_name):
+            setattr(module, interface_name,
+                    LazyInterfaceInstance(interface_name, self, wsdl))
+
     def _get_client(self, wsdl):
         url = self._set_url(wsdl)
         return self._get_suds_client(url, **self.kw)
 
-    def _get_clients(self):
-        """ Get a suds client for the wsdls passed in."""
-        clients = []
-        for wsdl in self.wsdls:
-            client = self._get_client(wsdl)
-            clients.append(client)
-        return clients
+    def _get_cached_wsdl(self, wsdl, url):
+        """
+        Return a file url for a WSDL from the device, downloading it
+        into the versioned cache directory the first time.
+        """
+        version_dir = os.path.join(self.cache_dir, self.version)
+        path = os.path.join(version_dir, wsdl + '.wsdl')
+        if not os.path.exists(path):
+            t = HTTPSUnVerifiedCertTransport(username=self.username,
+                                             password=self.password)
+            content = t.open(transport.Request(url)).read()
+            if not os.path.isdir(version_dir):
+                try:
+                    os.makedirs(version_dir)
+                except OSError:
+                    if not os.path.isdir(version_dir):
+                        raise
+            # write to a temporary file first so concurrent agents
+            # never read a partial WSDL
+            (fd, tmp_path) = tempfile.mkstemp(dir=version_dir)
+            with os.fdopen(fd, 'w') as tmp_file:
+                tmp_file.write(content)
+            os.rename(tmp_path, path)
+        return 'file:' + pathname2url(path)
 
     @staticmethod
     def _get_module_name(c):
@@ -243,7 +288,14 @@ class BIGIP(object):
                 wsdl.replace('.wsdl', '')
 
             qstring = '?WSDL=%s' % wsdl
-            return 'https://%s%s' % (self.hostname, ICONTROL_URI + qstring)
+            url = 'https://%s%s' % (self.hostname, ICONTROL_URI + qstring)
+            if self.cache_dir and self.version:
+                try:
+                    return self._get_cached_wsdl(wsdl, url)
+                except Exception as exc:
+                    logging.getLogger(__name__).warning(
+                        'could not cache WSDL %s: %s' % (wsdl, exc))
+            return url
         else:
             if wsdl.endswith('wsdl'):
                 pass
@@ -278,7 +330,9 @@ class BIGIP(object):
         """ Sets appropriate attributes for a Module. """
         module = self._get_module_object(c)
         interface = self._get_interface_name(c)
-        setattr(module, interface, InterfaceInstance(interface))
+        # keep a lazy placeholder, callers may hold references to it
+        if not hasattr(module, interface):
+            setattr(module, interface, InterfaceInstance(interface))
 
     def _set_interface_methods(self, c):
         """
@@ -342,6 +396,23 @@ class InterfaceInstance(object):
         self.name = name
 
 
+class LazyInterfaceInstance(InterfaceInstance):
+    """
+    An iControl interface object which builds its suds client when
+    one of its methods is first used.
+    """
+    def __init__(self, name, bigip, wsdl):
+        super(LazyInterfaceInstance, self).__init__(name)
+        self._bigip = bigip
+        self._wsdl = wsdl
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        self._bigip.load_interface(self._wsdl)
+        return object.__getattribute__(self, attr)
+
+
 class ROClient(Client):
     def __init__(self, url, **kwargs):
         """
@@ -353,7 +424,10 @@ class ROClient(Client):
         options = Options()
         options.transport = transport.https.HttpAuthenticated()
         self.options = options
-        options.cache = InMemoryCache()
+        # cache parsed definitions per WSDL url. Every client gets its
+        # own copy, since suds sets per client options on them.
+        options.cache = DefinitionsCache()
+        options.cachingpolicy = 1
         self.set_options(**kwargs)
         reader = DefinitionsReader(options, Definitions)
         self.wsdl = reader.open(url)
@@ -387,7 +461,7 @@ class InMemoryCache(Cache):
         self.data[objid] = obj
 
     def putf(self, objid, fp):
-        self.put(fp.read())
+        self.put(objid, fp.read())
 
     def purge(self, objid):
         del self.data[objid]
@@ -396,6 +470,35 @@ class InMemoryCache(Cache):
         self.data = {}
 
 
+class DefinitionsCache(InMemoryCache):
+    """
+    In-memory cache of parsed WSDL definitions.
+
+    Objects are kept pickled, like the suds object cache does on disk,
+    so each get returns a private copy and clients never share the
+    mutable definitions. Unpickling is still much cheaper than parsing.
+    """
+    data = {}
+
+    def get(self, objid):
+        obj = InMemoryCache.get(self, objid)
+        if obj is None:
+            return None
+        try:
+            return pickle.loads(obj)
+        except Exception:
+            self.purge(objid)
+            return None
+
+    def put(self, objid, obj):
+        try:
+            InMemoryCache.put(self, objid,
+                              pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+        except Exception as exc:
+            logging.getLogger(__name__).warning(
+                'could not cache WSDL definitions %s: %s' % (objid, exc))
+
+
 class HTTPSUnVerifiedCertTransport(transport.https.HttpAuthenticated):
 
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,162 @@
+""" iControl REST transactions """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from f5.common.logger import Log
+from f5.common import constants as const
+from f5.bigip import exceptions
+
+import json
+import requests
+import threading
+
+WRITE_METHODS = ['POST', 'PUT', 'PATCH', 'DELETE']
+COORDINATION_HEADER = 'X-F5-REST-Coordination-Id'
+
+
+class QueuedResponse(object):
+    """ Response returned for a write queued in a transaction """
+    status_code = 200
+    text = '{}'
+
+    def json(self):
+        """ Queued writes have no result yet """
+        return {}
+
+
+class TransactionSession(requests.Session):
+    """ iControl REST session which can queue writes.
+
+        While the calling thread has an open transaction, writes
+        are queued instead of sent and get a QueuedResponse. Reads
+        are always sent and see the configuration as it was before
+        the transaction. """
+
+    def __init__(self):
+        super(TransactionSession, self).__init__()
+        self.local = threading.local()
+
+    def request(self, method, url, *args, **kwargs):
+        """ Send or queue request """
+        writes = getattr(self.local, 'writes', None)
+        if writes is not None and method.upper() in WRITE_METHODS:
+            writes.append((method.upper(), url, kwargs))
+            return QueuedResponse()
+        return super(TransactionSession, self).request(
+            method, url, *args, **kwargs)
+
+
+class Transaction(object):
+    """ Context manager applying queued writes as one batch.
+
+        Writes made through bigip.icr_session by the calling thread
+        are queued and applied when the block exits without an
+        exception. Consecutive PATCHes of the same object are merged
+        into one. A single remaining write is sent as is, several
+        are committed atomically as a /mgmt/tm/transaction. If the
+        block raises, nothing is sent. Commit failures raise the
+        given exception class. Nested transactions join the
+        outermost one. """
+
+    def __init__(self, bigip, exception=exceptions.BigIPTransactionFailure):
+        self.bigip = bigip
+        self.exception = exception
+        self.session = bigip.icr_session
+        self.nested = False
+
+    def __enter__(self):
+        local = self.session.local
+        if getattr(local, 'writes', None) is not None:
+            self.nested = True
+        else:
+            local.writes = []
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.nested:
+            return False
+        writes = self.session.local.writes
+        self.session.local.writes = None
+        if exc_type:
+            # interfaces may have cached the outcome of dropped writes
+            if writes:
+                self.bigip.config_cache.flush()
+            return False
+        writes = self._merge_writes(writes)
+        try:
+            if len(writes) == 1:
+                (method, url, kwargs) = writes[0]
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code > 399:
+                    Log.error('transaction', response.text)
+                    raise self.exception(response.text)
+            elif writes:
+                self._commit(writes)
+        except:
+            self.bigip.config_cache.flush()
+            raise
+        return False
+
+    @staticmethod
+    def _merge_writes(writes):
+        """ Merge consecutive PATCHes of the same object """
+        merged = []
+        for (method, url, kwargs) in writes:
+            if merged and method == 'PATCH' and \
+                    merged[-1][0] == 'PATCH' and merged[-1][1] == url:
+                payload = json.loads(merged[-1][2].get('data') or '{}')
+                payload.update(json.loads(kwargs.get('data') or '{}'))
+                merged[-1][2]['data'] = json.dumps(payload)
+            else:
+                merged.append((method, url, dict(kwargs)))
+        return merged
+
+    def _commit(self, writes):
+        """ Apply writes as one iControl REST transaction """
+        request_url = self.bigip.icr_url + '/transaction'
+        response = self.session.post(
+            request_url, data=json.dumps({}),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code > 399:
+            Log.error('transaction', response.text)
+            raise self.exception(response.text)
+        trans_id = str(json.loads(response.text)['transId'])
+        request_url += '/' + trans_id
+
+        try:
+            for (method, url, kwargs) in writes:
+                headers = dict(kwargs.get('headers') or {})
+                headers[COORDINATION_HEADER] = trans_id
+                kwargs['headers'] = headers
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code > 399:
+                    Log.error('transaction', response.text)
+                    raise self.exception(response.text)
+        except:
+            self.session.delete(request_url,
+                                timeout=const.CONNECTION_TIMEOUT)
+            raise
+
+        response = self.session.patch(
+            request_url, data=json.dumps({'state': 'VALIDATING'}),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code > 399:
+            Log.error('transaction', response.text)
+            raise self.exception(response.text)
+        return_obj = json.loads(response.text)
+        if return_obj.get('state') == 'FAILED':
+            Log.error('transaction', response.text)
+            raise self.exception(
+                return_obj.get('failureReason', response.text))
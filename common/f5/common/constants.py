@@ -20,7 +20,7 @@ MIN_EXTRA_MB = 500
 DEFAULT_HOSTNAME = 'bigip1'
 MAX_HOSTNAME_LENGTH = 128
 DEFAULT_FOLDER = "/Common"
-FOLDER_CACHE_TIMEOUT = 120
+CONFIG_CACHE_TIMEOUT = 120
 CONNECTION_TIMEOUT = 30
 FDB_POPULATE_STATIC_ARP = True
 # DEVICE LOCK PREFIX
@@ -28,6 +28,9 @@ DEVICE_LOCK_PREFIX = 'lock_'
 # DIR TO CACHE WSDLS.  SET TO NONE TO READ FROM DEVICE
 # WSDL_CACHE_DIR = "/data/iControl-11.4.0/sdk/wsdl/"
 WSDL_CACHE_DIR = ''
+# DIR TO CACHE WSDLS DOWNLOADED FROM DEVICES, PER TMOS VERSION.
+# SET TO NONE TO PARSE WSDLS FROM THE DEVICE URL EVERY TIME
+WSDL_VERSION_CACHE_DIR = ''
 # HA CONSTANTS
 HA_VLAN_NAME = "HA"
 HA_SELFIP_NAME = "HA"
@@ -56,6 +59,11 @@ DEFAULT_SYNC_MODE = 'autosync'
 # (3+6+9+12+15+18) = 63
 SYNC_DELAY = 3
 MAX_SYNC_ATTEMPTS = 10
+# SYNC STATUS IS POLLED WITH BACKOFF FROM 0.5 UP TO 8 SECONDS
+SYNC_POLL_INTERVAL = 0.5
+SYNC_MAX_POLL_INTERVAL = 8
+# GIVE UP ON A SYNC AFTER 5 MINUTES
+SYNC_DEADLINE = 300
 # SHARED CONFIG CONSTANTS
 SHARED_CONFIG_DEFAULT_TRAFFIC_GROUP = 'traffic-group-local-only'
 SHARED_CONFIG_DEFAULT_FLOATING_TRAFFIC_GROUP = 'traffic-group-1'
@@ -16,39 +16,38 @@
 import logging
 import sys
 
+LOG = logging.getLogger(__name__)
+# one handler for the module logger, added once at import
+_HANDLER = logging.StreamHandler(sys.stdout)
+_HANDLER.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+LOG.addHandler(_HANDLER)
+
 
 class Log(object):
+    """ Prefixed logging for the BIG-IP interfaces.
+
+        Format arguments are applied only if the level is enabled,
+        so pass them as args instead of formatting the message. """
     @staticmethod
-    def debug(prefix, msg):
-        Log._log('debug', prefix, msg)
+    def debug(prefix, msg, *args):
+        Log._log(logging.DEBUG, prefix, msg, args)
 
     @staticmethod
-    def error(prefix, msg):
-        Log._log('error', prefix, msg)
+    def error(prefix, msg, *args):
+        Log._log(logging.ERROR, prefix, msg, args)
 
     @staticmethod
-    def crit(prefix, msg):
-        Log._log('crit', prefix, msg)
+    def crit(prefix, msg, *args):
+        Log._log(logging.CRITICAL, prefix, msg, args)
 
     @staticmethod
-    def info(prefix, msg):
-        Log._log('info', prefix, msg)
+    def info(prefix, msg, *args):
+        Log._log(logging.INFO, prefix, msg, args)
 
     @staticmethod
-    def _log(level, prefix, msg):
-        log_string = prefix + ': ' + msg
-        log = logging.getLogger(__name__)
-        out_hdlr = logging.StreamHandler(sys.stdout)
-        out_hdlr.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
-        log.addHandler(out_hdlr)
-
-        if level == 'debug':
-            log.debug(log_string)
-        elif level == 'error':
-            log.error(log_string)
-        elif level == 'crit':
-            log.critical(log_string)
-        else:
-            log.info(log_string)
-
-        log.removeHandler(out_hdlr)
+    def _log(level, prefix, msg, args):
+        if not LOG.isEnabledFor(level):
+            return
+        if args:
+            msg = msg % args
+        LOG.log(level, prefix + ': ' + msg)
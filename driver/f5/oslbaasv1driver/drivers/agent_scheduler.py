@@ -19,11 +19,13 @@ import f5.oslbaasv1driver.drivers.constants as lbaasv1const
 
 try:
     from neutron.services.loadbalancer import agent_scheduler
+    from neutron.db.loadbalancer import loadbalancer_db as lb_db
     from neutron.openstack.common import log as logging
     from neutron.extensions.lbaas_agentscheduler import NoActiveLbaasAgent
 except ImportError:
     # Kilo
     from neutron_lbaas.services.loadbalancer import agent_scheduler
+    from neutron_lbaas.db.loadbalancer import loadbalancer_db as lb_db
     from oslo_log import log as logging
     from neutron_lbaas.extensions.lbaas_agentscheduler \
         import NoActiveLbaasAgent
@@ -37,6 +39,9 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
     """
     def __init__(self):
         super(TenantScheduler, self).__init__()
+        # parsed agent configurations by agent id, kept
+        # until the agent reports its state again
+        self._agent_configurations = {}
 
     def get_lbaas_agent_hosting_pool(self, plugin, context, pool_id, env=None):
         if env:
@@ -60,9 +65,7 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
                 # find another agent in the same environment
 
                 # which environment group is the agent in
-                ac = self.deserialize_agent_configurations(
-                    lbaas_agent['agent']['configurations']
-                )
+                ac = self.get_agent_configurations(lbaas_agent['agent'])
                 # if the default env, use the bound agent's
                 # environment prefix to find another agent
                 # with the same environment prefix
@@ -90,40 +93,50 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
     def get_active_agents_in_env(self, plugin, context, env, group=None):
         with context.session.begin(subtransactions=True):
             candidates = plugin.get_lbaas_agents(context, active=True)
-            return_agents = []
-            if candidates:
-                for candidate in candidates:
-                    ac = self.deserialize_agent_configurations(
-                            candidate['configurations']
-                    )
-                    if 'environment_prefix' in ac:
-                        if ac['environment_prefix'] == env:
-                            if group:
-                                if 'environment_group_number' in ac and \
-                                  ac['environment_group_number'] == group:
-                                    return_agents.append(candidate)
-                            else:
-                                return_agents.append(candidate)
-            return return_agents
+            return self._get_env_group_index(candidates).get(
+                (env, group or None), [])
 
     def get_agents_in_env(self, plugin, context, env, group=None):
         with context.session.begin(subtransactions=True):
             candidates = plugin.get_lbaas_agents(context)
-            return_agents = []
-            if candidates:
-                for candidate in candidates:
-                    ac = self.deserialize_agent_configurations(
-                            candidate['configurations']
-                    )
-                    if 'environment_prefix' in ac:
-                        if ac['environment_prefix'] == env:
-                            if group:
-                                if 'environment_group_number' in ac and \
-                                  ac['environment_group_number'] == group:
-                                    return_agents.append(candidate)
-                            else:
-                                return_agents.append(candidate)
-            return return_agents
+            # drop configurations of agents which no longer exist
+            agent_ids = set([candidate['id'] for candidate in candidates])
+            for agent_id in list(self._agent_configurations):
+                if agent_id not in agent_ids:
+                    del self._agent_configurations[agent_id]
+            return self._get_env_group_index(candidates).get(
+                (env, group or None), [])
+
+    def _get_env_group_index(self, candidates):
+        """ Index agents by (environment_prefix, group number).
+
+            Every agent is listed under (env, None) as well as under
+            (env, group) when it reports a group number. """
+        index = {}
+        for candidate in candidates or []:
+            ac = self.get_agent_configurations(candidate)
+            if 'environment_prefix' not in ac:
+                continue
+            env = ac['environment_prefix']
+            keys = [(env, None)]
+            if ac.get('environment_group_number'):
+                keys.append((env, ac['environment_group_number']))
+            for key in keys:
+                if key not in index:
+                    index[key] = []
+                index[key].append(candidate)
+        return index
+
+    def get_agent_configurations(self, agent):
+        """ Parsed configurations of agent, cached until the agent
+            reports its state again """
+        stamp = agent.get('heartbeat_timestamp')
+        cached = self._agent_configurations.get(agent['id'])
+        if cached and stamp is not None and cached[0] == stamp:
+            return cached[1]
+        ac = self.deserialize_agent_configurations(agent['configurations'])
+        self._agent_configurations[agent['id']] = (stamp, ac)
+        return ac
 
     def get_capacity(self, configurations):
         if 'environment_capacity_score' in configurations:
@@ -142,6 +155,16 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
                 agent_conf = {}
         return agent_conf
 
+    def get_tenant_agent_ids(self, context, tenant_id):
+        """ Ids of the agents hosting pools of tenant_id """
+        binding = agent_scheduler.PoolLoadbalancerAgentBinding
+        query = context.session.query(binding.agent_id).join(
+            lb_db.Pool, lb_db.Pool.id == binding.pool_id
+        ).filter(
+            lb_db.Pool.tenant_id == tenant_id
+        ).distinct()
+        return set([agent_id for (agent_id,) in query])
+
     def schedule(self, plugin, context, pool, env=None):
         """Schedule the pool to an active loadbalancer agent if there
         is no enabled agent hosting it.
@@ -178,13 +201,13 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
                 chosen_agent = None
                 agents_by_group = {}
                 capacity_by_group = {}
+                tenant_agent_ids = self.get_tenant_agent_ids(
+                    context, pool['tenant_id'])
 
                 for candidate in candidates:
                     # Organize agents by their evn group
                     # and collect each group's max capacity.
-                    ac = self.deserialize_agent_configurations(
-                        candidate['configurations']
-                    )
+                    ac = self.get_agent_configurations(candidate)
                     gn = 1
                     if 'environment_group_number' in ac:
                         gn = ac['environment_group_number']
@@ -204,13 +227,8 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
                     # Do we already have tenants assigned to this
                     # agent candidate. If we do and it has capacity
                     # then assign this pool to this agent.
-                    assigned_pools = plugin.list_pools_on_lbaas_agent(
-                        context, candidate['id'])
-                    for assigned_pool in assigned_pools['pools']:
-                        if pool['tenant_id'] == assigned_pool['tenant_id']:
-                            chosen_agent = candidate
-                            break
-                    if chosen_agent:
+                    if candidate['id'] in tenant_agent_ids:
+                        chosen_agent = candidate
                         # Does the agent which had tenants assigned
                         # to it still have capacity?
                         if group_capacity >= 1.0:
@@ -272,17 +290,13 @@ class TenantScheduler(agent_scheduler.ChanceScheduler):
                     return
 
                 chosen_agent = None
+                tenant_agent_ids = self.get_tenant_agent_ids(
+                    context, pool['tenant_id'])
                 for candidate in candidates:
-                    # get all assigned pools from each agent
-                    assigned_pools = plugin.list_pools_on_lbaas_agent(
-                        context, candidate['id'])
-                    for assigned_pool in assigned_pools['pools']:
-                        if pool['tenant_id'] == assigned_pool['tenant_id']:
-                            # if you found an agent with the tenant assigned
-                            # then use that agent.
-                            chosen_agent = candidate
-                            break
-                    if chosen_agent:
+                    if candidate['id'] in tenant_agent_ids:
+                        # if you found an agent with the tenant assigned
+                        # then use that agent.
+                        chosen_agent = candidate
                         break
 
                 if not chosen_agent:
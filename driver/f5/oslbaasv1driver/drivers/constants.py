@@ -21,3 +21,6 @@ AGENT_BINARY_NAME = 'f5-oslbaasv1-agent'
 # RPC channel names
 TOPIC_PROCESS_ON_HOST = 'f5-lbaas-process-on-controller'
 TOPIC_LOADBALANCER_AGENT = 'f5-lbaas-process-on-agent'
+
+# Status of objects removed from the data model in batched status updates
+STATUS_DESTROYED = 'DESTROYED'
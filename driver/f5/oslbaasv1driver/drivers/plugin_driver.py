@@ -20,12 +20,15 @@ import datetime
 
 from time import time
 from oslo.config import cfg  # @UnresolvedImport
+import sqlalchemy as sa
 
 from neutron.api.v2 import attributes
 from neutron.common import constants as q_const
 from neutron.plugins.common import constants
 from neutron.common import rpc as q_rpc
 from neutron.db import agents_db
+from neutron.db import api as db_api
+from neutron.db import model_base
 from neutron.context import get_admin_context
 from neutron.extensions import portbindings
 from neutron.common import log
@@ -39,6 +42,8 @@ try:
     from neutron.extensions \
         import lbaas_agentscheduler  # @UnresolvedImport @Reimport
     from neutron.db.loadbalancer import loadbalancer_db as lb_db
+    from neutron.services.loadbalancer \
+        import agent_scheduler as agent_scheduler_db
     from neutron.openstack.common import log as logging
     from neutron.openstack.common import importutils
     from neutron.extensions.loadbalancer \
@@ -63,6 +68,8 @@ except ImportError:
     from neutron_lbaas.extensions \
         import lbaas_agentscheduler  # @UnresolvedImport @Reimport
     from neutron_lbaas.db.loadbalancer import loadbalancer_db as lb_db
+    from neutron_lbaas.services.loadbalancer \
+        import agent_scheduler as agent_scheduler_db
     from oslo_log import log as logging
     from oslo_utils import importutils
     from neutron_lbaas.extensions.loadbalancer \
@@ -100,17 +107,135 @@ cfg.CONF.register_opts(OPTS)
 
 VIF_TYPE = 'f5'
 NET_CACHE_SECONDS = 1800
+MAX_POOL_CHANGES = 10000
+
+
+class PoolChangeGeneration(model_base.BASEV2):
+    """ Change generation counter of the pools of one agent host """
+    __tablename__ = 'f5_lbaas_pool_change_generations'
+    agent_host = sa.Column(sa.String(255), primary_key=True)
+    epoch = sa.Column(sa.String(36), nullable=False)
+    generation = sa.Column(sa.BigInteger, nullable=False)
+    truncated_generation = sa.Column(sa.BigInteger, nullable=False)
+
+
+class PoolChange(model_base.BASEV2):
+    """ Newest change generation of a pool """
+    __tablename__ = 'f5_lbaas_pool_changes'
+    pool_id = sa.Column(sa.String(36), primary_key=True)
+    agent_host = sa.Column(sa.String(255), nullable=False, index=True)
+    generation = sa.Column(sa.BigInteger, nullable=False)
+
+
+class PoolChangeLog(object):
+    """ Journal of the pools changes were sent to agents for.
+
+        The journal is kept in the database, so changes cast by any
+        neutron-server process or host are seen by all of them. Every
+        agent host has a generation counter. Recording a change locks
+        the counter of the host, bumps it and stores it as the newest
+        generation of the pool in the same transaction, so generations
+        of a host commit in order. Agents ask for the pools changed
+        since the last generation they reconciled. Changes more than
+        max_changes generations old are pruned. The epoch of a host is
+        set when its counter is created, which tells the agent the
+        generations it knows are no longer valid. """
+
+    def __init__(self, max_changes=MAX_POOL_CHANGES):
+        self.max_changes = max_changes
+        self.enabled = True
+
+    def create_tables(self):
+        """ Create the journal tables if they do not exist yet.
+            Without them the agents always do full resyncs. """
+        try:
+            model_base.BASEV2.metadata.create_all(
+                db_api.get_engine(),
+                tables=[PoolChangeGeneration.__table__,
+                        PoolChange.__table__])
+        except Exception as exc:
+            LOG.error(_('Can not create the pool change journal: %s'
+                        % exc))
+            self.enabled = False
+
+    @staticmethod
+    def _get_counter(session, agent_host, lock=False):
+        """ The generation counter of agent_host, created if needed """
+        query = session.query(PoolChangeGeneration).filter_by(
+            agent_host=agent_host)
+        if lock:
+            query = query.with_lockmode('update')
+        counter = query.first()
+        if counter is None:
+            try:
+                with session.begin_nested():
+                    counter = PoolChangeGeneration(
+                        agent_host=agent_host, epoch=str(uuid.uuid4()),
+                        generation=0, truncated_generation=0)
+                    session.add(counter)
+            except Exception:
+                # another server created the counter first
+                counter = query.one()
+        return counter
+
+    def position(self, context, agent_host):
+        """ The (epoch, generation) of the newest change of agent_host """
+        with context.session.begin(subtransactions=True):
+            counter = self._get_counter(context.session, agent_host)
+            return (counter.epoch, counter.generation)
+
+    def record(self, context, pool_id, agent_host):
+        """ Record a change of pool sent to agent_host """
+        session = context.session
+        with session.begin(subtransactions=True):
+            counter = self._get_counter(session, agent_host, lock=True)
+            counter.generation += 1
+            change = session.query(PoolChange).filter_by(
+                pool_id=pool_id).first()
+            if change is None:
+                session.add(PoolChange(pool_id=pool_id,
+                                       agent_host=agent_host,
+                                       generation=counter.generation))
+            else:
+                change.agent_host = agent_host
+                change.generation = counter.generation
+            # prune in steps of max_changes generations
+            if counter.generation - counter.truncated_generation > \
+                    2 * self.max_changes:
+                counter.truncated_generation = \
+                    counter.generation - self.max_changes
+                session.query(PoolChange).filter(
+                    PoolChange.agent_host == agent_host,
+                    PoolChange.generation <= counter.truncated_generation
+                ).delete(synchronize_session=False)
+
+    def changes_since(self, context, generation, agent_host):
+        """ Pools of agent_host changed after generation, None if
+            the journal no longer covers generation """
+        with context.session.begin(subtransactions=True):
+            counter = self._get_counter(context.session, agent_host)
+            if generation is None or \
+                    generation < counter.truncated_generation:
+                return None
+            query = context.session.query(PoolChange.pool_id).filter(
+                PoolChange.agent_host == agent_host,
+                PoolChange.generation > generation)
+            return [{'agent_host': agent_host, 'pool_id': pool_id}
+                    for (pool_id,) in query]
 
 
 class LoadBalancerCallbacks(object):
     """Callbacks made by the agent to update the data model."""
     RPC_API_VERSION = '1.0'
 
-    def __init__(self, plugin, env, scheduler):
+    def __init__(self, plugin, env, scheduler, changes=None):
         LOG.debug('LoadBalancerCallbacks RPC subscriber initialized')
         self.plugin = plugin
         self.env = env
         self.scheduler = scheduler
+        if changes is None:
+            changes = PoolChangeLog()
+        self.changes = changes
         self.net_cache = {}
         self.subnet_cache = {}
 
@@ -126,31 +251,7 @@ class LoadBalancerCallbacks(object):
         with context.session.begin(subtransactions=True):
             if not host:
                 return []
-            agents = self.scheduler.get_agents_in_env(self.plugin,
-                                                      context,
-                                                      env,
-                                                      group)
-            if not agents:
-                return []
-
-            # get all pools associated with this agents in this
-            # env + group a build a set of known ACTIVE pools
-            # to return
-            pool_ids = []
-            for agent in agents:
-                agent_pools = self.plugin.list_pools_on_lbaas_agent(
-                    context,
-                    agent.id
-                )
-                for pool in agent_pools['pools']:
-                    pool_ids.append(
-                        {
-                         'agent_host': agent['host'],
-                         'pool_id': pool['id'],
-                         'tenant_id': pool['tenant_id']
-                        }
-                    )
-            return pool_ids
+            return self._get_agent_pools(context, env, group)
 
     @log.log
     def get_active_pools(self, context, env=None, group=0, host=None):
@@ -158,33 +259,9 @@ class LoadBalancerCallbacks(object):
         with context.session.begin(subtransactions=True):
             if not host:
                 return []
-            agents = self.scheduler.get_agents_in_env(self.plugin,
-                                                      context,
-                                                      env,
-                                                      group)
-            if not agents:
-                return []
-
-            # get all pools associated with this agents in this
-            # env + group a build a set of known ACTIVE pools
-            # to return
-            pool_ids = []
-            for agent in agents:
-                agent_pools = self.plugin.list_pools_on_lbaas_agent(
-                    context,
-                    agent.id
-                )
-                for pool in agent_pools['pools']:
-                    if pool['status'] == constants.ACTIVE:
-                        # add agent reference
-                        pool_ids.append(
-                            {
-                             'agent_host': agent['host'],
-                             'pool_id': pool['id'],
-                             'tenant_id': pool['tenant_id']
-                            }
-                        )
-            return pool_ids
+            return self._get_agent_pools(
+                context, env, group,
+                lb_db.Pool.status == constants.ACTIVE)
 
     @log.log
     def get_pending_pools(self, context, env=None, group=0, host=None):
@@ -192,147 +269,234 @@ class LoadBalancerCallbacks(object):
         with context.session.begin(subtransactions=True):
             if not host:
                 return []
-            agents = self.scheduler.get_agents_in_env(self.plugin,
-                                                      context,
-                                                      env,
-                                                      group)
-            if not agents:
-                return []
-
-            pool_ids_by_agent_host = {}
-            pools_to_update = []
-
-            # get all pools associated with this agents in this
-            # env + group, build a filter list of pool_ids and
-            # a set of known non-ACTIVE pools
-            for agent in agents:
-                agent_pools = self.plugin.list_pools_on_lbaas_agent(
-                    context,
-                    agent.id
-                )
-                for pool in agent_pools['pools']:
-                    # add this to our filter list to query
-                    # VIPS and Members
-                    if agent['host'] not in pool_ids_by_agent_host:
-                        pool_ids_by_agent_host[agent['host']] = []
-                    pool_ids_by_agent_host[agent['host']].append(pool['id'])
-                    # can we tell if this pool needs updates
-                    # just from the pool or health monitor
-                    # status already?
-                    if pool['status'] != constants.ACTIVE:
-                        pools_to_update.append(
-                            {
-                             'agent_host': agent['host'],
-                             'pool_id': pool['id'],
-                             'tenant_id': pool['tenant_id']
-                            }
-                        )
-                    for hms in pool['health_monitors_status']:
-                        if hms['status'] != constants.ACTIVE:
-                            pools_to_update.append(
-                                {
-                                 'agent_host': agent['host'],
-                                 'pool_id': pool['id'],
-                                 'tenant_id': pool['tenant_id']
-                                }
-                            )
-            for agent_host in pool_ids_by_agent_host.keys():
-                pool_ids = pool_ids_by_agent_host[agent_host]
-                # get vips associated with pools which are not active
-                vips = self.plugin.get_vips(
-                    context,
-                    filters={'pool_id': pool_ids, },
-                    fields=['id', 'pool_id', 'status']
-                )
-                for vip in vips:
-                    if vip['status'] != constants.ACTIVE:
-                        pools_to_update.append(
-                            {
-                             'agent_host': agent_host,
-                             'pool_id': pool['id']
-                            }
-                        )
-                members = self.plugin.get_members(
-                    context,
-                    filters={'pool_id': pool_ids, },
-                    fields=['id', 'pool_id', 'status']
-                )
-                for member in members:
-                    if member['status'] != constants.ACTIVE:
-                        pools_to_update.append(
-                            {
-                             'agent_host': agent_host,
-                             'pool_id': pool['id']
-                            }
-                        )
+            # a pool needs updates if the pool, its vip, any of its
+            # members or any of its health monitor associations is
+            # not ACTIVE
+            pool_id = lb_db.Pool.id
+            pending = sa.or_(
+                lb_db.Pool.status != constants.ACTIVE,
+                sa.exists().where(sa.and_(
+                    lb_db.Vip.pool_id == pool_id,
+                    lb_db.Vip.status != constants.ACTIVE)),
+                sa.exists().where(sa.and_(
+                    lb_db.Member.pool_id == pool_id,
+                    lb_db.Member.status != constants.ACTIVE)),
+                sa.exists().where(sa.and_(
+                    lb_db.PoolMonitorAssociation.pool_id == pool_id,
+                    lb_db.PoolMonitorAssociation.status !=
+                    constants.ACTIVE)))
+            return self._get_agent_pools(context, env, group, pending)
+
+    def _get_agent_pools(self, context, env, group, criterion=None):
+        """ Pools bound to the agents in this group in this env,
+            matching criterion. Reads all pools with one query. """
+        agents = self.scheduler.get_agents_in_env(self.plugin,
+                                                  context,
+                                                  env,
+                                                  group)
+        if not agents:
+            return []
+        agent_hosts = {}
+        for agent in agents:
+            agent_hosts[agent['id']] = agent['host']
+
+        binding = agent_scheduler_db.PoolLoadbalancerAgentBinding
+        query = context.session.query(
+            lb_db.Pool.id, lb_db.Pool.tenant_id, binding.agent_id
+        ).join(
+            binding, binding.pool_id == lb_db.Pool.id
+        ).filter(
+            binding.agent_id.in_(agent_hosts.keys())
+        )
+        if criterion is not None:
+            query = query.filter(criterion)
+
+        pools = []
+        for (pool_id, tenant_id, agent_id) in query.distinct():
+            pools.append(
+                {
+                 'agent_host': agent_hosts[agent_id],
+                 'pool_id': pool_id,
+                 'tenant_id': tenant_id
+                }
+            )
+        return pools
 
-            return pools_to_update
+    @log.log
+    def get_pool_changes(self, context, generation=None,
+                         env=None, group=0, host=None):
+        """ Get the pools of the agent on host changed since
+            generation. The pool list is None when the agent must
+            do a full resync instead. """
+        result = {'epoch': None,
+                  'generation': None,
+                  'pools': None}
+        if not host or not self.changes.enabled:
+            return result
+        with context.session.begin(subtransactions=True):
+            # read the newest generation first, so a change committed
+            # in between is reported again rather than missed.
+            (result['epoch'], result['generation']) = \
+                self.changes.position(context, host)
+            result['pools'] = self.changes.changes_since(
+                context, generation, host)
+        return result
 
     @log.log
     def get_service_by_pool_id(
             self, context, pool_id=None, global_routed_mode=False, host=None):
         """ Get full service definition from pool id """
-        # invalidate cache if it is too old
-        if (datetime.datetime.now() - self.last_cache_update).seconds \
-                > NET_CACHE_SECONDS:
-            self.net_cache = {}
-            self.subnet_cache = {}
-
-        service = {}
+        self._check_cache_age()
         with context.session.begin(subtransactions=True):
             LOG.debug(_('Building service definition entry for %s' % pool_id))
+            service = self._get_services(
+                context, [pool_id], global_routed_mode)[pool_id]
+        LOG.debug(_('Built pool %s service: %s' % (pool_id, service)))
+        return service
+
+    @log.log
+    def get_services_by_pool_ids(
+            self, context, pool_ids=None, global_routed_mode=False, host=None):
+        """ Get full service definitions for a list of pool ids """
+        self._check_cache_age()
+        if not pool_ids:
+            return {}
+        with context.session.begin(subtransactions=True):
+            LOG.debug(_('Building service definition entries for %d pools'
+                        % len(pool_ids)))
+            services = self._get_services(
+                context, pool_ids, global_routed_mode)
+        return services
+
+    def _check_cache_age(self):
+        """ invalidate cache if it is too old """
+        now = datetime.datetime.now()
+        if (now - self.last_cache_update).seconds > NET_CACHE_SECONDS:
+            self.net_cache = {}
+            self.subnet_cache = {}
+            self.last_cache_update = now
+
+    def _get_services(self, context, pool_ids, global_routed_mode):
+        """ Build service definitions keyed by pool id.
+
+            Pools, members, health monitors, vips and their ports are
+            each read with one query for all pools. Pools which do not
+            exist get a service with a pool of None. """
+        services = {}
+        for pool_id in pool_ids:
+            services[pool_id] = {'pool': None}
+
+        pools = self.plugin.get_pools(context, filters={'id': pool_ids})
+        if not pools:
+            return services
+        found_pool_ids = [pool['id'] for pool in pools]
+
+        members_by_id = {}
+        for member in self.plugin.get_members(
+                context, filters={'pool_id': found_pool_ids}):
+            members_by_id[member['id']] = member
+
+        monitor_ids = set()
+        vip_ids = []
+        for pool in pools:
+            monitor_ids.update(pool['health_monitors'])
+            if pool.get('vip_id'):
+                vip_ids.append(pool['vip_id'])
+        monitors_by_id = {}
+        if monitor_ids:
+            for monitor in self.plugin.get_health_monitors(
+                    context, filters={'id': list(monitor_ids)}):
+                monitors_by_id[monitor['id']] = monitor
+        vips_by_id = {}
+        if vip_ids:
+            for vip in self.plugin.get_vips(context, filters={'id': vip_ids}):
+                vips_by_id[vip['id']] = vip
+
+        adminctx = get_admin_context()
+        allocations = {}
+        member_ports = {}
+        vip_ports = {}
+        if not global_routed_mode:
+            allocations = self._get_allocations_by_address(
+                adminctx, [member['address']
+                           for member in members_by_id.values()])
+            port_ids = set()
+            for allocated in allocations.values():
+                for alloc in allocated:
+                    port_ids.add(alloc['port_id'])
+            member_ports = self._get_ports_by_id(adminctx, port_ids)
+            vip_ports = self._get_ports_by_id(
+                context, [vip['port_id'] for vip in vips_by_id.values()])
+
+        for pool in pools:
+            service = services[pool['id']]
+            service['pool'] = self._extend_pool(
+                context, pool, global_routed_mode)
 
-            # populate pool
-            pool = self._get_extended_pool(
-                context, pool_id, global_routed_mode)
-            service['pool'] = pool
-            if not pool:
-                LOG.debug(_('Built pool %s service: %s' % (pool_id, service)))
-                return service
             # populate pool members
-            adminctx = get_admin_context()
             if 'members' not in pool or len(pool['members']) == 0:
                 pool['members'] = []
             service['members'] = []
             for member_id in pool['members']:
-                try:
-                    member = self.plugin.get_member(context, member_id)
-                    member['network'] = None
-                    member['subnet'] = None
-                    member['port'] = None
-                    if not global_routed_mode:
-                        self._extend_member(
-                            adminctx, context, pool, member)
-                    service['members'].append(member)
-                except MemberNotFound:
+                if member_id not in members_by_id:
                     LOG.error("get_service_by_pool_id: Member not found %s" %
                               member_id)
+                    continue
+                member = members_by_id[member_id]
+                member['network'] = None
+                member['subnet'] = None
+                member['port'] = None
+                if not global_routed_mode:
+                    self._extend_member(
+                        adminctx, context, pool, member,
+                        allocated=allocations.get(member['address'], []),
+                        ports=member_ports)
+                service['members'].append(member)
 
             # populate health monitors
             service['health_monitors'] = []
-            for health_mon in service['pool']['health_monitors']:
-                service['health_monitors'].append(
-                    self.plugin.get_health_monitor(context, health_mon)
-                )
+            for health_mon in pool['health_monitors']:
+                if health_mon in monitors_by_id:
+                    service['health_monitors'].append(
+                        monitors_by_id[health_mon])
 
             # populate vip
-            service['vip'] = self._get_extended_vip(
-                context, pool, global_routed_mode)
-
-        LOG.debug(_('Built pool %s service: %s' % (pool_id, service)))
-        return service
+            if pool.get('vip_id') in vips_by_id:
+                vip = vips_by_id[pool['vip_id']]
+                service['vip'] = self._extend_vip(
+                    context, vip, global_routed_mode,
+                    port=vip_ports.get(vip['port_id']))
+            else:
+                service['vip'] = {'port': {'network': None, 'subnet': None}}
 
-    def _get_extended_pool(self, context, pool_id, global_routed_mode):
-        """ Get Pool from Neutron and add extended data """
-        # Start with neutron pool definition
-        try:
-            pool = self.plugin.get_pool(context, pool_id)
-        except:
-            LOG.error("get_service_by_pool_id: Pool not found %s" %
-                      pool_id)
-            return None
+        return services
 
-        # Populate extended pool attributes
+    def _get_allocations_by_address(self, adminctx, addresses):
+        """ IP allocations matching any of the addresses """
+        allocations = {}
+        if not addresses:
+            return allocations
+        from neutron.db import models_v2 as core_db
+        alloc_qry = adminctx.session.query(core_db.IPAllocation)
+        for alloc in alloc_qry.filter(
+                core_db.IPAllocation.ip_address.in_(set(addresses))).all():
+            if alloc['ip_address'] not in allocations:
+                allocations[alloc['ip_address']] = []
+            allocations[alloc['ip_address']].append(alloc)
+        return allocations
+
+    def _get_ports_by_id(self, context, port_ids):
+        """ Ports for port ids, keyed by id """
+        ports = {}
+        if not port_ids:
+            return ports
+        for port in self._core_plugin().get_ports(
+                context, filters={'id': list(port_ids)}):
+            ports[port['id']] = port
+        return ports
+
+    def _extend_pool(self, context, pool, global_routed_mode):
+        """ Add extended data to a neutron pool """
         if not global_routed_mode:
             pool['subnet'] = self._get_subnet_cached(
                 context, pool['subnet_id'])
@@ -362,12 +526,8 @@ class LoadBalancerCallbacks(object):
             self.net_cache[network_id] = net_dict
         return self.net_cache[network_id]
 
-    def _get_extended_vip(self, context, pool, global_routed_mode):
+    def _extend_vip(self, context, vip, global_routed_mode, port=None):
         """ add network data to vip """
-        if 'vip_id' not in pool or not pool['vip_id']:
-            return {'port': {'network': None, 'subnet': None}}
-
-        vip = self.plugin.get_vip(context, pool['vip_id'])
         if global_routed_mode:
             vip['network'] = None
             vip['subnet'] = None
@@ -376,14 +536,16 @@ class LoadBalancerCallbacks(object):
             vip['port']['subnet'] = None
             return vip
 
-        vip['port'] = self._core_plugin().get_port(context, vip['port_id'])
+        if not port:
+            port = self._core_plugin().get_port(context, vip['port_id'])
+        vip['port'] = port
         vip['network'] = self._get_network_cached(
             context, vip['port']['network_id'])
         self._populate_vip_network_vteps(context, vip)
 
         # there should only be one fixed_ip
         for fixed_ip in vip['port']['fixed_ips']:
-            vip['subnet'] = self._core_plugin().get_subnet(
+            vip['subnet'] = self._get_subnet_cached(
                 context, fixed_ip['subnet_id'])
             vip['address'] = fixed_ip['ip_address']
 
@@ -420,12 +582,14 @@ class LoadBalancerCallbacks(object):
                         vip['gre_vteps'].append(ep)
 
     def _extend_member(
-            self, adminctx, context, pool, member):
+            self, adminctx, context, pool, member, allocated=None, ports=None):
         """ Add networking info to member """
 
-        from neutron.db import models_v2 as core_db
-        alloc_qry = adminctx.session.query(core_db.IPAllocation)
-        allocated = alloc_qry.filter_by(ip_address=member['address']).all()
+        if allocated is None:
+            from neutron.db import models_v2 as core_db
+            alloc_qry = adminctx.session.query(core_db.IPAllocation)
+            allocated = alloc_qry.filter_by(
+                ip_address=member['address']).all()
 
         # try populating member from pool subnet
         matching_keys = {'tenant_id': pool['tenant_id'],
@@ -433,24 +597,25 @@ class LoadBalancerCallbacks(object):
                          'shared': None}
 
         if self._found_and_used_matching_addr(
-                adminctx, context, member, allocated, matching_keys):
+                adminctx, context, member, allocated, matching_keys, ports):
             return
 
         # try populating member from any tenant subnet
         matching_keys['subnet_id'] = None
         if self._found_and_used_matching_addr(
-                adminctx, context, member, allocated, matching_keys):
+                adminctx, context, member, allocated, matching_keys, ports):
             return
 
         # try populating member net from any shared subnet
         matching_keys['tenant_id'] = None
         matching_keys['shared'] = True
         if self._found_and_used_matching_addr(
-                adminctx, context, member, allocated, matching_keys):
+                adminctx, context, member, allocated, matching_keys, ports):
             return
 
     def _found_and_used_matching_addr(
-            self, adminctx, context, member, allocated, matching_keys):
+            self, adminctx, context, member, allocated, matching_keys,
+            ports=None):
         """ Find a matching address that matches keys """
 
         # first check list of allocated addresses in neutron
@@ -458,7 +623,7 @@ class LoadBalancerCallbacks(object):
         # first because we prefer to use a subnet that actually has
         # a matching ip address on it.
         if self._found_and_used_neutron_addr(
-                adminctx, context, member, allocated, matching_keys):
+                adminctx, context, member, allocated, matching_keys, ports):
             return True
 
         # Perhaps the neutron network was deleted but the pool member
@@ -479,7 +644,8 @@ class LoadBalancerCallbacks(object):
         return False
 
     def _found_and_used_neutron_addr(
-            self, adminctx, context, member, allocated, matching_keys):
+            self, adminctx, context, member, allocated, matching_keys,
+            ports=None):
         """ Find a matching address that matches keys """
 
         for alloc in allocated:
@@ -501,8 +667,11 @@ class LoadBalancerCallbacks(object):
             member['subnet'] = self._get_subnet_cached(
                 context, alloc['subnet_id'])
 
-            member['port'] = self._core_plugin().get_port(
-                adminctx, alloc['port_id'])
+            if ports and alloc['port_id'] in ports:
+                member['port'] = ports[alloc['port_id']]
+            else:
+                member['port'] = self._core_plugin().get_port(
+                    adminctx, alloc['port_id'])
             self._populate_member_network(context, member)
             return True
 
@@ -1057,6 +1226,71 @@ class LoadBalancerCallbacks(object):
         except:
             pass
 
+    @log.log
+    def update_statuses(self, context, updates=None, host=None):
+        """Agent confirmation hook to update the status of many objects.
+
+           updates are (object type, id, status, status description)
+           entries, applied in order in one transaction. Each entry is
+           applied in its own savepoint, so an entry which fails does not
+           roll back the others. The id of a health_monitor is (health
+           monitor id, pool id). A status of STATUS_DESTROYED removes the
+           object from the data model."""
+        if not updates:
+            return
+        with context.session.begin(subtransactions=True):
+            for (object_type, object_id, status, status_description) \
+                    in updates:
+                try:
+                    with context.session.begin_nested():
+                        self._update_object_status(
+                            context, object_type, object_id, status,
+                            status_description)
+                except Exception as exc:
+                    LOG.error(_('update_statuses: %s %s to %s error: %s'
+                                % (object_type, object_id, status,
+                                   exc.message)))
+
+    def _update_object_status(self, context, object_type, object_id,
+                              status, status_description):
+        """ Apply one entry of a batched status update """
+        destroyed = status == lbaasv1constants.STATUS_DESTROYED
+        if object_type == 'member':
+            if destroyed:
+                self.member_destroyed(context, member_id=object_id)
+            else:
+                self.update_member_status(
+                    context, member_id=object_id, status=status,
+                    status_description=status_description)
+        elif object_type == 'pool':
+            if destroyed:
+                self.pool_destroyed(context, pool_id=object_id)
+            else:
+                self.update_pool_status(
+                    context, pool_id=object_id, status=status,
+                    status_description=status_description)
+        elif object_type == 'health_monitor':
+            (health_monitor_id, pool_id) = object_id
+            if destroyed:
+                self.health_monitor_destroyed(
+                    context, health_monitor_id=health_monitor_id,
+                    pool_id=pool_id)
+            else:
+                self.update_health_monitor_status(
+                    context, pool_id=pool_id,
+                    health_monitor_id=health_monitor_id, status=status,
+                    status_description=status_description)
+        elif object_type == 'vip':
+            if destroyed:
+                self.vip_destroyed(context, vip_id=object_id)
+            else:
+                self.update_vip_status(
+                    context, vip_id=object_id, status=status,
+                    status_description=status_description)
+        else:
+            LOG.error(_('update_statuses: unknown object type %s'
+                        % object_type))
+
     @log.log
     def update_pool_stats(self, context, pool_id=None, stats=None, host=None):
         """ Update pool stats """
@@ -1092,6 +1326,51 @@ class LoadBalancerCallbacks(object):
         except Exception as ex:
             LOG.error(_('error updating pool stats: %s' % ex.message))
 
+    @log.log
+    def update_pools_stats(self, context, pools_stats=None, host=None):
+        """ Update stats of many pools, pools_stats is keyed by pool id.
+
+            Each pool is updated in its own savepoint, so an error on one
+            pool does not roll back the stats of the others. """
+        if not pools_stats:
+            return
+        with context.session.begin(subtransactions=True):
+            try:
+                # Do not update stats of pools in a PENDING_DELETE state.
+                pools = self.plugin.get_pools(
+                    context,
+                    filters={'id': pools_stats.keys()},
+                    fields=['id', 'status']
+                )
+                pool_ids = [pool['id'] for pool in pools
+                            if pool['status'] != 'PENDING_DELETE']
+                if not pool_ids:
+                    return
+                # Remove any pool members that are in a PENDING_DELETE
+                # state from the stats pool member lists.
+                members = self.plugin.get_members(
+                    context,
+                    filters={'pool_id': pool_ids,
+                             'status': ['PENDING_DELETE']},
+                    fields=['id', 'pool_id']
+                )
+            except Exception as ex:
+                LOG.error(_('error updating pools stats: %s' % ex.message))
+                return
+            for member in members:
+                pool_members = pools_stats[member['pool_id']].get(
+                    'members', {})
+                if member['id'] in pool_members:
+                    del pool_members[member['id']]
+            for pool_id in pool_ids:
+                try:
+                    with context.session.begin_nested():
+                        self.plugin.update_pool_stats(
+                            context, pool_id, pools_stats[pool_id])
+                except Exception as ex:
+                    LOG.error(_('error updating stats of pool %s: %s'
+                                % (pool_id, ex.message)))
+
     def create_rpc_dispatcher(self):
         """ Create rpc dispatcher """
         return q_rpc.PluginRpcDispatcher(  # @UndefinedVariable
@@ -1164,7 +1443,8 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     #   1.0 Initial version
     #   1.1 Support agent_updated call
 
-    def __init__(self, topic, env=None):
+    def __init__(self, topic, env=None, changes=None):
+        self.changes = changes
         if env:
             LOG.debug('Created LoadBalancerAgentApi RPC publisher for env %s'
                       % env)
@@ -1175,9 +1455,21 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
             super(LoadBalancerAgentApi, self).__init__(
                 topic, default_version=self.BASE_RPC_API_VERSION)
 
+    def _note_change(self, context, service, host):
+        """ Record the pool of a change sent to an agent """
+        if self.changes is None or not self.changes.enabled or \
+                not service or not service.get('pool'):
+            return
+        try:
+            self.changes.record(context, service['pool']['id'], host)
+        except Exception as exc:
+            LOG.error(_('Can not record change of pool %s: %s'
+                        % (service['pool']['id'], exc)))
+
     @log.log
     def create_vip(self, context, vip, service, host):
         """ Send message to agent to create vip """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('create_vip', vip=vip, service=service),
@@ -1187,6 +1479,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def update_vip(self, context, old_vip, vip, service, host):
         """ Send message to agent to update vip """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('update_vip', old_vip=old_vip, vip=vip,
@@ -1197,6 +1490,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def delete_vip(self, context, vip, service, host):
         """ Send message to agent to create vip """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('delete_vip', vip=vip, service=service),
@@ -1206,6 +1500,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def create_pool(self, context, pool, service, host):
         """ Send message to agent to create pool """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('create_pool', pool=pool, service=service),
@@ -1215,6 +1510,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def update_pool(self, context, old_pool, pool, service, host):
         """ Send message to agent to update pool """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('update_pool', old_pool=old_pool, pool=pool,
@@ -1225,6 +1521,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def delete_pool(self, context, pool, service, host):
         """ Send message to agent to delete pool """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('delete_pool', pool=pool, service=service),
@@ -1234,6 +1531,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def create_member(self, context, member, service, host):
         """ Send message to agent to create member """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('create_member', member=member, service=service),
@@ -1243,6 +1541,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def update_member(self, context, old_member, member, service, host):
         """ Send message to agent to update member """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('update_member', old_member=old_member,
@@ -1253,6 +1552,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     @log.log
     def delete_member(self, context, member, service, host):
         """ Send message to agent to delete member """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('delete_member', member=member, service=service),
@@ -1263,6 +1563,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     def create_pool_health_monitor(self, context, health_monitor, pool,
                                    service, host):
         """ Send message to agent to create pool health monitor """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('create_pool_health_monitor',
@@ -1275,6 +1576,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     def update_health_monitor(self, context, old_health_monitor,
                               health_monitor, pool, service, host):
         """ Send message to agent to update pool health monitor """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('update_health_monitor',
@@ -1288,6 +1590,7 @@ class LoadBalancerAgentApi(proxy.RpcProxy):  # @UndefinedVariable
     def delete_pool_health_monitor(self, context, health_monitor, pool,
                                    service, host):
         """ Send message to agent to delete pool health monitor """
+        self._note_change(context, service, host)
         return self.cast(
             context,
             self.make_msg('delete_pool_health_monitor',
@@ -1343,10 +1646,15 @@ class F5PluginDriver(LoadBalancerAbstractDriver):
         self.pool_scheduler = importutils.import_object(
             cfg.CONF.f5_loadbalancer_pool_scheduler_driver)
 
+        # pools changes were sent to agents for
+        self.pool_changes = PoolChangeLog()
+        self.pool_changes.create_tables()
+
         # Create RPM Message caster to agents
         self.agent_rpc = LoadBalancerAgentApi(
             lbaasv1constants.TOPIC_LOADBALANCER_AGENT,
-            env
+            env,
+            self.pool_changes
         )
 
         # keep reference to LBaaS plugin
@@ -1367,7 +1675,8 @@ class F5PluginDriver(LoadBalancerAbstractDriver):
         """ Setup callbacks to receive calls from agent """
         self.callbacks = LoadBalancerCallbacks(self.plugin,
                                                self.env,
-                                               self.pool_scheduler)
+                                               self.pool_scheduler,
+                                               self.pool_changes)
         topic = lbaasv1constants.TOPIC_PROCESS_ON_HOST
         if self.env:
             topic = topic + "_" + self.env
@@ -0,0 +1,208 @@
+""" Benchmark of reading the pools of the agents in a group.
+
+    Fills a SQLite database with the neutron LBaaS v1 tables and
+    compares get_all_pools and get_pending_pools as they were, with
+    one list_pools_on_lbaas_agent call per agent and vip and member
+    reads per agent host, with the driver's own
+    LoadBalancerCallbacks.get_all_pools and get_pending_pools, which
+    read all agents with one joined query.
+
+    Only the database is replaced: both run against the neutron LBaaS
+    v1 database plugin and the driver's TenantScheduler, with an admin
+    context reading the SQLite session.
+
+    Needs the driver installed with neutron and SQLAlchemy:
+
+        python test/benchmark_agent_pools.py [pools] [agents]
+"""
+from __future__ import print_function
+
+import datetime
+import json
+import sys
+import time
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from neutron import context as neutron_context
+from neutron.common import constants as q_const
+from neutron.db import agents_db
+from neutron.db import model_base
+from neutron.plugins.common import constants
+
+from f5.oslbaasv1driver.drivers import agent_scheduler
+from f5.oslbaasv1driver.drivers import plugin_driver
+from f5.oslbaasv1driver.drivers.plugin_driver import lb_db
+from f5.oslbaasv1driver.drivers.plugin_driver import agent_scheduler_db
+
+ENVIRONMENT = 'Test'
+MEMBERS_PER_POOL = 5
+
+
+class LoadBalancerPluginDb(lb_db.LoadBalancerPluginDb,
+                           agent_scheduler_db.LbaasAgentSchedulerDbMixin):
+    """ The database side of the LBaaS v1 plugin """
+
+    def get_plugin_type(self):
+        return constants.LOADBALANCER
+
+    def get_plugin_description(self):
+        return 'LBaaS v1 database'
+
+
+def populate(session, pool_count, agent_count):
+    """ Agents in one environment and pools with a vip, members and
+        a monitor each. One pool in fifty has a pending member. """
+    now = datetime.datetime.utcnow()
+    configurations = json.dumps({'environment_prefix': ENVIRONMENT})
+    rows = dict((model, []) for model in (
+        agents_db.Agent, lb_db.Pool, lb_db.Vip, lb_db.Member,
+        lb_db.PoolMonitorAssociation,
+        agent_scheduler_db.PoolLoadbalancerAgentBinding))
+    for i in range(agent_count):
+        rows[agents_db.Agent].append(
+            {'id': 'agent-%03d' % i,
+             'agent_type': q_const.AGENT_TYPE_LOADBALANCER,
+             'binary': 'f5-oslbaasv1-agent',
+             'topic': 'f5-lbaas-process-on-agent',
+             'host': 'host-%03d' % i,
+             'admin_state_up': True,
+             'created_at': now,
+             'started_at': now,
+             'heartbeat_timestamp': now,
+             'configurations': configurations})
+    for i in range(pool_count):
+        pool_id = 'pool-%06d' % i
+        tenant_id = 'tenant-%04d' % (i % 2000)
+        rows[lb_db.Pool].append(
+            {'id': pool_id, 'tenant_id': tenant_id,
+             'subnet_id': 'subnet-%04d' % (i % 2000),
+             'protocol': 'HTTP', 'lb_method': 'ROUND_ROBIN',
+             'admin_state_up': True, 'status': constants.ACTIVE})
+        rows[lb_db.Vip].append(
+            {'id': 'vip-%06d' % i, 'tenant_id': tenant_id,
+             'pool_id': pool_id, 'protocol_port': 80, 'protocol': 'HTTP',
+             'admin_state_up': True, 'status': constants.ACTIVE})
+        for j in range(MEMBERS_PER_POOL):
+            status = constants.ACTIVE
+            if j == 0 and i % 50 == 0:
+                status = constants.PENDING_UPDATE
+            rows[lb_db.Member].append(
+                {'id': 'member-%06d-%d' % (i, j), 'tenant_id': tenant_id,
+                 'pool_id': pool_id, 'address': '10.0.0.%d' % (j + 1),
+                 'protocol_port': 80, 'weight': 1,
+                 'admin_state_up': True, 'status': status})
+        rows[lb_db.PoolMonitorAssociation].append(
+            {'pool_id': pool_id, 'monitor_id': 'monitor-%06d' % i,
+             'status': constants.ACTIVE})
+        rows[agent_scheduler_db.PoolLoadbalancerAgentBinding].append(
+            {'pool_id': pool_id,
+             'agent_id': 'agent-%03d' % (i % agent_count)})
+    with session.begin():
+        for model in rows:
+            if rows[model]:
+                session.execute(model.__table__.insert(), rows[model])
+
+
+def make_context(pool_count, agent_count):
+    """ An admin context on a populated SQLite database """
+    engine = sa.create_engine('sqlite://')
+    model_base.BASEV2.metadata.create_all(engine)
+    # as neutron makes its sessions
+    session = orm.sessionmaker(bind=engine, autocommit=True,
+                               expire_on_commit=False)()
+    populate(session, pool_count, agent_count)
+    context = neutron_context.get_admin_context()
+    context._session = session
+    return context
+
+
+def per_agent_all_pools(callbacks, context, env, group):
+    """ get_all_pools as it was """
+    agents = callbacks.scheduler.get_agents_in_env(
+        callbacks.plugin, context, env, group)
+    pool_ids = []
+    for agent in agents:
+        agent_pools = callbacks.plugin.list_pools_on_lbaas_agent(
+            context, agent.id)
+        for pool in agent_pools['pools']:
+            pool_ids.append({'agent_host': agent['host'],
+                             'pool_id': pool['id'],
+                             'tenant_id': pool['tenant_id']})
+    return pool_ids
+
+
+def per_agent_pending_pools(callbacks, context, env, group):
+    """ get_pending_pools as it was, reporting pending vips and
+        members under their own pool """
+    agents = callbacks.scheduler.get_agents_in_env(
+        callbacks.plugin, context, env, group)
+    pool_ids_by_agent_host = {}
+    pools_to_update = []
+    for agent in agents:
+        agent_pools = callbacks.plugin.list_pools_on_lbaas_agent(
+            context, agent.id)
+        for pool in agent_pools['pools']:
+            pool_ids_by_agent_host.setdefault(
+                agent['host'], []).append(pool['id'])
+            if pool['status'] != constants.ACTIVE:
+                pools_to_update.append({'agent_host': agent['host'],
+                                        'pool_id': pool['id']})
+            for hms in pool['health_monitors_status']:
+                if hms['status'] != constants.ACTIVE:
+                    pools_to_update.append({'agent_host': agent['host'],
+                                            'pool_id': pool['id']})
+    for agent_host in pool_ids_by_agent_host:
+        pool_ids = pool_ids_by_agent_host[agent_host]
+        for get_children in (callbacks.plugin.get_vips,
+                             callbacks.plugin.get_members):
+            for child in get_children(context,
+                                      filters={'pool_id': pool_ids},
+                                      fields=['id', 'pool_id', 'status']):
+                if child['status'] != constants.ACTIVE:
+                    pools_to_update.append({'agent_host': agent_host,
+                                            'pool_id': child['pool_id']})
+    return pools_to_update
+
+
+def pool_keys(pools):
+    return set((pool['agent_host'], pool['pool_id']) for pool in pools)
+
+
+def main():
+    pool_count = 20000
+    agent_count = 20
+    if len(sys.argv) > 1:
+        pool_count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        agent_count = int(sys.argv[2])
+    start = time.time()
+    context = make_context(pool_count, agent_count)
+    print('%d pools, %d agents, fixture built in %.1f secs'
+          % (pool_count, agent_count, time.time() - start))
+    callbacks = plugin_driver.LoadBalancerCallbacks(
+        LoadBalancerPluginDb(), ENVIRONMENT,
+        agent_scheduler.TenantScheduler())
+
+    for (call, before) in (('get_all_pools', per_agent_all_pools),
+                           ('get_pending_pools', per_agent_pending_pools)):
+        after = getattr(callbacks, call)
+        results = {}
+        print(call)
+        for (name, read_pools) in (
+                ('before', lambda: before(callbacks, context,
+                                          ENVIRONMENT, 0)),
+                ('after', lambda: after(context, env=ENVIRONMENT,
+                                        group=0, host='host-000'))):
+            # start from an empty identity map, as a new RPC would
+            context.session.expunge_all()
+            start = time.time()
+            results[name] = read_pools()
+            print('  %-6s %10.3f secs, %d pools'
+                  % (name, time.time() - start, len(results[name])))
+        assert pool_keys(results['before']) == pool_keys(results['after'])
+
+
+if __name__ == '__main__':
+    main()
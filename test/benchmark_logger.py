@@ -0,0 +1,154 @@
+""" Micro-benchmark of f5.common.logger.Log in a pool purge.
+
+    Runs Pool.purge_orphaned_pools against a stub device with many
+    pools, once with the Log class as it was before the shared handler
+    and lazy arguments and once with the current one. The stub only
+    answers the iControl REST calls of the purge. Debug logging is
+    disabled, as in a default agent setup, and then enabled with
+    output to an in-memory stream.
+
+    Needs netaddr. Run from the repository root:
+
+        python test/benchmark_logger.py [pools]
+"""
+from __future__ import print_function
+
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'common'))
+
+from f5.bigip import interfaces as bigip_interfaces  # noqa
+from f5.bigip.cache import ConfigCache  # noqa
+from f5.bigip.interfaces import pool as pool_interface  # noqa
+from f5.common import logger  # noqa
+from f5.common.logger import Log  # noqa
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class BaselineLog(object):
+    """ Log as it was: messages formatted by the caller, a handler
+        and formatter per call """
+    @staticmethod
+    def debug(prefix, msg, *args):
+        if args:
+            msg = msg % args
+        BaselineLog._log('debug', prefix, msg)
+
+    @staticmethod
+    def error(prefix, msg, *args):
+        if args:
+            msg = msg % args
+        BaselineLog._log('error', prefix, msg)
+
+    @staticmethod
+    def _log(level, prefix, msg):
+        log_string = prefix + ': ' + msg
+        log = logging.getLogger(logger.__name__)
+        out_hdlr = logging.StreamHandler(sys.stdout)
+        out_hdlr.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        log.addHandler(out_hdlr)
+        getattr(log, level)(log_string)
+        log.removeHandler(out_hdlr)
+
+
+class StubResponse(object):
+    def __init__(self, status_code, obj=None):
+        self.status_code = status_code
+        self.text = json.dumps(obj or {})
+
+
+class StubSession(object):
+    """ Answers the pool collection GET, nothing else exists """
+    def __init__(self, existing_pools):
+        self.collection = {'items': [
+            {'name': name, 'partition': partition}
+            for (name, partition) in existing_pools.items()]}
+
+    def get(self, url, **kwargs):
+        if url.endswith('/ltm/pool?$select=name,partition'):
+            return StubResponse(200, self.collection)
+        return StubResponse(404)
+
+    def delete(self, url, **kwargs):
+        return StubResponse(200)
+
+
+class StubVirtualServer(object):
+    def get_virtual_servers_by_pool_name(self, pool_name=None,
+                                         folder='Common'):
+        return None
+
+
+class StubBigIP(object):
+    def __init__(self, existing_pools):
+        self.icr_url = 'https://localhost/mgmt/tm'
+        self.icr_session = StubSession(existing_pools)
+        self.config_cache = ConfigCache()
+        self.virtual_server = StubVirtualServer()
+
+
+def measure(log_class, known_pools, existing_pools):
+    """ Seconds for one purge """
+    pool_interface.Log = log_class
+    try:
+        pools = pool_interface.Pool(StubBigIP(existing_pools))
+        # as BigIP sets it on the interfaces it creates
+        pools.OBJ_PREFIX = bigip_interfaces.OBJ_PREFIX
+        start = time.time()
+        pools.purge_orphaned_pools(known_pools)
+        return time.time() - start
+    finally:
+        pool_interface.Log = Log
+
+
+def main():
+    pools = 10000
+    if len(sys.argv) > 1:
+        pools = int(sys.argv[1])
+    # all pools are known except one in a hundred, which is purged
+    existing_pools = dict(('uuid_pool-%05d' % i,
+                           'uuid_tenant-%03d' % (i % 500))
+                          for i in range(pools))
+    known_pools = ['pool-%05d' % i for i in range(pools) if i % 100]
+
+    log = logging.getLogger(logger.__name__)
+    # debug disabled: the default agent log level
+    log.setLevel(logging.INFO)
+    print('%d pools, debug disabled' % pools)
+    for (name, log_class) in (('before', BaselineLog), ('after', Log)):
+        print('  %-6s %10.3f secs per purge'
+              % (name, measure(log_class, known_pools, existing_pools)))
+
+    # debug enabled: everything goes to an in-memory stream
+    log.setLevel(logging.DEBUG)
+    stdout = sys.stdout
+    print('%d pools, debug enabled' % pools)
+    results = []
+    for (name, log_class) in (('before', BaselineLog), ('after', Log)):
+        sys.stdout = StringIO()
+        logger._HANDLER.stream = sys.stdout
+        # the baseline brings its own handler
+        if log_class is BaselineLog:
+            log.removeHandler(logger._HANDLER)
+        try:
+            results.append(
+                (name, measure(log_class, known_pools, existing_pools)))
+        finally:
+            sys.stdout = stdout
+            logger._HANDLER.stream = stdout
+            log.addHandler(logger._HANDLER)
+    for (name, seconds) in results:
+        print('  %-6s %10.3f secs per purge' % (name, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+""" Benchmark of matching pool members to BIG-IP monitor states.
+
+    The stats cycle sets the status of every member from the monitor
+    states the BIG-IPs report for its pool. This compares the nested
+    scan the driver used to make, which strips the route domain and
+    converts the port for every member and state pair, with the
+    driver's own iControlDriver._get_service_stats, which looks every
+    member up in the (address, port) map _get_monitor_state_map builds
+    once per device. Only the device reads are left out: the same
+    monitor state lists are used for every device.
+
+    Needs the agent installed with its dependencies:
+
+        python test/benchmark_member_status.py [members] [devices]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from neutron.plugins.common import constants as plugin_const
+
+from f5.bigip.interfaces import strip_domain_address
+from f5.oslbaasv1agent.drivers.bigip import icontrol_driver
+from f5.oslbaasv1agent.drivers.bigip.icontrol_driver import \
+    MEMBER_STATUS_UPDATE_STATES, MONITOR_UP_STATES
+
+POOL_STATS = {'STATISTIC_SERVER_SIDE_BYTES_IN': 0,
+              'STATISTIC_SERVER_SIDE_BYTES_OUT': 0,
+              'STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS': 0,
+              'STATISTIC_SERVER_SIDE_TOTAL_CONNECTIONS': 0}
+
+
+def scan_members(service, device_states):
+    """ Member status from the monitor state lists, as before """
+    members = {}
+    for monitor_states in device_states:
+        for member in service['members']:
+            if member['status'] in MEMBER_STATUS_UPDATE_STATES:
+                if not member['id'] in members:
+                    members[member['id']] = \
+                        {'status': plugin_const.INACTIVE}
+                for state in monitor_states:
+                    if member['address'] == \
+                            strip_domain_address(state['addr']) and \
+                            int(member['protocol_port']) == \
+                            int(state['port']):
+                        if state['state'] in MONITOR_UP_STATES:
+                            if members[member['id']]['status'] != 'DOWN':
+                                if member['admin_state_up']:
+                                    members[member['id']]['status'] = \
+                                        plugin_const.ACTIVE
+                                else:
+                                    members[member['id']]['status'] = \
+                                        plugin_const.INACTIVE
+                        else:
+                            members[member['id']]['status'] = \
+                                plugin_const.DOWN
+    return members
+
+
+def map_members(service, device_states):
+    """ Member status from the driver, with the per device maps """
+    driver = object.__new__(icontrol_driver.iControlDriver)
+    all_bigip_stats = [
+        (POOL_STATS, icontrol_driver._get_monitor_state_map(monitor_states))
+        for monitor_states in device_states]
+    return driver._get_service_stats(service, all_bigip_stats)['members']
+
+
+def main():
+    member_count = 2000
+    device_count = 2
+    if len(sys.argv) > 1:
+        member_count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        device_count = int(sys.argv[2])
+    members = []
+    monitor_states = []
+    for i in range(member_count):
+        address = '10.%d.%d.%d' % (i // 65536, (i // 256) % 256, i % 256)
+        members.append({'id': 'member-%d' % i,
+                        'address': address,
+                        'protocol_port': '80',
+                        'status': plugin_const.ACTIVE,
+                        'admin_state_up': True})
+        if i % 50:
+            state = 'MONITOR_STATUS_UP'
+        else:
+            state = 'MONITOR_STATUS_DOWN'
+        monitor_states.append({'addr': address + '%2',
+                               'port': '80',
+                               'state': state})
+    service = {'members': members}
+    device_states = [monitor_states] * device_count
+
+    print('%d members, %d devices' % (member_count, device_count))
+    results = {}
+    for (name, match) in (('before', scan_members),
+                          ('after', map_members)):
+        start = time.time()
+        results[name] = match(service, device_states)
+        print('  %-6s %10.3f secs per pool'
+              % (name, time.time() - start))
+    assert results['before'] == results['after']
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+""" Benchmark of the route domain overlap check of assign_route_domain.
+
+    Compares the scan assign_route_domain used to make, testing every
+    subnet of every network in a route domain for containment both
+    ways, with the bisect of the SubnetIndex NetworkBuilderDirect
+    keeps per route domain. Both are timed for overlap checks against
+    a full route domain, and for placing every subnet in turn, which
+    checks and then adds it.
+
+    Needs netaddr. Run from the repository root:
+
+        python test/benchmark_subnet_index.py [subnets]
+"""
+from __future__ import print_function
+
+import bisect
+import sys
+import time
+
+import netaddr
+
+SUBNETS_PER_NETWORK = 10
+
+
+class SubnetIndex(object):
+    """ network_direct.SubnetIndex """
+
+    def __init__(self):
+        self.subnets = {}
+        self._firsts = {4: [], 6: []}
+        self._blocks = {}
+
+    def __contains__(self, subnet_id):
+        return subnet_id in self.subnets
+
+    def add(self, subnet_id, cidr):
+        self.remove(subnet_id)
+        self.subnets[subnet_id] = cidr
+        bisect.insort(self._firsts[cidr.version], cidr.first)
+        block = (cidr.version, cidr.first, cidr.prefixlen)
+        self._blocks[block] = self._blocks.get(block, 0) + 1
+
+    def remove(self, subnet_id):
+        cidr = self.subnets.pop(subnet_id, None)
+        if cidr is None:
+            return
+        firsts = self._firsts[cidr.version]
+        del firsts[bisect.bisect_left(firsts, cidr.first)]
+        block = (cidr.version, cidr.first, cidr.prefixlen)
+        self._blocks[block] -= 1
+        if not self._blocks[block]:
+            del self._blocks[block]
+
+    def overlaps(self, cidr):
+        firsts = self._firsts[cidr.version]
+        index = bisect.bisect_left(firsts, cidr.first)
+        if index < len(firsts) and firsts[index] <= cidr.last:
+            return True
+        bits = 32 if cidr.version == 4 else 128
+        for prefixlen in range(cidr.prefixlen):
+            supernet_first = cidr.first >> (bits - prefixlen) \
+                << (bits - prefixlen)
+            if (cidr.version, supernet_first, prefixlen) in self._blocks:
+                return True
+        return False
+
+
+class ScanRouteDomain(object):
+    """ The rds_cache route domain entry, checked as before """
+
+    def __init__(self):
+        self.rd_entry = {}
+
+    def add(self, net_short_name, subnet_id, cidr):
+        net_entry = self.rd_entry.setdefault(net_short_name,
+                                             {'subnets': {}})
+        net_entry['subnets'][subnet_id] = {'cidr': cidr}
+
+    def overlaps(self, subnet_id, check_cidr):
+        for net_short_name in self.rd_entry:
+            net_entry = self.rd_entry[net_short_name]
+            for exist_subnet_id in net_entry['subnets']:
+                if exist_subnet_id == subnet_id:
+                    continue
+                exist_cidr = net_entry['subnets'][exist_subnet_id]['cidr']
+                if check_cidr in exist_cidr or exist_cidr in check_cidr:
+                    return True
+        return False
+
+
+class IndexedRouteDomain(object):
+    """ The same route domain, checked with a SubnetIndex """
+
+    def __init__(self):
+        self.index = SubnetIndex()
+
+    def add(self, net_short_name, subnet_id, cidr):
+        self.index.add(subnet_id, cidr)
+
+    def overlaps(self, subnet_id, check_cidr):
+        return subnet_id not in self.index and \
+            self.index.overlaps(check_cidr)
+
+
+def make_subnets(count):
+    """ (network, subnet id, /24 cidr) in 10.0.0.0/8 """
+    subnets = []
+    for i in range(count):
+        cidr = netaddr.IPNetwork('10.%d.%d.0/24' % (i // 256, i % 256))
+        subnets.append(('net-%05d' % (i // SUBNETS_PER_NETWORK),
+                        'subnet-%05d' % i, cidr))
+    return subnets
+
+
+def make_checks(count):
+    """ New cidrs: subnets and supernets of indexed subnets, and
+        cidrs outside them """
+    checks = []
+    for i in range(count):
+        if i % 3 == 0:
+            cidr = netaddr.IPNetwork('10.%d.%d.128/25' % (i // 256, i % 256))
+        elif i % 3 == 1:
+            cidr = netaddr.IPNetwork('10.%d.0.0/16' % (i % 256))
+        else:
+            cidr = netaddr.IPNetwork('172.%d.%d.0/24'
+                                     % (16 + i // 256, i % 256))
+        checks.append(('subnet-new-%05d' % i, cidr))
+    return checks
+
+
+def main():
+    subnet_count = 10000
+    if len(sys.argv) > 1:
+        subnet_count = int(sys.argv[1])
+    check_count = 1000
+    subnets = make_subnets(subnet_count)
+    checks = make_checks(check_count)
+
+    print('%d subnets in one route domain, %d overlap checks'
+          % (subnet_count, check_count))
+    results = {}
+    for (name, route_domain_class) in (('before', ScanRouteDomain),
+                                       ('after', IndexedRouteDomain)):
+        route_domain = route_domain_class()
+        for (net_short_name, subnet_id, cidr) in subnets:
+            route_domain.add(net_short_name, subnet_id, cidr)
+        start = time.time()
+        results[name] = [route_domain.overlaps(subnet_id, cidr)
+                         for (subnet_id, cidr) in checks]
+        print('  %-6s %10.3f msecs per check'
+              % (name, (time.time() - start) * 1000 / check_count))
+    assert results['before'] == results['after']
+
+    print('placing %d subnets one at a time, check then add'
+          % subnet_count)
+    for (name, route_domain_class) in (('before', ScanRouteDomain),
+                                       ('after', IndexedRouteDomain)):
+        route_domain = route_domain_class()
+        start = time.time()
+        for (net_short_name, subnet_id, cidr) in subnets:
+            assert not route_domain.overlaps(subnet_id, cidr)
+            route_domain.add(net_short_name, subnet_id, cidr)
+        print('  %-6s %10.3f secs' % (name, time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+""" Benchmark of the tenant affinity lookup of TenantScheduler.
+
+    Uses the SQLite fixture of benchmark_agent_pools and compares how
+    schedule finds a candidate agent already hosting a pool of the
+    tenant: as it was, listing the pools of each candidate with the
+    LBaaS v1 plugin's list_pools_on_lbaas_agent until one matches, and
+    with the one binding query of the driver's
+    TenantScheduler.get_tenant_agent_ids.
+
+    Each tenant's pools are bound to one agent. The lookup is timed
+    for a tenant on the first candidate, a tenant on the last one and
+    a new tenant, which has to check every candidate.
+
+    Needs the driver installed with neutron and SQLAlchemy:
+
+        python test/benchmark_tenant_affinity.py [pools] [agents]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+from f5.oslbaasv1driver.drivers import agent_scheduler
+
+from benchmark_agent_pools import LoadBalancerPluginDb, make_context
+
+
+def scan_candidates(plugin, scheduler, context, candidates, tenant_id):
+    """ The candidate search of schedule as it was """
+    for candidate in candidates:
+        assigned_pools = plugin.list_pools_on_lbaas_agent(
+            context, candidate['id'])
+        for assigned_pool in assigned_pools['pools']:
+            if tenant_id == assigned_pool['tenant_id']:
+                return candidate
+    return None
+
+
+def query_candidates(plugin, scheduler, context, candidates, tenant_id):
+    """ The candidate search of schedule now """
+    tenant_agent_ids = scheduler.get_tenant_agent_ids(context, tenant_id)
+    for candidate in candidates:
+        if candidate['id'] in tenant_agent_ids:
+            return candidate
+    return None
+
+
+def main():
+    pool_count = 100000
+    agent_count = 50
+    if len(sys.argv) > 1:
+        pool_count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        agent_count = int(sys.argv[2])
+    start = time.time()
+    # tenant-N is bound to agent-N when agents divides 2000
+    context = make_context(pool_count, agent_count)
+    print('%d pools, %d agents, fixture built in %.1f secs'
+          % (pool_count, agent_count, time.time() - start))
+    plugin = LoadBalancerPluginDb()
+    scheduler = agent_scheduler.TenantScheduler()
+    candidates = plugin.get_lbaas_agents(context)
+    first_tenant_id = 'tenant-%04d' % int(candidates[0]['id'][6:])
+    last_tenant_id = 'tenant-%04d' % int(candidates[-1]['id'][6:])
+
+    for (case, tenant_id) in (
+            ('first agent', first_tenant_id),
+            ('last agent', last_tenant_id),
+            ('new tenant', 'tenant-new')):
+        print(case)
+        results = {}
+        for (name, find) in (('before', scan_candidates),
+                             ('after', query_candidates)):
+            # start from an empty identity map, as a new request would
+            context.session.expunge_all()
+            start = time.time()
+            results[name] = find(plugin, scheduler, context, candidates,
+                                 tenant_id)
+            print('  %-6s %10.3f secs' % (name, time.time() - start))
+        assert results['before'] == results['after']
+
+
+if __name__ == '__main__':
+    main()